@@ -0,0 +1,176 @@
+from pathlib import Path
+import sys
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+from src.compute import colbertoutils as co
+from src.compute.compositor import Compositor
+from src.compute.pulsepreview import PulsePreview
+from src.compute.regionallut import RegionalLUT
+from benchmark_grating import make_beam,makeGrating_full,makeGrating_step
+from numpy.polynomial import Polynomial as P
+from timeit import repeat
+import numpy as np
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import tracemalloc
+
+'''
+Benchmark suite of the pulse shaping compute path (src/compute) on SLMBogus panels of realistic sizes
+Every case reports its throughput (ops/sec), the peak memory allocated during one call (temporaries included)
+and the memory and blocks still allocated after one call. tracemalloc only compares snapshots, so temporaries allocated and freed
+within the call show in peakMemory but not in retainedBlocks, which is not a count of the allocations made by the call.
+The results are written as JSON so that they can be compared between commits, e.g.
+    python benchmarks/benchmark_compute.py --output before.json
+    python benchmarks/benchmark_compute.py --compare before.json
+'''
+
+def measure(function,number=1,repeats=5):
+    '''
+        Times a function and measures the memory it allocates
+        input:
+            - function (callable): the function to call without arguments
+            - number (int): the number of calls per timing
+            - repeats (int): the number of timings, the best one is kept
+        output:
+            - dict: ops/sec, best and mean time per call (s), peak memory allocated during one call (bytes),
+                    memory and number of blocks still allocated after one call (returned value and cached quantities included,
+                    temporaries freed within the call excluded)
+    '''
+    function()# Warm up caches so that the steady state is measured
+    times=np.array(repeat(function,number=number,repeat=repeats))/number
+    tracemalloc.start()
+    before=tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    baseline=tracemalloc.get_traced_memory()[0]
+    result=function()
+    current,peak=tracemalloc.get_traced_memory()
+    after=tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del result
+    retainedBlocks=sum(max(stat.count_diff,0) for stat in after.compare_to(before,'lineno'))
+    return {'opsPerSecond':1/times.min(),
+            'bestTime':times.min(),
+            'meanTime':times.mean(),
+            'peakMemory':peak-baseline,
+            'retainedMemory':current-baseline,
+            'retainedBlocks':retainedBlocks}
+
+def get_cases(width,height):
+    '''
+        Builds the benchmark cases of the compute path for one SLM size
+        input:
+            - width,height (int): the size of the SLM in pixels
+        output:
+            - list of tuple: (name, function, number of calls per timing)
+    '''
+    bm=make_beam(width,height)
+    cal=bm.calibration
+    columns=np.arange(width)
+    wavelengths=cal.get_spectrumAtPixel(columns)
+    angFrequencies=co.waveToAngFreq(wavelengths)
+    candidates=np.random.default_rng(0).standard_normal((1000,4))*np.array([1,100,1000,1000])
+    delays=[P([0,delay]) for delay in np.linspace(-500,500,21)]
+    phaseImage=makeGrating_full(bm)
+    grayImage=np.empty(phaseImage.shape,dtype=np.uint8)
+    steps=iter(range(10**9))
+    otherBeam=make_beam(width,height)
+    bm.set_beamVerticalDelimiters([0,height//2])
+    otherBeam.set_beamVerticalDelimiters([height//2,height])
+    compositor=Compositor(cal.SLM)
+    compositor.set_beams({'beam 1':bm,'beam 2':otherBeam})
+    lineCenters=np.random.default_rng(1).uniform(0,width,(1000,8))
+    spectra=np.exp(-(columns[np.newaxis,:]-lineCenters[:,:,np.newaxis])**2/8).sum(axis=1)
+    preview=PulsePreview(otherBeam)
+    preview.set_spectrum(np.exp(-((columns-width/2)/(width/6))**2))
+    regionalTables=[(np.arange(256)[np.newaxis,:]+np.arange(64)[:,np.newaxis]*shift).astype(np.uint8) for shift in (1,2)]
+    regionalLUT=RegionalLUT(width,height,regionalTables[0])
+    regionalImage=compositor.compose().copy()
+    return [('Beam.makeGrating (full synthesis)',lambda: makeGrating_full(bm),1),
+            ('Beam.makeGrating (constant phase step)',lambda: makeGrating_step(bm,np.array([1])*next(steps)),1),
+            ('Beam.makeGrating (linear phase step)',lambda: makeGrating_step(bm,np.array([0,100])*next(steps)),1),
+            ('Beam.get_sampledCurrentPhase',lambda: bm.get_sampledCurrentPhase(),100),
+            ('Beam.evaluate_phases (1000 candidates)',lambda: bm.evaluate_phases(candidates,mode='absolute'),1),
+            ('Beam.makeGratingSequence (21 delays)',lambda: bm.makeGratingSequence(delays),1),
+            ('Beam.set_targetAmplitude',lambda: bm.set_targetAmplitude(columns/width),10),
+            ('Calibration.get_spectrumAtPixel',lambda: cal.get_spectrumAtPixel(columns),100),
+            ('Calibration.get_spectralAxis (cached)',lambda: cal.get_spectralAxis('ang_frequency'),1000),
+            ('Calibration.get_grayscaleAtPhase',lambda: cal.get_grayscaleAtPhase(phaseImage,out=grayImage),1),
+            ('Calibration.get_columnsAxis slice (energy)',lambda: cal.get_columnsAxis()[:width//2].get_values('energy'),100),
+            ('Beam.get_compressionCarrier (wavelength)',lambda: bm.get_compressionCarrier(unit='wavelength'),1000),
+            ('colbertoutils.waveToAngFreq',lambda: co.waveToAngFreq(wavelengths),1000),
+            ('colbertoutils.angFreqToWave',lambda: co.angFreqToWave(angFrequencies),1000),
+            ('colbertoutils.waveToeV',lambda: co.waveToeV(wavelengths),1000),
+            ('colbertoutils.angFreqToeV',lambda: co.angFreqToeV(angFrequencies),1000),
+            ('colbertoutils.peak_finder_batch (1000 spectra)',lambda: co.peak_finder_batch(spectra,0.5),1),
+            ('PulsePreview.get_temporalIntensity',lambda: preview.get_temporalIntensity(),100),
+            ('PulsePreview.get_pulseDuration (1000 candidates)',lambda: preview.get_pulseDuration(candidates,mode='absolute'),1),
+            ('RegionalLUT.apply',lambda: regionalLUT.apply(regionalImage,out=regionalImage),10),
+            ('RegionalLUT.set_tables (swap)',lambda: regionalLUT.set_tables(regionalTables[next(steps)%2]),1000),
+            ('Compositor.compose (two beams, one changed)',lambda: (makeGrating_step(bm,np.array([1])*next(steps)),compositor.compose()),1),
+            ]
+
+def get_revision():
+    '''
+        Gets the git revision of the benchmarked tree
+        output:
+            - str: the commit hash or None if it cannot be found
+    '''
+    try:
+        return subprocess.run(['git','rev-parse','HEAD'],cwd=path_root,capture_output=True,text=True,check=True).stdout.strip()
+    except (OSError,subprocess.CalledProcessError):
+        return None
+
+def run(sizes,repeats=5):
+    '''
+        Runs every benchmark case for every SLM size
+        input:
+            - sizes (list of tuple): the (width,height) of the SLMs
+            - repeats (int): the number of timings per case
+        output:
+            - dict: the metadata of the run and the results by SLM size and case name
+    '''
+    results={'revision':get_revision(),
+             'date':datetime.datetime.now().isoformat(timespec='seconds'),
+             'python':platform.python_version(),
+             'numpy':np.__version__,
+             'results':{}}
+    for width,height in sizes:
+        sizeResults={}
+        for name,function,number in get_cases(width,height):
+            sizeResults[name]=measure(function,number=number,repeats=repeats)
+            print('%dx%d %-45s %12.1f ops/s %10.1f kB peak'%(width,height,name,sizeResults[name]['opsPerSecond'],sizeResults[name]['peakMemory']/1e3),file=sys.stderr)
+        results['results']['%dx%d'%(width,height)]=sizeResults
+    return results
+
+def compare(results,reference):
+    '''
+        Prints the throughput of the results relative to reference results
+        input:
+            - results, reference (dict): results of run
+    '''
+    for size,sizeResults in results['results'].items():
+        for name,result in sizeResults.items():
+            referenceResult=reference['results'].get(size,{}).get(name)
+            if referenceResult is not None:
+                print('%s %-45s x%.2f'%(size,name,result['opsPerSecond']/referenceResult['opsPerSecond']))
+
+if __name__ == "__main__":
+    parser=argparse.ArgumentParser(description='Benchmarks the pulse shaping compute path on SLMBogus panels')
+    parser.add_argument('--sizes',nargs='+',default=['1920x1152','1024x512'],help='SLM sizes as WIDTHxHEIGHT')
+    parser.add_argument('--repeat',type=int,default=5,help='number of timings per case')
+    parser.add_argument('--output',help='JSON file in which to write the results (printed to stdout otherwise)')
+    parser.add_argument('--compare',help='JSON file of reference results to compare the throughput with')
+    arguments=parser.parse_args()
+    sizes=[tuple(int(value) for value in size.split('x')) for size in arguments.sizes]
+    results=run(sizes,repeats=arguments.repeat)
+    if arguments.output:
+        with open(arguments.output,'w') as file:
+            json.dump(results,file,indent=2)
+    else:
+        print(json.dumps(results,indent=2))
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            compare(results,json.load(file))
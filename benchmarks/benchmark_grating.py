@@ -0,0 +1,82 @@
+from pathlib import Path
+import sys
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+from src.compute.beams import Beam
+from src.compute.calibration import Calibration
+from src.compute.SLMBogus import SLM
+from numpy.polynomial import Polynomial as P
+from timeit import repeat
+import numpy as np
+
+'''
+Compares the vectorized Beam.makeGrating with the former column by column loop on realistic SLM sizes
+'''
+
+def makeGrating_loop(bm):
+    '''
+        Reference implementation of Beam.makeGrating looping over every SLM column (former implementation)
+        input:
+            - bm (Beam): the beam for which to make the grating
+        output:
+            - 2d.array: A 2D phase array corresponding to the current phase profile
+    '''
+    phaseGratingImage=[]
+    numberVerticalPixels=bm.beamVerticalDelimiters[1]-bm.beamVerticalDelimiters[0]
+    phaseProfile=bm.get_sampledCurrentPhase()
+    for mask,phase in zip(bm.phaseGratingAmplitudeMask,phaseProfile):
+        row=bm.generate_1Dgrating(bm.get_gratingAmplitude(),bm.get_gratingPeriod(),phase,num=numberVerticalPixels)
+        if bm.maskOn:
+            row=mask*row
+        phaseGratingImage.append(row)
+    return np.array(phaseGratingImage)
+
+def makeGrating_full(bm):
+    '''
+        Makes the grating with a full synthesis, bypassing the incremental update of constant and linear phase changes
+        input:
+            - bm (Beam): the beam for which to make the grating
+    '''
+    bm.gratingArgumentState=None
+    return bm.makeGrating()
+
+def makeGrating_step(bm,coefficients):
+    '''
+        Makes the grating after changing the current phase by the provided coefficients (relative to the optimal phase)
+        input:
+            - bm (Beam): the beam for which to make the grating
+            - coefficients (1d.array): The relative phase coefficients in powers of fs
+    '''
+    bm.set_currentPhase(P(coefficients),mode='relative')
+    return bm.makeGrating()
+
+def make_beam(width,height):
+    slm=SLM(width,height)
+    cal=Calibration(slm)
+    cal.set_pixelToWavelength(P(1e-9*np.array([500,100/width])))
+    bm=Beam(cal)
+    bm.set_compressionCarrierWave(550e-9)
+    bm.set_optimalPhase(P([0,0,1000,500]))
+    bm.set_currentPhase(P([0,100,500]),mode='relative')
+    bm.set_beamVerticalDelimiters([0,height])
+    bm.set_gratingAmplitude(1)
+    bm.set_gratingPeriod(10)
+    mask=np.linspace(0,1,width)
+    bm.set_gratingAmplitudeMask(mask)
+    bm.set_maskStatus(True)
+    return bm
+
+if __name__ == "__main__":
+    for width,height in [(1920,1152),(1024,512)]:
+        bm=make_beam(width,height)
+        if not np.array_equal(makeGrating_loop(bm),bm.makeGrating()):
+            raise(ValueError('Vectorized and looped gratings differ for a %dx%d SLM'%(width,height)))
+        loopTime=min(repeat(lambda: makeGrating_loop(bm),number=1,repeat=3))
+        vectorTime=min(repeat(lambda: makeGrating_full(bm),number=1,repeat=5))
+        print('%dx%d SLM: loop %.1f ms, vectorized %.1f ms (x%.1f)'%(width,height,1e3*loopTime,1e3*vectorTime,loopTime/vectorTime))
+        for name,coefficients in [('constant',[1]),('linear',[0,100])]:
+            bm.set_maskStatus(False)
+            makeGrating_full(bm)
+            steps=iter(range(1000))
+            incrementalTime=min(repeat(lambda: makeGrating_step(bm,np.array(coefficients)*next(steps)),number=1,repeat=5))
+            print('    incremental update of the %s phase term %.1f ms (x%.1f faster than the loop)'%(name,1e3*incrementalTime,loopTime/incrementalTime))
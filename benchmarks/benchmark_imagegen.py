@@ -0,0 +1,94 @@
+from pathlib import Path
+import sys
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+from src.drivers.ImageGenNumpy import ImageGen as ImageGenNumpy
+from benchmark_compute import measure
+import numpy as np
+import argparse
+import ctypes
+import json
+
+'''
+Benchmark of the pattern generators of ImageGen on SLM panels of realistic sizes
+The NumPy backend (src/drivers/ImageGenNumpy.py) is always timed. The Meadowlark Imagegen.dll is timed as well
+when it can be loaded (Windows with the Meadowlark SDK), and the patterns of both backends are compared.
+    python benchmarks/benchmark_imagegen.py --sizes 1920x1152 --output imagegen.json
+'''
+
+def get_calls(width,height,rgb=0):
+    '''
+        Builds the pattern generator calls of the benchmark for one SLM size
+        input:
+            - width, height (int): the size of the SLM
+            - rgb (int): 1 for RGBA buffers
+        output:
+            - list of (str,callable): the name of every case and a function calling it with a backend and its buffer (as the DLL wants it)
+    '''
+    depth=8
+    return [('generate_solid',lambda gen,array:gen.generate_solid(array,None,width,height,depth,128,rgb)),
+            ('generate_stripe',lambda gen,array:gen.generate_stripe(array,None,width,height,depth,0,255,8,1,rgb)),
+            ('generate_checkerboard',lambda gen,array:gen.generate_checkerboard(array,None,width,height,depth,0,255,8,rgb)),
+            ('generate_grating',lambda gen,array:gen.generate_grating(array,None,width,height,depth,16,1,0,rgb)),
+            ('generate_sinusoid',lambda gen,array:gen.generate_sinusoid(array,None,width,height,depth,16,0,rgb)),
+            ('generate_fresnel_lens',lambda gen,array:gen.generate_fresnel_lens(array,None,width,height,depth,width//2,height//2,height//2,1,0,0,rgb)),
+            ('generate_lg',lambda gen,array:gen.generate_lg(array,None,width,height,depth,3,width//2,height//2,0,rgb)),
+            ('generate_concentric_rings',lambda gen,array:gen.generate_concentric_rings(array,None,width,height,depth,100,300,255,0,width//2,height//2,rgb)),
+            ('generate_axicon',lambda gen,array:gen.generate_axicon(array,None,width,height,depth,4,width//2,height//2,1,rgb))]
+
+def get_backends():
+    '''
+        output:
+            - dict: the ImageGen instances by backend name, the DLL only when it can be loaded
+    '''
+    backends={'numpy':ImageGenNumpy()}
+    try:
+        from src.drivers.Slm_Meadowlark_optics import ImageGen as ImageGenDLL
+        backends['dll']=ImageGenDLL()
+    except (ImportError,AttributeError,OSError) as error:
+        print('Imagegen.dll not available (%s), only the NumPy backend is timed'%error,file=sys.stderr)
+    return backends
+
+def run(sizes,repeats=5,rgb=0):
+    '''
+        Runs the benchmark
+        input:
+            - sizes (list of (int,int)): the (width,height) of the SLMs
+            - repeats (int): the number of timings per case
+            - rgb (int): 1 for RGBA buffers
+        output:
+            - dict: the results by size, case and backend, and the largest gray level difference between the backends
+    '''
+    backends=get_backends()
+    results={}
+    for width,height in sizes:
+        sizeResults={}
+        for name,call in get_calls(width,height,rgb):
+            buffers={}
+            caseResults={}
+            for backend,gen in backends.items():
+                buffers[backend]=np.empty(width*height*(4 if rgb else 1),np.uint8)
+                array=buffers[backend].ctypes.data_as(ctypes.POINTER(ctypes.c_ubyte)) if backend=='dll' else buffers[backend]
+                caseResults[backend]=measure(lambda:call(gen,array),repeats=repeats)
+                print('%dx%d %-28s %-6s %10.1f ops/s'%(width,height,name,backend,caseResults[backend]['opsPerSecond']),file=sys.stderr)
+            if 'dll' in buffers:
+                difference=np.abs(buffers['dll'].astype(int)-buffers['numpy'])
+                caseResults['maximumDifference']=int(np.minimum(difference,256-difference).max())
+            sizeResults[name]=caseResults
+        results['%dx%d'%(width,height)]=sizeResults
+    return results
+
+if __name__ == "__main__":
+    parser=argparse.ArgumentParser(description='Benchmarks the NumPy ImageGen backend against Imagegen.dll')
+    parser.add_argument('--sizes',nargs='+',default=['1920x1152','1024x512'],help='SLM sizes as WIDTHxHEIGHT')
+    parser.add_argument('--repeat',type=int,default=5,help='number of timings per case')
+    parser.add_argument('--rgb',action='store_true',help='benchmark RGBA buffers')
+    parser.add_argument('--output',help='JSON file in which to write the results (printed to stdout otherwise)')
+    arguments=parser.parse_args()
+    sizes=[tuple(int(value) for value in size.split('x')) for size in arguments.sizes]
+    results=run(sizes,repeats=arguments.repeat,rgb=int(arguments.rgb))
+    if arguments.output:
+        with open(arguments.output,'w') as file:
+            json.dump(results,file,indent=2)
+    else:
+        print(json.dumps(results,indent=2))
@@ -0,0 +1,31 @@
+from pathlib import Path
+import sys
+path_root = Path(__file__).parents[2]
+sys.path.append(str(path_root))
+from src.compute.beams import Beam
+from src.compute.calibration import Calibration
+from src.compute.beamlocator import BeamLocator
+from src.compute.SLMBogus import SLM 
+from src.drivers.fakeInstruments.dumShaper import dumShapedSpec
+from numpy.polynomial import Polynomial as P
+import numpy as np
+
+'''
+A snippet of code demonstrating how to find the rows of the SLM illuminated by the beams
+The fake spectrometer measures two Gaussian beams centered on rows 300 and 760 of the bogus SLM
+'''
+
+slm=SLM(1920,1152)
+cal=Calibration(slm)
+cal.set_pixelToWavelength(P(1e-9*np.array([500,1/20])))
+rows=np.arange(slm.get_size()[1])
+verticalProfile=np.exp(-2*((rows-300)/60)**2)+0.7*np.exp(-2*((rows-760)/90)**2)
+verticalProfile[verticalProfile<1e-4]=0
+spectrometer=dumShapedSpec(slm,cal,period=10,verticalProfile=verticalProfile,mode='linear',dispersion=P([0]))
+
+beams={'pump':Beam(cal),'probe':Beam(cal)}# e.g. DataHandling.beams, attributed from the top of the SLM
+locator=BeamLocator(cal,spectrometer,period=10)
+delimiters=locator.set_delimiters(beams,numberBlocks=16,fraction=0.01)
+for name,band in delimiters.items():
+    print('%s: rows %d to %d'%(name,band[0],band[1]))
+print('Found with %d frames for %d rows'%(locator.get_acquisitions(),slm.get_size()[1]))
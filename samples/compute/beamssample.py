@@ -63,6 +63,29 @@ plt.plot(mask)
 plt.figure()
 plt.imshow(bm.makeGrating())
 
+# Here is how to shape the spectral amplitude of the diffracted beam (Gaussian spectrum centered on the SLM)
+columns=np.arange(slm.get_size()[0])
+bm.set_targetAmplitude(np.exp(-((columns-columns.mean())/(columns.size/4))**2))
+plt.figure()
+plt.plot(bm.get_gratingAmplitudeMask())
+plt.figure()
+plt.imshow(bm.makeGrating())
+bm.set_maskStatus(False)
+
+# Here is how to precompute all the frames of a scan over the linear phase (delay) at once
+delays=[P([0,delay]) for delay in np.linspace(-500,500,21)]# Delays in fs
+frames=bm.makeGratingSequence(delays,mode='relative',fullPanel=True)
+print('Precomputed %d frames of %dx%d gray levels'%frames.shape)
+plt.figure()
+plt.imshow(frames[0])
 
+# Here is how to evaluate many candidate phases at once (rows are coefficients in powers of fs, lowest first)
+candidates=np.random.randn(1000,4)*np.array([1,100,1000,1000])
+phases=bm.evaluate_phases(candidates,mode='absolute')
+print('Evaluated %d phase profiles on %d columns'%phases.shape)
+# Polynomials with a mapped domain (e.g. the result of P.fit) are converted to power series first
+fittedPhase=P.fit([0,1,2],[0,50,200],2)
+phases=bm.evaluate_phases([fittedPhase,P([0,0,50])],mode='relative')
+print('Evaluated %d phase profiles, one with domain %s'%(len(phases),fittedPhase.domain))
 
 plt.show()
\ No newline at end of file
@@ -17,3 +17,9 @@ print(cal.get_spectrumAtPixel(np.arange(slm.get_size()[0])))
 print(cal.get_spectrumAtPixel(np.arange(slm.get_size()[0]),unit='frequency'))
 print(cal.get_spectrumAtPixel(np.arange(slm.get_size()[0]),unit='ang_frequency'))
 print(cal.get_spectrumAtPixel(np.arange(slm.get_size()[0]),unit='energy'))
+
+# Phases are converted to SLM gray levels with a lookup table (linear 8 bit table by default)
+phase=np.linspace(0,2*np.pi,5,endpoint=False)
+print(cal.get_grayscaleAtPhase(phase))
+cal.set_phaseToGrayscale(np.round(np.linspace(0,230,256)).astype(np.uint8))# e.g. 2*pi reached at gray level 230
+print(cal.get_grayscaleAtPhase(phase))
@@ -0,0 +1,39 @@
+from pathlib import Path
+import sys
+path_root = Path(__file__).parents[2]
+sys.path.append(str(path_root))
+from src.compute.beams import Beam
+from src.compute.calibration import Calibration
+from src.compute.compositor import Compositor
+from src.compute.SLMBogus import SLM 
+from numpy.polynomial import Polynomial as P
+import numpy as np
+
+'''
+A snippet of code demonstrating how to compose several beams sharing one SLM into a single image
+'''
+
+slm=SLM(1920,1152)
+cal=Calibration(slm)
+cal.set_pixelToWavelength(P(1e-9*np.array([500,1/20])))
+beams={}
+for name,delimiters in [('pump',[100,400]),('probe',[450,750]),('LO',[800,1100])]:
+    bm=Beam(cal)
+    bm.set_compressionCarrierWave(550e-9)
+    bm.set_optimalPhase(P([0,0,1000,500]))
+    bm.set_currentPhase(P([0]),mode='relative')
+    bm.set_beamVerticalDelimiters(delimiters)
+    bm.set_gratingAmplitude(1)
+    bm.set_gratingPeriod(10)
+    beams[name]=bm
+
+compositor=Compositor(slm)
+compositor.set_beams(beams)# e.g. DataHandling.beams
+compositor.write_image()# Renders the three beams in the full-panel image and sends it to the SLM
+print('Overlapping beams: %s'%compositor.get_overlaps())
+
+# Only the band of the probe is rendered again when its phase changes
+beams['probe'].set_currentPhase(P([0,200]),mode='relative')
+image=compositor.compose()
+slm.write_image(image,True)
+print('Image of shape %s, C-contiguous: %s'%(image.shape,image.flags['C_CONTIGUOUS']))
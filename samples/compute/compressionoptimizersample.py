@@ -0,0 +1,40 @@
+from pathlib import Path
+import sys
+path_root = Path(__file__).parents[2]
+sys.path.append(str(path_root))
+from src.compute.beams import Beam
+from src.compute.calibration import Calibration
+from src.compute.compressionoptimizer import CompressionOptimizer
+from src.compute.SLMBogus import SLM 
+from src.drivers.fakeInstruments.dumShaper import dumShapedSpec
+from numpy.polynomial import Polynomial as P
+import matplotlib.pyplot as plt
+import numpy as np
+
+'''
+A snippet of code demonstrating how to compress the pulse of a beam by maximizing its integrated SHG
+The fake spectrometer reads the image of the bogus SLM and adds an unknown dispersion (-800 fs^2, -3000 fs^3) to the beam
+'''
+
+slm=SLM(1920,1152)
+cal=Calibration(slm)
+cal.set_pixelToWavelength(P(1e-9*np.array([500,1/20])))
+bm=Beam(cal)
+bm.set_compressionCarrierWave(550e-9)
+bm.set_optimalPhase(P([0,0,0,0]))
+bm.set_currentPhase(P([0]),mode='relative')
+bm.set_beamVerticalDelimiters([400,700])
+bm.set_gratingAmplitude(1)
+bm.set_gratingPeriod(10)
+spectrometer=dumShapedSpec(slm,cal,period=10,rows=[400,700],dispersion=P([0,0,-800,-3000]),mode='SHG')
+
+optimizer=CompressionOptimizer(bm,slm,spectrometer,figureOfMerit=np.sum)
+optimizer.set_scanRanges({2:1000,3:10000})# Half range of the first scans in fs^2 and fs^3
+coefficients=optimizer.optimize(orders=(2,3),points=7,rounds=4)
+print('Found GDD %.0f fs^2 and TOD %.0f fs^3 in %d measurements'%(coefficients[2],coefficients[3],optimizer.get_roundTrips()))
+
+plt.figure()
+plt.plot([figureOfMerit for _,figureOfMerit in optimizer.get_history()],'o-')
+plt.xlabel('Measurement')
+plt.ylabel('Integrated SHG')
+plt.show()
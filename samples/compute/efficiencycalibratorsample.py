@@ -0,0 +1,55 @@
+from pathlib import Path
+import sys
+path_root = Path(__file__).parents[2]
+sys.path.append(str(path_root))
+from src.compute.beams import Beam
+from src.compute.calibration import Calibration
+from src.compute.efficiencycalibrator import EfficiencyCalibrator
+from src.compute.SLMBogus import SLM 
+from src.drivers.fakeInstruments.dumShaper import dumShapedSpec
+from numpy.polynomial import Polynomial as P
+import matplotlib.pyplot as plt
+import numpy as np
+import tempfile
+import os
+
+'''
+A snippet of code demonstrating how to measure the diffraction efficiency map of the SLM and use it to shape the amplitude of a beam
+The liquid crystal of the fake SLM only delivers 85% of the nominal phase at 548 nm, scaling as 1/wavelength
+'''
+
+slm=SLM(1920,1152)
+cal=Calibration(slm)
+cal.set_pixelToWavelength(P(1e-9*np.array([500,1/20])))
+phaseScale=0.85*548e-9/cal.get_spectralAxis('wavelength')
+spectrometer=dumShapedSpec(slm,cal,period=10,rows=[400,700],mode='linear',dispersion=P([0]),bandwidth=120e-9,
+                           wavelengths=np.linspace(480,620,2048),phaseScale=phaseScale)
+
+# One acquisition per depth measures every block of columns at once
+calibrator=EfficiencyCalibrator(cal,spectrometer,rows=[400,700],period=10,amplitude=1)
+calibrator.measure(depths=np.linspace(0,1,17),numberBlocks=64)
+filename=os.path.join(tempfile.mkdtemp(),'efficiency_map.npz')
+cal.save_efficiencyMap(filename)# Reloaded in later sessions with cal.load_efficiencyMap(filename)
+
+depths,efficiencyMap=cal.get_efficiencyMap()
+plt.figure()
+plt.imshow(efficiencyMap.T,aspect='auto',origin='lower',extent=[0,slm.get_size()[0],depths[0],depths[-1]])
+plt.xlabel('SLM column')
+plt.ylabel('Grating depth')
+plt.colorbar(label='Relative diffracted amplitude')
+
+# set_targetAmplitude uses the map measured with the beam's grating amplitude and period
+bm=Beam(cal)
+bm.set_compressionCarrierWave(550e-9)
+bm.set_optimalPhase(P([0]))
+bm.set_currentPhase(P([0]),mode='relative')
+bm.set_beamVerticalDelimiters([400,700])
+bm.set_gratingAmplitude(1)
+bm.set_gratingPeriod(10)
+columns=np.arange(slm.get_size()[0])
+bm.set_targetAmplitude(0.2+0.8*np.exp(-((columns-960)/400)**2))
+plt.figure()
+plt.plot(bm.get_gratingAmplitudeMask())
+plt.xlabel('SLM column')
+plt.ylabel('Grating depth')
+plt.show()
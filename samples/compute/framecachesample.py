@@ -0,0 +1,33 @@
+from pathlib import Path
+import sys
+path_root = Path(__file__).parents[2]
+sys.path.append(str(path_root))
+from src.compute.beams import Beam
+from src.compute.calibration import Calibration
+from src.compute.framecache import FrameCache
+from src.compute.SLMBogus import SLM 
+from numpy.polynomial import Polynomial as P
+import numpy as np
+
+'''
+A snippet of code demonstrating how to serve repeated scan points from a FrameCache
+'''
+
+slm=SLM(1920,1152)
+cal=Calibration(slm)
+cal.set_pixelToWavelength(P(1e-9*np.array([500,1/20])))
+bm=Beam(cal)
+bm.set_compressionCarrierWave(550e-9)
+bm.set_optimalPhase(P([0,0,1000,500]))
+bm.set_beamVerticalDelimiters([400,700])
+bm.set_gratingAmplitude(1)
+bm.set_gratingPeriod(10)
+cache=FrameCache(memoryBudget=200e6)# Frames are evicted (least recently used first) beyond 200 MB
+bm.set_frameCache(cache)
+
+# A phase cycling scan repeated 10 times only renders each of the 4 phases once
+for repetition in range(10):
+    for phase in [0,np.pi/2,np.pi,3*np.pi/2]:
+        bm.set_currentPhase(P([phase]),mode='relative')
+        grating=bm.makeGrating()
+print(cache.get_stats())
@@ -0,0 +1,49 @@
+from pathlib import Path
+import sys
+path_root = Path(__file__).parents[2]
+sys.path.append(str(path_root))
+from src.compute.holography import HologramEngine,phaseToGray
+from scipy import fft
+import matplotlib.pyplot as plt
+import numpy as np
+import time
+
+'''
+A snippet of code demonstrating how to compute phase holograms for the SLM
+A sequence of target images is computed with warm starts, a batch of targets at once and an array of spots of unequal intensities
+'''
+
+rows,columns=576,960
+engine=HologramEngine((rows,columns),tolerance=1e-3)
+
+# A sequence of targets: a bar moving in the far field. Every hologram starts from the previous one
+targets=np.zeros((5,rows,columns))
+for index,target in enumerate(targets):
+    target[200+10*index:220+10*index,400:560]=1
+for target in targets:
+    start=time.time()
+    phase,errors=engine.gerchberg_saxton(target,iterations=100)
+    print('Hologram computed in %.3f s, %d iterations, error %.3f'%(time.time()-start,len(engine.errors),errors[0]))
+
+# The same targets as one batch (the FFTs of the batch run together)
+engine.reset()
+phases,errors=engine.gerchberg_saxton(targets,iterations=100,callback=lambda iteration,errors: None)
+print('Errors of the batch:',errors)
+
+# An array of spots with a defocused one and a brighter one
+phase,spotIntensities=engine.generate_spots(x=[-60,0,60,0],y=[0,40,0,-40],z=[0,0,0,1],intensities=[1,1,1,2])
+print('Spot intensities:',spotIntensities,'efficiency %.2f'%spotIntensities.sum())
+gray=phaseToGray(phase)
+
+farField=np.abs(fft.fftshift(fft.fft2(np.exp(1j*phases[-1]))))**2
+plt.figure()
+plt.subplot(1,2,1)
+plt.imshow(phaseToGray(phases[-1]),cmap='gray')
+plt.title('Phase hologram')
+plt.subplot(1,2,2)
+plt.imshow(farField)
+plt.title('Far field')
+plt.figure()
+plt.imshow(gray,cmap='gray')
+plt.title('Spot hologram')
+plt.show()
@@ -0,0 +1,33 @@
+from pathlib import Path
+import sys
+path_root = Path(__file__).parents[2]
+sys.path.append(str(path_root))
+from src.compute.linematching import LineCalibrator,load_spectrum,find_lines
+import matplotlib.pyplot as plt
+import numpy as np
+
+'''
+A snippet of code demonstrating how to calibrate a spectrometer camera automatically from a mercury lamp spectrum
+The peaks are matched to the mercury lines without user input and the calibration is cached per camera, grating and center wavelength
+'''
+
+path=path_root/'samples'/'compute'/'test_files'
+pixels,spectrum=load_spectrum(path/'mercury_lamp_calib_August2024')
+
+calibrator=LineCalibrator(lines='Hg',cacheFile=None,degree=2,tolerance=0.5)# Give a cacheFile (JSON) to keep the calibrations between sessions
+result=calibrator.calibrate(spectrum,camera='stresing',grating=600,center=450)
+for pixel,wavelength,residual in zip(result['pixels'],result['wavelengths'],result['residuals']):
+    print('Peak at pixel %.2f matched to %.3f nm (residual %.3f nm)'%(pixel,wavelength,residual))
+print('rms residual: %.3f nm'%result['rms'])
+wavelengths=calibrator.get_wavelengthAxis(result,pixels)
+
+# Every spectrum of a folder at once (the file name is used as the center wavelength)
+results=calibrator.calibrate_folder(path,camera='stresing',grating=600,pattern='mercury_lamp*')
+
+peaks,heights=find_lines(spectrum)
+plt.figure()
+plt.plot(wavelengths,spectrum)
+plt.plot(calibrator.get_wavelengthAxis(result,peaks),heights,'x')
+plt.xlabel('Wavelength (nm)')
+plt.ylabel('Intensity')
+plt.show()
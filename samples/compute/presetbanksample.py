@@ -0,0 +1,48 @@
+from pathlib import Path
+import sys
+path_root = Path(__file__).parents[2]
+sys.path.append(str(path_root))
+from src.compute.beams import Beam
+from src.compute.calibration import Calibration
+from src.compute.presetbank import PresetBank
+from src.compute.SLMBogus import SLM 
+from numpy.polynomial import Polynomial as P
+import numpy as np
+import tempfile
+import time
+
+'''
+A snippet of code demonstrating how to save named beam configurations in a PresetBank and switch between them without computation
+'''
+
+slm=SLM(1920,1152)
+cal=Calibration(slm)
+cal.set_pixelToWavelength(P(1e-9*np.array([500,1/20])))
+bm=Beam(cal)
+bm.set_compressionCarrierWave(550e-9)
+bm.set_optimalPhase(P([0,0,1000,500]))
+bm.set_beamVerticalDelimiters([400,700])
+bm.set_gratingAmplitude(1)
+bm.set_gratingPeriod(10)
+beams={'pump':bm}
+directory=tempfile.mkdtemp()
+bank=PresetBank(directory,slm)
+
+# Save a few configurations (the full-panel frame is composed from the beams)
+bm.set_currentPhase(P([0]),mode='relative')
+bank.save_preset('compressed',beams)
+bm.set_currentPhase(P([0,0,2000]),mode='relative')
+bank.save_preset('chirped',beams)
+for delay in [-200,0,200]:
+    bm.set_currentPhase(P([0,delay]),mode='relative')
+    bank.save_preset('delay %d fs'%delay,beams)
+bm.set_targetAmplitude(np.exp(-((np.arange(1920)-960)/400)**2))
+bank.save_preset('masked',beams)
+
+# The bank is reloaded from disk (e.g. after a restart) and switching presets is a slice of the memory-mapped stack
+bank=PresetBank(directory)
+for name in bank.get_names():
+    start=time.perf_counter()
+    frame=bank.load_preset(name,beams)
+    slm.write_image(frame)
+    print('%s: switched in %.2f ms'%(name,1e3*(time.perf_counter()-start)))
@@ -0,0 +1,45 @@
+from pathlib import Path
+import sys
+path_root = Path(__file__).parents[2]
+sys.path.append(str(path_root))
+from src.compute.beams import Beam
+from src.compute.calibration import Calibration
+from src.compute.pulsepreview import PulsePreview
+from src.compute.SLMBogus import SLM 
+from numpy.polynomial import Polynomial as P
+import matplotlib.pyplot as plt
+import numpy as np
+
+'''
+A snippet of code demonstrating how to preview the temporal pulse shaped by a beam
+'''
+
+slm=SLM(1920,1152)
+cal=Calibration(slm)
+cal.set_pixelToWavelength(P(1e-9*np.array([500,1/20])))
+bm=Beam(cal)
+bm.set_compressionCarrierWave(550e-9)
+bm.set_optimalPhase(P([0,0,1000,500]))
+bm.set_currentPhase(P([0]),mode='relative')
+preview=PulsePreview(bm)
+columns=np.arange(slm.get_size()[0])
+preview.set_spectrum(np.exp(-((columns-960)/400)**2))# Spectral intensity on the SLM columns
+
+# The preview follows the current phase of the beam. Only the phase evaluation and the FFT are done at every refresh
+plt.figure()
+for chirp in [0,-500,-1000]:
+    bm.set_currentPhase(P([0,0,chirp]),mode='relative')
+    plt.plot(preview.get_timeAxis(),preview.get_temporalIntensity(),label='%d fs$^2$ (%.1f fs rms)'%(chirp,preview.get_pulseDuration()))
+plt.xlabel('Time (fs)')
+plt.ylabel('Intensity (rel. to flat phase)')
+plt.xlim(-500,500)
+plt.legend()
+
+# Many candidate phases (rows of coefficients in powers of fs) are previewed at once
+candidates=np.array([[0,0,chirp] for chirp in np.linspace(-2000,0,201)])
+durations=preview.get_pulseDuration(candidates,mode='relative')
+plt.figure()
+plt.plot(candidates[:,2],durations)
+plt.xlabel('Relative chirp (fs$^2$)')
+plt.ylabel('rms duration (fs)')
+plt.show()
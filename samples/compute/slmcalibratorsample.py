@@ -0,0 +1,35 @@
+from pathlib import Path
+import sys
+path_root = Path(__file__).parents[2]
+sys.path.append(str(path_root))
+from src.compute.calibration import Calibration
+from src.compute.slmcalibrator import SLMCalibrator
+from src.compute.SLMBogus import SLM 
+from src.drivers.fakeInstruments.dumShaper import dumShapedSpec
+from numpy.polynomial import Polynomial as P
+import matplotlib.pyplot as plt
+import numpy as np
+
+'''
+A snippet of code demonstrating how to calibrate the wavelength diffracted by every SLM column
+The fake spectrometer (2048 pixels from 450 to 650 nm) measures the beam diffracted by the bogus SLM
+with an actual calibration that is unknown to the calibrator (decreasing wavelength along the columns)
+'''
+
+slm=SLM(1920,1152)
+cal=Calibration(slm)
+actualPixelToWavelength=P(1e-9*np.array([596,-1/20,2e-6]))
+spectrometer=dumShapedSpec(slm,cal,period=10,pixelToWavelength=actualPixelToWavelength,wavelengths=np.linspace(450,650,2048),
+                           mode='linear',dispersion=P([0]),bandwidth=80e-9)
+
+calibrator=SLMCalibrator(cal,spectrometer,period=10)
+pixelToWavelength=calibrator.calibrate(windowWidth=8,numberWindows=48,windowsPerFrame=8,degree=2)# Stored in cal
+print('Calibrated %d windows with %d acquisitions'%(len(calibrator.columns),calibrator.get_acquisitions()))
+print('Fitted polynomial (m): %s'%pixelToWavelength)
+
+columns,residuals=calibrator.get_residuals()
+plt.figure()
+plt.plot(columns,residuals*1e9,'o')
+plt.xlabel('SLM column')
+plt.ylabel('Residual (nm)')
+plt.show()
@@ -0,0 +1,40 @@
+from pathlib import Path
+import sys
+path_root = Path(__file__).parents[2]
+sys.path.append(str(path_root))
+from src.compute.spectrographmodel import SpectrographModel,get_modelWavelengths,parameterNames,defaultParameters
+from src.compute.linematching import referenceLines
+import matplotlib.pyplot as plt
+import numpy as np
+
+'''
+A snippet of code demonstrating how to fit the spectrograph model of a grating on HgAr lamp spectra taken at several center wavelengths
+The spectra are simulated with a spectrograph slightly misaligned with respect to the default parameters
+'''
+
+gratingDensity=150
+actualParameters=dict(defaultParameters,f=3.25e8,delta=-0.18,gamma=2.03,n0=515.,offsetAdjust=0.004,curvature=2.5e-6)
+centers=np.array([400,500,600,700,800])
+pixels=np.linspace(1,1024,1024)
+rng=np.random.default_rng(0)
+spectra=np.zeros((len(centers),len(pixels)))
+for spectrum,center in zip(spectra,centers):
+    wavelengths=get_modelWavelengths([actualParameters[name] for name in parameterNames],pixels,center,gratingDensity)
+    for line in referenceLines['HgAr'][(referenceLines['HgAr']>wavelengths.min())&(referenceLines['HgAr']<wavelengths.max())]:
+        spectrum+=rng.uniform(0.3,1)*np.exp(-(pixels-np.interp(line,wavelengths,pixels))**2/3)
+    spectrum+=rng.normal(0,2e-3,len(pixels))
+
+model=SpectrographModel()# Give a filename (JSON) to keep the parameters of every grating, e.g. for Pixis.set_spectrographModel
+parameters,residuals=model.fit_spectra(gratingDensity,centers,spectra,lines='HgAr')
+print('Fitted %d lines, rms residual %.4f nm'%(len(residuals),np.sqrt(np.mean(residuals**2))))
+print(parameters)
+model.precompute(np.arange(300,900,10),gratingDensity)
+
+plt.figure()
+for center in [450,650,850]:
+    actual=get_modelWavelengths([actualParameters[name] for name in parameterNames],pixels,center,gratingDensity)
+    plt.plot(pixels,model.get_wavelengths(center,gratingDensity)-actual,label='%d nm'%center)
+plt.xlabel('Pixel')
+plt.ylabel('Axis error (nm)')
+plt.legend()
+plt.show()
@@ -0,0 +1,42 @@
+from pathlib import Path
+import sys
+path_root = Path(__file__).parents[2]
+sys.path.append(str(path_root))
+from src.compute.beams import Beam
+from src.compute.calibration import Calibration
+from src.compute.compositor import Compositor
+from src.compute.zernike import get_zernikePhase,zernikeNames
+from src.compute.SLMBogus import SLM
+from numpy.polynomial import Polynomial as P
+import numpy as np
+import time
+
+'''
+A snippet of code demonstrating how to correct the aberrations of the SLM with Zernike polynomials
+The polynomials are evaluated once per panel size, center and radius, every new correction is then a single tensordot.
+The correction is added to the grating of the beam in the image composed for the SLM.
+'''
+
+slm=SLM(1920,1152)
+cal=Calibration(slm)
+cal.set_pixelToWavelength(P(1e-9*np.array([500,1/20])))
+bm=Beam(cal)
+bm.set_compressionCarrierWave(550e-9)
+bm.set_optimalPhase(P([0,0,1000,500]))
+bm.set_currentPhase(P([0]),mode='relative')
+bm.set_beamVerticalDelimiters([100,1100])
+bm.set_gratingAmplitude(1)
+bm.set_gratingPeriod(10)
+
+compositor=Compositor(slm)
+compositor.set_beams({'beam':bm})
+
+# An aberration correction loop: scan the defocus and write the corrected frames
+print('Polynomials: %s'%', '.join(zernikeNames))
+for power in np.linspace(-1,1,5):
+    start=time.time()
+    correction=get_zernikePhase({'power':power,'astigX':0.2},1920,1152,centerX=960,centerY=600,radius=500)# Coefficients in waves
+    compositor.set_wavefrontCorrection(correction)
+    compositor.write_image()
+    print('Defocus of %.1f waves written in %.3f s'%(power,time.time()-start))
+compositor.set_wavefrontCorrection(None)
@@ -0,0 +1,42 @@
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent)) #add or remove parent based on the file location
+from src.compute.beams import Beam
+from src.compute.calibration import Calibration
+from src.compute.compositor import Compositor
+from src.compute.SLMBogus import SLM
+from src.engine.slmuploader import SLMUploader
+from numpy.polynomial import Polynomial as P
+import numpy as np
+
+'''
+A snippet of code demonstrating how to upload frames to the SLM in the background while the next frames are rendered
+A delay scan renders the grating of every delay while the previous one uploads, and waits for each frame to be live before "measuring"
+'''
+
+slm = SLM(1920, 1152)
+cal = Calibration(slm)
+cal.set_pixelToWavelength(P(1e-9*np.array([500, 1/20])))
+bm = Beam(cal)
+bm.set_compressionCarrierWave(550e-9)
+bm.set_optimalPhase(P([0, 0, 1000, 500]))
+bm.set_currentPhase(P([0]), mode='relative')
+bm.set_beamVerticalDelimiters([100, 1100])
+bm.set_gratingAmplitude(1)
+bm.set_gratingPeriod(10)
+compositor = Compositor(slm)
+compositor.set_beams({'beam': bm})
+
+def measure(frame):
+    print('Frame %d is live, the camera exposure can start' % frame)
+
+with SLMUploader(slm, buffers=2, callback=measure) as uploader:
+    start = time.perf_counter()
+    for delay in np.linspace(-500, 500, 11):
+        bm.set_currentPhase(P([0, delay]), mode='relative')
+        frame = uploader.write_image(compositor.compose()) # Returns as soon as a buffer is free: the next delay is rendered during the upload
+    uploader.wait_presented(frame)
+    print('11 frames rendered and uploaded in %.3f s' % (time.perf_counter() - start))
+    latencies = uploader.get_latencies()
+    print('Mean upload time %.2f ms, largest submit to presentation time %.2f ms' % (1e3*latencies['upload'].mean(), 1e3*latencies['total'].max()))
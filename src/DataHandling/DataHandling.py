@@ -14,6 +14,7 @@ import numpy as np
 import os.path
 from collections import deque
 import shutil
+from compute.spectralaxis import SpectralAxis
 """TO DOs: 
 - consider implementing data storage for several data acquiring devices (e.g. 2 spectrometer simultaneously) 
 """
@@ -73,6 +74,13 @@ class DataHandling(QtCore.QThread):
                                       
         self.beams={}
 
+        # initialize preset bank (PresetBank object holding named beam states and their SLM frames)
+        self.presetBank=None
+
+        # initialize spectral axis (SpectralAxis of the spectrometer wavelengths, rebuilt when new wavelengths are received)
+        self.spectralAxis=None
+        self.spectralAxisSource=None
+
         # initialize BufferWorker
         self.thread = QtCore.QThread()
         self.BufferWorker = BufferWorker(self.temp_filename,self.data_dim)
@@ -202,6 +210,45 @@ class DataHandling(QtCore.QThread):
         self.sendBeams.emit(self.beams)
         return self.beams
 
+    def set_presetBank(self,presetBank):
+        '''
+            Sets the bank in which the beam presets are saved
+            input:
+                - presetBank (PresetBank): The preset bank
+        '''
+        self.presetBank=presetBank
+
+    def save_preset(self,name):
+        '''
+            Saves the current state of the beams and their SLM frame as a named preset in the preset bank
+            input:
+                - name (str): The name of the preset
+        '''
+        self.presetBank.save_preset(name,self.beams)
+
+    def load_preset(self,name):
+        '''
+            Restores the beams saved in a named preset of the preset bank and emits them to connected slots
+            input:
+                - name (str): The name of the preset
+            output:
+                - 2d.array: The precomputed SLM frame of the preset (read-only view of the memory-mapped bank)
+        '''
+        frame=self.presetBank.load_preset(name,self.beams)
+        self.sendBeams.emit(self.beams)
+        return frame
+
+    def get_spectralAxis(self):
+        '''
+            Gets the SpectralAxis of the received spectra, so that its conversions to other units are computed once
+            output:
+                - SpectralAxis: The spectral axis of the spectrometer (wls received in nm)
+        '''
+        if self.spectralAxis is None or self.spectralAxisSource is not self.wls:
+            self.spectralAxis=SpectralAxis(np.asarray(self.wls,dtype=float).reshape(-1)*1e-9,unit='wavelength')
+            self.spectralAxisSource=self.wls
+        return self.spectralAxis
+
     def add_attribute(self,attribute):
         # to be used from measurement each attribute should consist of a tuple of name and content
         attribute_name, attribute_value = attribute
@@ -1,3 +1,5 @@
+import numpy as np
+
 class SLM:
     """
     Bogus SLM class until we have a real one 
@@ -5,5 +7,26 @@ class SLM:
     def __init__(self,width,height):
         self.width=width
         self.height=height
+        self.image=None # Last image written to the SLM
     def get_size(self):
-        return self.width,self.height
\ No newline at end of file
+        return self.width,self.height
+
+    def write_image(self,image_data,is_8_bit=True):
+        '''
+            Stores a copy of the image as the one currently displayed, like the Meadowlark SLM.write_image
+            input:
+                - image_data (nd.array of uint8): The (height,width) image to display
+                - is_8_bit (bool): Whether the image is 8 bit (kept for compatibility)
+            output:
+                - int: 1 when the image was written
+        '''
+        self.image=np.array(image_data,copy=True)
+        return 1
+
+    def get_image(self):
+        '''
+            Gets the image currently displayed
+            output:
+                - nd.array of uint8: The last image written or None
+        '''
+        return self.image
@@ -0,0 +1,150 @@
+#############################################################
+#############################################################
+# This module hosts a procedure locating the rows of the SLM illuminated by the beams
+# Horizontal stripes of grating are displayed and the diffracted signal is measured for each.
+# A coarse scan over blocks of rows finds the bands of the beams, then the edges of every band
+# are found by bisection on the signal of stripes growing from the band's sides, so that
+# the number of frames grows with log(rows) instead of rows.
+#############################################################
+#############################################################
+import numpy as np
+from src.compute.beams import Beam
+
+class BeamLocator:
+    def __init__(self,calibration,spectrometer,period=10,amplitude=1,figureOfMerit=None):
+        """
+        Instantiates a BeamLocator object finding the vertical delimiters of the beams on the SLM
+        Input:
+            calibration: the Calibration object of the SLM. Its phase to gray level table is used to render the stripes
+            spectrometer: the spectrometer measuring the diffracted beams (get_intensities)
+            period: the period of the grating of the stripes in pixels
+            amplitude: the amplitude of the grating of the stripes in units of 2*pi
+            figureOfMerit: (callable) function of the measured intensities giving the diffracted signal. Integrated intensity by default
+        output:
+            BeamLocator Object
+        """
+        self.calibration=calibration
+        self.SLM=calibration.SLM
+        self.spectrometer=spectrometer
+        self.figureOfMerit=figureOfMerit if figureOfMerit is not None else np.sum
+        width,height=self.SLM.get_size()
+        # Flat phase grating of the whole SLM as gray levels (rows,columns), copied in the stripes of every frame
+        grating=Beam.generate_2Dgrating(amplitude,period,np.zeros(width),num=height)
+        self.gratingImage=np.ascontiguousarray(calibration.get_grayscaleAtPhase(grating).T)
+        self.image=np.zeros_like(self.gratingImage)
+        self.blockSignals=None # Signal of every block of the coarse scan
+        self.acquisitions=0
+
+    def measure_stripe(self,start,end):
+        '''
+            Displays the grating on rows start to end only and measures the diffracted signal
+            input:
+                - start,end (int): the first and end rows of the stripe (end excluded)
+            output:
+                - float: the diffracted signal
+        '''
+        self.image[:]=0
+        self.image[start:end]=self.gratingImage[start:end]
+        self.SLM.write_image(self.image,self.image.dtype==np.uint8)
+        self.acquisitions+=1
+        return self.figureOfMerit(np.asarray(self.spectrometer.get_intensities()))
+
+    def find_bands(self,numberBlocks=16,threshold=0.05):
+        '''
+            Finds the groups of contiguous blocks of rows diffracting a signal. Beams must be separated by at least one block without signal.
+            input:
+                - numberBlocks (int): the number of blocks the SLM rows are divided in
+                - threshold (float): the minimal signal of a block relative to the highest one
+            output:
+                - list of list: the [first block, end block] of every band, from the top of the SLM
+                - 1d.array: the first row of every block and the end row of the last one
+        '''
+        height=self.SLM.get_size()[1]
+        boundaries=np.linspace(0,height,numberBlocks+1).round().astype(int)
+        self.blockSignals=np.array([self.measure_stripe(start,end) for start,end in zip(boundaries[:-1],boundaries[1:])])
+        lit=self.blockSignals>threshold*self.blockSignals.max()
+        bands=[]
+        for block in np.flatnonzero(lit):
+            if bands and bands[-1][1]==block:
+                bands[-1][1]=block+1
+            else:
+                bands.append([block,block+1])
+        return bands,boundaries
+
+    def find_edge(self,start,end,target,fromTop=True):
+        '''
+            Finds by bisection the row at which the signal of a stripe growing from one side of a region reaches a target
+            input:
+                - start,end (int): the first and end rows of the region (end excluded)
+                - target (float): the signal to reach
+                - fromTop (bool): when True the stripe grows from start (rows start to m), otherwise from end (rows m to end)
+            output:
+                - int: the smallest m reaching the target when growing from the top, the largest one otherwise
+        '''
+        low,high=start,end
+        if fromTop:
+            while high-low>1:
+                middle=(low+high)//2
+                if self.measure_stripe(start,middle)>=target:
+                    high=middle
+                else:
+                    low=middle
+            return high
+        while high-low>1:
+            middle=(low+high)//2
+            if self.measure_stripe(middle,end)>=target:
+                low=middle
+            else:
+                high=middle
+        return low
+
+    def locate(self,numberBlocks=16,threshold=0.05,fraction=0.01):
+        '''
+            Finds the rows illuminated by every beam
+            The delimiters of a band are the rows beyond which less than fraction of the band's signal is diffracted on either side
+            input:
+                - numberBlocks (int): the number of blocks of the coarse scan. Beams must be separated by at least one block without signal
+                - threshold (float): the minimal signal of a block relative to the highest one in the coarse scan
+                - fraction (float): the fraction of the signal of a band left out on each side of the delimiters
+            output:
+                - list of list: the [beginning, end] rows (end excluded) of every band, from the top of the SLM
+        '''
+        height=self.SLM.get_size()[1]
+        bands,boundaries=self.find_bands(numberBlocks,threshold)
+        delimiters=[]
+        for firstBlock,endBlock in bands:
+            # The region extends one block on each side to include the tails of the beam
+            regionStart=boundaries[max(firstBlock-1,0)]
+            regionEnd=boundaries[min(endBlock+1,numberBlocks)]
+            target=fraction*self.measure_stripe(regionStart,regionEnd)
+            beginning=self.find_edge(regionStart,regionEnd,target,fromTop=True)-1
+            end=self.find_edge(regionStart,regionEnd,target,fromTop=False)+1
+            delimiters.append([int(max(beginning,0)),int(min(end,height))])
+        return delimiters
+
+    def set_delimiters(self,beams,**kwargs):
+        '''
+            Locates the beams and sets their vertical delimiters. The bands are attributed from the top of the SLM to the beams
+            ordered by their current vertical position (beams with the same position, e.g. without delimiters, keep the order of the dictionary)
+            input:
+                - beams (dict): the Beam objects by name (e.g. DataHandling.beams)
+                - kwargs: the arguments of locate
+            output:
+                - dict: the [beginning, end] rows of every beam
+        '''
+        delimiters=self.locate(**kwargs)
+        if len(delimiters)!=len(beams):
+            raise(ValueError('Found %d illuminated bands on the SLM for %d beams'%(len(delimiters),len(beams))))
+        names=sorted(beams,key=lambda name: beams[name].get_beamVerticalDelimiters()[0])
+        beamDelimiters={}
+        for name,band in zip(names,delimiters):
+            beams[name].set_beamVerticalDelimiters(band)
+            beamDelimiters[name]=band
+        return beamDelimiters
+
+    def get_acquisitions(self):
+        '''
+            output:
+                - int: the number of signals measured since the locator was instantiated
+        '''
+        return self.acquisitions
@@ -9,8 +9,11 @@ from src.compute.calibration import Calibration
 from scipy.constants import c
 from scipy.signal import sawtooth
 from src.compute import colbertoutils as co
+from src.compute import diffraction
+from src.compute.spectralaxis import convert
 from numpy.polynomial import Polynomial as P
 from scipy.constants import pi
+import hashlib
 
 class Beam:
     def __init__(self,currentCalibration):
@@ -32,6 +35,16 @@ class Beam:
         self.beamVerticalDelimiters=None # Vertical position delimiter of beam on SLM in pixels. Default is whole SLM
         self.phaseGratingAmplitudeMask=np.ones(self.beamHorizontalDelimiters[1])
         self.maskOn=False #Is the mask enabled in the output grating?
+        self.phaseGratingPhaseCorrection=None # Phase subtracted at every column to compensate the phase of the first order at partial grating depths (rad)
+        self.targetAmplitude=None # First order amplitude set with set_targetAmplitude, from which the mask and correction are recomputed when the grating changes
+        self.detuningAxis=None # Cached angular frequency offset from the compression carrier at every SLM column (rad.Hz)
+        self.detuningAxisVersion=None # Calibration version for which detuningAxis was computed
+        self.phaseBasis={} # Cached Vandermonde matrices of the detuning axis by unit. Cleared with detuningAxis
+        self.gratingArgument=None # Wrapped sawtooth argument of the last full grating synthesis (columns,rows)
+        self.gratingArgumentState=None # Period, size, detuning axis and high order phase terms for which gratingArgument was computed
+        self.gratingArgumentPhase=None # Constant and linear phase terms for which gratingArgument was computed
+        self.shiftedGratingArgument=None # Work buffer receiving the shifted gratingArgument in incremental updates
+        self.frameCache=None # FrameCache object in which rendered gratings are stored. No caching when None
 
     def set_beamVerticalDelimiters(self,delimiters):
         '''
@@ -49,6 +62,24 @@ class Beam:
         '''
         self.beamHorizontalDelimiters=delimiters
 
+    def get_beamVerticalDelimiters(self):
+        '''
+            Gets the vertical delimiters of the beam
+            output:
+                - list: The vertical beginning and end pixels of the beam (0 indexed) [beginning, end]. The whole SLM height if not set
+        '''
+        if self.beamVerticalDelimiters is None:
+            return [0,self.calibration.SLM.get_size()[1]]
+        return [int(delimiter) for delimiter in self.beamVerticalDelimiters]
+
+    def get_beamHorizontalDelimiters(self):
+        '''
+            Gets the horizontal delimiters of the beam
+            output:
+                - list: The horizontal beginning and end pixels of the beam (0 indexed) [beginning, end]
+        '''
+        return [int(delimiter) for delimiter in self.beamHorizontalDelimiters]
+
     def set_compressionCarrierWave(self,compCarrierWave):
         """
         Sets the wavelength around which the phase coefficients for compression are defined
@@ -56,6 +87,7 @@ class Beam:
             wavelength: Compression carrier wavelength in m
         """
         self.compressionCarrierFreq=co.waveToAngFreq(compCarrierWave)
+        self.detuningAxis=None
 
     def get_compressionCarrier(self,unit='ang_frequency'):
         """
@@ -69,11 +101,7 @@ class Beam:
         output:
             float: Compression carrier in specified units
         """
-        conversionFunction={'wavelength':co.angFreqToWave,
-                            'frequency':co.angFreqToFreq,
-                            'ang_frequency': lambda x: x,
-                            'energy':co.angFreqToeV}
-        return conversionFunction[unit](self.compressionCarrierFreq)
+        return convert(self.compressionCarrierFreq,'ang_frequency',unit)
     
     def set_optimalPhase(self,phasePolynomial,unit='fs'):
         '''
@@ -129,6 +157,78 @@ class Beam:
         '''
         return np.arange(self.calibration.SLM.get_size()[0])
 
+    def get_detuningAxis(self):
+        '''
+            Returns the angular frequency offset from the compression carrier at every column of the SLM
+            The axis is cached and recomputed only when the calibration or the compression carrier changes
+            output:
+                - nd.array of float: the detuning at every SLM column (in rad.Hz, read-only)
+        '''
+        calibrationVersion=self.calibration.get_pixelToWavelengthVersion()
+        if self.detuningAxis is None or self.detuningAxisVersion!=calibrationVersion:
+            detuningAxis=self.calibration.get_spectralAxis(unit='ang_frequency')-self.get_compressionCarrier()
+            detuningAxis.flags.writeable=False
+            self.detuningAxis=detuningAxis
+            self.detuningAxisVersion=calibrationVersion
+            self.phaseBasis={}
+        return self.detuningAxis
+
+    def get_phaseBasis(self,order,unit='fs'):
+        '''
+            Returns the Vandermonde matrix of the detuning axis, i.e. the powers of the detuning at every SLM column
+            The matrix is cached for the current calibration and compression carrier and only grows when a higher order is requested
+            input:
+                - order (int): The number of powers (number of polynomial coefficients)
+                - unit (str, default 'fs'): The time unit of the coefficients the basis applies to ('fs' or 's')
+            output:
+                - 2d.array: The (columns,order) matrix of powers of the detuning (read-only)
+        '''
+        detuningAxis=self.get_detuningAxis()
+        basis=self.phaseBasis.get(unit)
+        if basis is None or basis.shape[1]<order:
+            scale=1e-15 if unit=='fs' else 1
+            basis=np.polynomial.polynomial.polyvander(detuningAxis*scale,order-1)
+            basis.flags.writeable=False
+            self.phaseBasis[unit]=basis
+        return basis[:,:order]
+
+    def evaluate_phases(self,phases,mode='relative',unit='fs',indices=None):
+        '''
+            Evaluates N phase profiles on the SLM columns with a single matrix product against the cached Vandermonde basis
+            The inputs are not modified.
+            input:
+                - phases (list of numpy polynomial series or 2d.array): N phase profiles taking arguments in angular frequency (rad.Hz),
+                    converted to power series (any numpy series, e.g. Chebyshev, with any domain)
+                    or a (N,order) matrix of their coefficients (lowest power first)
+                - mode (string): Specifies if the phases are relative to the optimal phase profile ('relative', default) or absolute ('absolute')
+                - unit (str, default 'fs'): The units in which the phase coefficients are provided.
+                - indices (nd.array of int): (default none) the pixel indices at which to sample the phases.
+                    By default, the phases are sampled at every column of the SLM
+            output:
+                - 2d.array: The (N,columns) phase profiles (in rad)
+        '''
+        coefficients=self.get_phaseCoefficients(phases,mode=mode,unit=unit,outputUnit='fs')
+        basis=self.get_phaseBasis(coefficients.shape[1],unit='fs')
+        if indices is not None:
+            basis=basis[indices]
+        return coefficients@basis.T
+
+    def get_detuningAtPixel(self,indices=None):
+        '''
+            Returns the angular frequency offset from the compression carrier at the horizontal pixel indices provided
+            input:
+                - indices (nd.array of int): (default none) the pixel indices at which to sample the detuning
+                    By default, the detuning is sampled at every column of the SLM
+            output:
+                -  nd.array of float: the detuning at the provided pixel column indices (in rad.Hz)
+        '''
+        if indices is None:
+            return self.get_detuningAxis()
+        indices=np.asarray(indices)
+        if np.issubdtype(indices.dtype,np.integer):
+            return self.get_detuningAxis()[indices]
+        return self.calibration.get_spectrumAtPixel(indices,unit='ang_frequency')-self.get_compressionCarrier()
+
     def get_sampledCurrentPhase(self,indices=None):
         '''
             Returns the current phase at the horizontal pixel indices provided
@@ -139,10 +239,7 @@ class Beam:
                 -  nd.array of float: the current phase at the provided pixel column indices (in rad)
         
         '''
-        if indices is None:
-            indices=self.get_horizontalIndices()
-        angFreq=self.calibration.get_spectrumAtPixel(indices,unit='ang_frequency')-self.get_compressionCarrier()
-        return self.currentPhasePolynomial(angFreq)
+        return self.currentPhasePolynomial(self.get_detuningAtPixel(indices))
 
 
     def get_optimalPhase(self):
@@ -162,8 +259,7 @@ class Beam:
                 -  nd.array of float: the optimal phase at the provided pixel column indices (in rad)
         
         '''
-        angFreq=self.calibration.get_spectrumAtPixel(indices,unit='ang_frequency')-self.get_compressionCarrier()
-        return self.optimalPhasePolynomial(angFreq)
+        return self.optimalPhasePolynomial(self.get_detuningAtPixel(indices))
     
     def set_gratingAmplitudeMask(self, mask):
         '''
@@ -173,8 +269,67 @@ class Beam:
         '''
         if mask.shape[0]==self.get_horizontalIndices().shape[0]:
             self.phaseGratingAmplitudeMask=mask
+            self.phaseGratingPhaseCorrection=None
+            self.targetAmplitude=None
         else:
             raise(IndexError("The mask length must match the number of columns on the SLM's."))
+
+    def get_gratingAmplitudeMask(self):
+        '''
+            Gets the amplitude mask of the grating
+            output:
+                - 1d.array: The mask value (fraction of the grating amplitude) at every column of the SLM
+        '''
+        return self.phaseGratingAmplitudeMask
+
+    def set_targetAmplitude(self,targetAmplitude):
+        '''
+            Shapes the spectral amplitude of the diffracted beam. The amplitude mask is set to the grating depths giving the target first order amplitude.
+            They are found in the efficiency map measured on the SLM when the calibration holds one for the current grating amplitude and period (see Calibration.set_efficiencyMap),
+            otherwise in the inverse diffraction efficiency table of the ideal grating (see diffraction.get_efficiencyTable).
+            The phase of the first order changing with the depth is compensated so that the current phase is still the one imparted. The mask is enabled.
+            The target is kept so that the depths and phase correction are recomputed when the grating amplitude or period changes.
+            input:
+                - targetAmplitude (1d.array): The field amplitude of the first order at each SLM column from 0 to 1 (amplitude diffracted by the full grating).
+                    The length must match the number of columns on the SLM's.
+        '''
+        targetAmplitude=np.asarray(targetAmplitude,dtype=float)
+        depths=self.calibration.get_depthForAmplitude(targetAmplitude,self.get_gratingAmplitude(),self.get_gratingPeriod())
+        if depths is None:
+            depths,phaseCorrection=diffraction.get_depthForAmplitude(targetAmplitude,self.get_gratingAmplitude(),self.get_gratingPeriod())
+        else:
+            phaseCorrection=diffraction.get_phaseOffsetAtDepth(depths,self.get_gratingAmplitude(),self.get_gratingPeriod())
+        self.set_gratingAmplitudeMask(depths)
+        self.phaseGratingPhaseCorrection=phaseCorrection
+        self.targetAmplitude=targetAmplitude
+        self.set_maskStatus(True)
+
+    def get_targetAmplitude(self):
+        '''
+            Gets the first order amplitude set with set_targetAmplitude
+            output:
+                - 1d.array: The target field amplitude at each SLM column, or None when the mask was not set from a target
+        '''
+        return self.targetAmplitude
+
+    def update_targetAmplitude(self):
+        '''
+            Recomputes the amplitude mask and phase correction of the target amplitude for the current grating amplitude and period
+        '''
+        if self.targetAmplitude is not None and self.get_gratingAmplitude() is not None and self.get_gratingPeriod() is not None:
+            maskOn=self.maskOn
+            self.set_targetAmplitude(self.targetAmplitude)
+            self.set_maskStatus(maskOn)
+
+    def get_gratingPhaseCorrection(self):
+        '''
+            Gets the phase subtracted at every column to compensate the phase of the first order at partial grating depths (see set_targetAmplitude)
+            output:
+                - 1d.array: The phase correction at every column (rad) or None when no correction applies
+        '''
+        if self.maskOn:
+            return self.phaseGratingPhaseCorrection
+        return None
     def set_maskStatus(self,maskOn):
         '''
             Sets wether the mask should be applied or not.
@@ -189,8 +344,11 @@ class Beam:
             Sets the amplitude of the grating in multiples of 2*pi
             input:
                 - amplitude (float): The amplitude of the phase grating in units of 2*pi
+            The amplitude mask and phase correction of a target amplitude (see set_targetAmplitude) are recomputed for the new grating.
         '''
-        self.phaseGratingAmplitude=amplitude
+        if amplitude!=self.phaseGratingAmplitude:
+            self.phaseGratingAmplitude=amplitude
+            self.update_targetAmplitude()
 
     def get_gratingAmplitude(self):
         '''
@@ -205,8 +363,11 @@ class Beam:
             Sets the period of the grating in units of pixels
             input:
                 - period (int): The period of the phase grating in units of pixels 
+            The amplitude mask and phase correction of a target amplitude (see set_targetAmplitude) are recomputed for the new grating.
         '''
-        self.phaseGratingPeriod=int(period)
+        if int(period)!=self.phaseGratingPeriod:
+            self.phaseGratingPeriod=int(period)
+            self.update_targetAmplitude()
 
     def get_gratingPeriod(self):
         '''
@@ -216,23 +377,240 @@ class Beam:
         '''
         return self.phaseGratingPeriod
 
+    def set_frameCache(self,frameCache):
+        '''
+            Sets the cache in which the rendered gratings are stored. The same cache can be shared by several beams.
+            input:
+                - frameCache (FrameCache): The cache to use or None to disable caching
+        '''
+        self.frameCache=frameCache
+
+    def get_frameCache(self):
+        '''
+            Gets the cache in which the rendered gratings are stored
+            output:
+                - (FrameCache): The cache in use or None if caching is disabled
+        '''
+        return self.frameCache
+
+    def get_stateKey(self):
+        '''
+            Gets a hash of every property of the beam determining the output of makeGrating
+            (current phase polynomial, grating amplitude and period, amplitude mask when enabled, delimiters, compression carrier and calibration)
+            output:
+                - str: The hexadecimal digest describing the current beam state
+        '''
+        stateHash=hashlib.blake2b(digest_size=16)
+        for polynomial in [self.currentPhasePolynomial,self.calibration.pixelToWavelength]:
+            stateHash.update(np.asarray(polynomial.coef,dtype=float).tobytes())
+            stateHash.update(np.asarray(polynomial.domain,dtype=float).tobytes())
+            stateHash.update(np.asarray(polynomial.window,dtype=float).tobytes())
+        stateHash.update(repr((self.phaseGratingAmplitude,self.phaseGratingPeriod,self.compressionCarrierFreq,self.maskOn,
+                               self.get_beamVerticalDelimiters(),self.get_beamHorizontalDelimiters(),self.calibration.SLM.get_size())).encode())
+        if self.maskOn:
+            stateHash.update(np.asarray(self.phaseGratingAmplitudeMask,dtype=float).tobytes())
+        if self.get_gratingPhaseCorrection() is not None:
+            stateHash.update(self.get_gratingPhaseCorrection().tobytes())
+        return stateHash.hexdigest()
+
+    def get_state(self):
+        '''
+            Gets a snapshot of every property of the beam set by the user (phases, grating, mask, delimiters and compression carrier), e.g. to save it in a PresetBank
+            The calibration is not included.
+            output:
+                - dict: The beam state made of JSON serializable values (phases in powers of s)
+        '''
+        def polynomialState(polynomial):
+            if polynomial is None:
+                return None
+            return {'coef':np.asarray(polynomial.coef,dtype=float).tolist(),
+                    'domain':np.asarray(polynomial.domain,dtype=float).tolist(),
+                    'window':np.asarray(polynomial.window,dtype=float).tolist()}
+        return {'optimalPhase':polynomialState(self.optimalPhasePolynomial),
+                'currentPhase':polynomialState(self.currentPhasePolynomial),
+                'gratingAmplitude':self.phaseGratingAmplitude,
+                'gratingPeriod':self.phaseGratingPeriod,
+                'compressionCarrierFreq':self.compressionCarrierFreq,
+                'verticalDelimiters':None if self.beamVerticalDelimiters is None else self.get_beamVerticalDelimiters(),
+                'horizontalDelimiters':self.get_beamHorizontalDelimiters(),
+                'amplitudeMask':np.asarray(self.phaseGratingAmplitudeMask,dtype=float).tolist(),
+                'maskOn':bool(self.maskOn),
+                'phaseCorrection':None if self.phaseGratingPhaseCorrection is None else self.phaseGratingPhaseCorrection.tolist(),
+                'targetAmplitude':None if self.targetAmplitude is None else self.targetAmplitude.tolist()}
+
+    def set_state(self,state):
+        '''
+            Restores a snapshot of the beam properties taken with get_state
+            input:
+                - state (dict): The beam state returned by get_state
+        '''
+        def statePolynomial(polynomialState):
+            if polynomialState is None:
+                return None
+            return P(polynomialState['coef'],domain=polynomialState['domain'],window=polynomialState['window'])
+        self.optimalPhasePolynomial=statePolynomial(state['optimalPhase'])
+        self.currentPhasePolynomial=statePolynomial(state['currentPhase'])
+        self.phaseGratingAmplitude=state['gratingAmplitude']
+        self.phaseGratingPeriod=state['gratingPeriod']
+        if state['compressionCarrierFreq']!=self.compressionCarrierFreq:
+            self.compressionCarrierFreq=state['compressionCarrierFreq']
+            self.detuningAxis=None
+        self.set_beamVerticalDelimiters(state['verticalDelimiters'])
+        self.set_beamHorizontalDelimiters(state['horizontalDelimiters'])
+        self.set_gratingAmplitudeMask(np.array(state['amplitudeMask']))
+        if state['phaseCorrection'] is not None:
+            self.phaseGratingPhaseCorrection=np.array(state['phaseCorrection'])
+        if state.get('targetAmplitude') is not None: # Absent from the states saved before the target was kept
+            self.targetAmplitude=np.array(state['targetAmplitude'])
+        self.set_maskStatus(state['maskOn'])
+
     def makeGrating(self):
         '''
             Makes the phase grating using the current phase, amplitude and period
+            If a frame cache is set, the grating is served from the cache when the beam state was already rendered.
+            The returned array is then read-only, whether it was stored or too large for the memory budget of the cache.
             output:
                 - 2d.array: A 2D phase array corresponding to the current phase profile 
         '''
-        phaseGratingImage=[]
-        numberVerticalPixels=self.beamVerticalDelimiters[1]-self.beamVerticalDelimiters[0]
-        phaseProfile=self.get_sampledCurrentPhase()
-        for mask,phase in zip(self.phaseGratingAmplitudeMask,phaseProfile):
-            row=self.generate_1Dgrating(self.get_gratingAmplitude(),self.get_gratingPeriod(),phase,num=numberVerticalPixels)
-            if self.maskOn:
-                row=mask*row
-            phaseGratingImage.append(row)
-        phaseGratingImage=np.array(phaseGratingImage)
+        if self.frameCache is None:
+            return self.renderGrating()
+        stateKey=self.get_stateKey()
+        phaseGratingImage=self.frameCache.get(stateKey)
+        if phaseGratingImage is None:
+            phaseGratingImage=self.renderGrating()
+            self.frameCache.put(stateKey,phaseGratingImage)
+        return phaseGratingImage
+
+    def renderGrating(self):
+        '''
+            Computes the phase grating using the current phase, amplitude and period (without using the frame cache)
+            The wrapped sawtooth argument of the last full synthesis is kept. When only the constant and linear terms of the phase
+            changed since (e.g. phase cycling or delay scans), the grating is updated by shifting the argument of each column instead of being synthesized again.
+            The amplitude and mask are applied afterwards and can change freely.
+            output:
+                - 2d.array: A 2D phase array corresponding to the current phase profile 
+        '''
+        verticalDelimiters=self.get_beamVerticalDelimiters()
+        numberVerticalPixels=verticalDelimiters[1]-verticalDelimiters[0]
+        detuningAxis=self.get_detuningAxis()
+        phaseCoefficients=self.currentPhasePolynomial.convert().coef
+        phaseCorrection=self.get_gratingPhaseCorrection()
+        argumentState=(self.get_gratingPeriod(),numberVerticalPixels,id(self.calibration),self.detuningAxisVersion,
+                       self.compressionCarrierFreq,tuple(phaseCoefficients[2:]),None if phaseCorrection is None else phaseCorrection.tobytes())
+        if argumentState==self.gratingArgumentState:
+            # Only the constant and linear phase terms changed: shift the sawtooth of every column by the phase difference
+            phaseShift=np.zeros(2)
+            phaseShift[:min(2,len(phaseCoefficients))]=phaseCoefficients[:2]
+            phaseShift-=self.gratingArgumentPhase
+            columnShift=np.mod(phaseShift[0]+phaseShift[1]*detuningAxis,2*pi)
+            if self.get_gratingAmplitude()==1:
+                # The grating is then mod(pi-argument,2*pi): the shift is a per-column offset added to the output directly
+                phaseGratingImage=np.subtract(np.mod(pi+columnShift,2*pi)[:,np.newaxis],self.gratingArgument)
+                np.add(phaseGratingImage,2*pi,out=phaseGratingImage,where=phaseGratingImage<0)
+                if self.maskOn:
+                    phaseGratingImage*=self.phaseGratingAmplitudeMask[:,np.newaxis]
+                return phaseGratingImage
+            if self.shiftedGratingArgument is None or self.shiftedGratingArgument.shape!=self.gratingArgument.shape:
+                self.shiftedGratingArgument=np.empty_like(self.gratingArgument)
+            argument=np.subtract(self.gratingArgument,columnShift[:,np.newaxis],out=self.shiftedGratingArgument)
+            np.add(argument,2*pi,out=argument,where=argument<0)
+        else:
+            phaseProfile=self.currentPhasePolynomial(detuningAxis)
+            if phaseCorrection is not None:
+                phaseProfile-=phaseCorrection
+            argument=self.generate_gratingArgument(self.get_gratingPeriod(),phaseProfile,num=numberVerticalPixels)
+            argument.flags.writeable=False
+            self.gratingArgument=argument
+            self.gratingArgumentState=argumentState
+            self.gratingArgumentPhase=np.zeros(2)
+            self.gratingArgumentPhase[:min(2,len(phaseCoefficients))]=phaseCoefficients[:2]
+        phaseGratingImage=self.generate_gratingFromArgument(self.get_gratingAmplitude(),argument)
+        if self.maskOn:
+            phaseGratingImage*=self.phaseGratingAmplitudeMask[:,np.newaxis]
         return phaseGratingImage 
 
+    def get_phaseCoefficients(self,phases,mode='relative',unit='fs',outputUnit='s'):
+        '''
+            Converts a sequence of phase profiles into a matrix of power series coefficients, without modifying the inputs
+            input:
+                - phases (list of numpy polynomial series or 2d.array): N phase profiles taking arguments in angular frequency (rad.Hz),
+                    converted to power series (any numpy series, e.g. Chebyshev, with any domain)
+                    or a (N,order) matrix of their coefficients (lowest power first)
+                - mode (string): Specifies if the phases are relative to the optimal phase profile ('relative', default) or absolute ('absolute')
+                - unit (str, default 'fs'): The units in which the phase coefficients are provided.
+                - outputUnit (str, default 's'): The units in which the phase coefficients are returned ('s' or 'fs')
+            output:
+                - 2d.array: The (N,order) matrix of coefficients in powers of outputUnit
+        '''
+        if isinstance(phases,np.ndarray):
+            coefficients=np.atleast_2d(np.array(phases,dtype=float))
+        else:
+            polynomialCoefficients=[phase.convert(kind=P).coef if hasattr(phase,'convert') else np.asarray(phase,dtype=float) for phase in phases]
+            coefficients=np.zeros((len(polynomialCoefficients),max(len(coef) for coef in polynomialCoefficients)))
+            for coefficientRow,coef in zip(coefficients,polynomialCoefficients):
+                coefficientRow[:len(coef)]=coef
+        if unit=='fs':
+            coefficients*=1e-15**np.arange(coefficients.shape[1])
+        if mode=='relative':
+            optimalCoefficients=self.optimalPhasePolynomial.convert(kind=P).coef
+            order=max(coefficients.shape[1],len(optimalCoefficients))
+            coefficients=np.pad(coefficients,((0,0),(0,order-coefficients.shape[1])))
+            coefficients[:,:len(optimalCoefficients)]+=optimalCoefficients
+        if outputUnit=='fs':
+            coefficients/=1e-15**np.arange(coefficients.shape[1])
+        return coefficients
+
+    def makeGratingSequence(self,phases,mode='relative',unit='fs',chunkSize=8,filename=None,fullPanel=False):
+        '''
+            Renders the SLM frames of a scan over N phase profiles in vectorized chunks
+            The grating amplitude, period, mask and delimiters are the current ones of the beam. The current phase is left untouched.
+            Since the sawtooth is periodic along the rows, a single period is synthesized per column and repeated over the rows.
+            Rounding then differs from makeGrating on a few pixels (about 1e-5 of them) lying on a gray level boundary or on the sawtooth discontinuity.
+            input:
+                - phases (list of numpy polynomial series or 2d.array): N phase profiles taking arguments in angular frequency (rad.Hz),
+                    converted to power series (any numpy series, e.g. Chebyshev, with any domain)
+                    or a (N,order) matrix of their coefficients (lowest power first)
+                - mode (string): Specifies if the phases are relative to the optimal phase profile ('relative', default) or absolute ('absolute')
+                - unit (str, default 'fs'): The units in which the phase coefficients are provided.
+                - chunkSize (int): Number of frames computed at once. Bounds the memory used by the intermediate float arrays
+                - filename (str): (default None) When provided, the frames are written to a memory-mapped .npy file at this path instead of memory
+                - fullPanel (bool): When True the frames cover the whole SLM (zero outside of the beam's vertical delimiters),
+                    otherwise only the rows within the beam's vertical delimiters
+            output:
+                - 3d.array: The (N,rows,columns) stack of gray level frames (dtype of the calibration's phase to gray level table, uint8 by default)
+        '''
+        phaseProfiles=self.evaluate_phases(phases,mode=mode,unit=unit)
+        if self.get_gratingPhaseCorrection() is not None:
+            phaseProfiles-=self.get_gratingPhaseCorrection()
+        numberFrames=phaseProfiles.shape[0]
+        numberColumns,numberRows=self.calibration.SLM.get_size()
+        verticalDelimiters=self.get_beamVerticalDelimiters()
+        numberVerticalPixels=verticalDelimiters[1]-verticalDelimiters[0]
+        if fullPanel:
+            shape=(numberFrames,numberRows,numberColumns)
+            rows=slice(verticalDelimiters[0],verticalDelimiters[1])
+        else:
+            shape=(numberFrames,numberVerticalPixels,numberColumns)
+            rows=slice(None)
+        dtype=self.calibration.get_phaseToGrayscale().dtype
+        if filename is None:
+            frames=np.zeros(shape,dtype=dtype)
+        else:
+            frames=np.lib.format.open_memmap(filename,mode='w+',dtype=dtype,shape=shape)
+        period=min(self.get_gratingPeriod(),numberVerticalPixels)
+        for start in range(0,numberFrames,chunkSize):
+            stop=min(start+chunkSize,numberFrames)
+            phaseGratingPeriods=self.generate_2Dgrating(self.get_gratingAmplitude(),self.get_gratingPeriod(),phaseProfiles[start:stop],num=period)
+            if self.maskOn:
+                phaseGratingPeriods*=self.phaseGratingAmplitudeMask[:,np.newaxis]
+            grayscalePeriods=np.ascontiguousarray(self.calibration.get_grayscaleAtPhase(phaseGratingPeriods).transpose(0,2,1))
+            beamFrames=frames[start:stop,rows,:]
+            for row in range(period):
+                beamFrames[:,row::period,:]=grayscalePeriods[:,row,np.newaxis,:]
+        if filename is not None:
+            frames.flush()
+        return frames
+
     @staticmethod 
     def generate_1Dgrating(amplitude,period,phase,num):
         '''
@@ -247,6 +625,62 @@ class Beam:
         offset=phase/(2*pi)*period
         y=amplitude*sawtooth(2*pi*(indices-offset)/period,width=0) % 2*pi
         return y
+
+    @staticmethod
+    def generate_2Dgrating(amplitude,period,phases,num):
+        '''
+            Generates the sawtooth patterns of all the columns of the SLM in a single vectorized pass.
+            Gives the same output as stacking generate_1Dgrating over every phase, without the Python loop.
+            input:
+                amplitude: (float) number between 0 and 1 setting the amplitude of the grating to amplitude*2*pi
+                period: period of the sawtooth pattern in units of pixels
+                phases: (nd.array) phases to be imparted on the diffracted beam, one per column. Leading dimensions are broadcasted (e.g. (N,columns) for N frames)
+                num: the number of pixels in the sawtooth pattern  
+            output:
+                - nd.array: The phase gratings of shape phases.shape+(num,) (in rad)
+        '''
+        return Beam.generate_gratingFromArgument(amplitude,Beam.generate_gratingArgument(period,phases,num))
+
+    @staticmethod
+    def generate_gratingArgument(period,phases,num):
+        '''
+            Generates the wrapped argument of the sawtooth patterns of all the columns of the SLM (mod(2*pi*(indices-offset)/period,2*pi), see generate_1Dgrating)
+            input:
+                period: period of the sawtooth pattern in units of pixels
+                phases: (nd.array) phases to be imparted on the diffracted beam, one per column. Leading dimensions are broadcasted
+                num: the number of pixels in the sawtooth pattern  
+            output:
+                - nd.array: The arguments of shape phases.shape+(num,) within [0,2*pi) (in rad)
+        '''
+        phases=np.asarray(phases,dtype=float)
+        indices=np.arange(num)
+        offset=phases/(2*pi)*period
+        argument=2*pi*(indices-offset[...,np.newaxis])/period
+        np.mod(argument,2*pi,out=argument)
+        return argument
+
+    @staticmethod
+    def generate_gratingFromArgument(amplitude,argument):
+        '''
+            Generates the sawtooth patterns from their wrapped argument (see generate_gratingArgument)
+            input:
+                amplitude: (float) number between 0 and 1 setting the amplitude of the grating to amplitude*2*pi
+                argument: (nd.array) the wrapped argument of the sawtooth patterns (left untouched)
+            output:
+                - nd.array: The phase gratings (in rad)
+        '''
+        # Same operations as scipy.signal.sawtooth with width=0 (i.e. (pi-mod(t,2*pi))/pi) done in place on a single buffer
+        y=np.subtract(pi,argument)
+        y/=pi
+        y*=amplitude
+        if abs(amplitude)<=1:
+            # y is then within [-1,1] and the modulo reduces to shifting negative values by 2 (much cheaper than np.mod)
+            np.add(y,2,out=y,where=y<0)
+        else:
+            np.mod(y,2,out=y)
+        y*=pi
+        return y
+
     @staticmethod
     def convertPhaseCoeffUnits(phasePolynomial,unit='fs'):
         '''
@@ -2,7 +2,8 @@
 # This class hosts functions, methods and attributes related to Colbert calibrations
 
 import numpy as np
-import src.compute.colbertoutils as co
+from src.compute import linematching
+from src.compute.spectralaxis import SpectralAxis,convert
 
 class Calibration():
 
@@ -16,18 +17,56 @@ class Calibration():
         self.SLM=SLM # SLM Hosts all parameters related to the SLM currently in use
         
         self.pixelToWavelength=None
+        self.pixelToWavelengthVersion=0 # Incremented every time the pixel to wavelength calibration changes
+        self.spectralAxis=None # SpectralAxis of the SLM columns. Cleared when the calibration changes
         self.phaseToGrayscale=None
+        self.phaseToGrayscaleVersion=0 # Incremented every time the phase to gray level lookup table changes
+        self.efficiencyDepths=None # Grating depths (amplitude mask values) at which the efficiency map was measured
+        self.efficiencyMap=None # Diffracted field amplitude (columns,depths) relative to the highest of each column, made non-decreasing with depth
+        self.efficiencyGrating=None # (amplitude,period) of the grating with which the efficiency map was measured
         
     def set_pixelToWavelength(self,polynomial):
         '''
         Sets the pixel to wavelength calibration polynomial
+        Invalidates the cached spectral axes and increments the calibration version
         input:
             - polynomial: (Polynomial object) a Numpy Power series polynomial relating a pixel index to a wavelength in m
         '''
         self.pixelToWavelength=polynomial
+        self.spectralAxis=None
+        self.pixelToWavelengthVersion+=1
+
+    def get_pixelToWavelengthVersion(self):
+        '''
+        Gets the version of the pixel to wavelength calibration. Objects caching quantities derived from the calibration compare it to know if they are outdated
+        output: (int) the number of times the pixel to wavelength calibration was set
+        '''
+        return self.pixelToWavelengthVersion
+
+    def get_columnsAxis(self):
+        '''
+        Gets the SpectralAxis of the SLM columns, shared by the objects using the calibration
+        The axis is built once per calibration and caches its representations in every unit
+        output: (SpectralAxis) the spectral position of light associated with every column of the SLM
+        '''
+        if self.spectralAxis is None:
+            self.spectralAxis=SpectralAxis(self.pixelToWavelength(np.arange(self.SLM.get_size()[0])),unit='wavelength')
+        return self.spectralAxis
+
+    def get_spectralAxis(self,unit='wavelength'):
+        '''
+        Gets the spectral position of light associated with every column of the SLM
+        The axis is computed once per unit and calibration and cached (read-only)
+        input:
+            - unit: the unit in which to return the spectrum axis (see get_spectrumAtPixel)
+        output: (nd.array) the spectral position associated with every column of the SLM
+        '''
+        return self.get_columnsAxis().get_values(unit)
+
     def get_spectrumAtPixel(self,pixels,unit='wavelength'):
         '''
         Gets the spectral position of light associated with a pixel on the SLM
+        Integer pixels within the SLM are read from the cached axis of the columns
         input:
             - pixels: (nd.array) the horizontal pixel index on the SLM
             - unit: the unit in which to return the spectrum axis allows for
@@ -38,12 +77,131 @@ class Calibration():
         output: (nd.array) the spectral position associated with the pixels in pixels
 
         '''
-        conversionFunction={'wavelength':lambda x: x,
-                            'frequency':co.waveToFreq,
-                            'ang_frequency':co.waveToAngFreq,
-                            'energy':co.waveToeV}
+        pixels=np.asarray(pixels)
+        if np.issubdtype(pixels.dtype,np.integer) and pixels.size and pixels.min()>=0 and pixels.max()<self.SLM.get_size()[0]:
+            return self.get_spectralAxis(unit)[pixels]
         wavelength=self.pixelToWavelength(pixels)
-        return conversionFunction[unit](wavelength)
+        return convert(wavelength,'wavelength',unit)
+
+    def set_phaseToGrayscale(self,lut):
+        '''
+        Sets the phase to gray level lookup table of the SLM and increments the lookup table version
+        input:
+            - lut: (nd.array of uint8 or uint16) the gray levels to send to the SLM for phases equally spaced over [0,2*pi)
+                (lut[i] is the gray level for a phase of 2*pi*i/len(lut)). The dtype of the table sets the dtype of the images.
+        '''
+        self.phaseToGrayscale=np.ascontiguousarray(lut)
+        self.phaseToGrayscaleVersion+=1
+
+    def get_phaseToGrayscaleVersion(self):
+        '''
+        Gets the version of the phase to gray level lookup table. Objects caching gray level images compare it to know if they are outdated
+        output: (int) the number of times the lookup table was set
+        '''
+        return self.phaseToGrayscaleVersion
+
+    def load_phaseToGrayscale(self,filename):
+        '''
+        Loads the phase to gray level lookup table of the SLM from a text file laid out as the SDK .lut files (one "index value" line per phase step)
+        input:
+            - filename: (str) the path of the lookup table file
+        '''
+        table=np.loadtxt(filename,ndmin=2)
+        dtype=np.uint8 if table[:,-1].max()<256 else np.uint16
+        self.set_phaseToGrayscale(table[:,-1].astype(dtype))
+
+    def get_phaseToGrayscale(self):
+        '''
+        Gets the phase to gray level lookup table of the SLM
+        output: (nd.array of uint8 or uint16) the gray levels for phases equally spaced over [0,2*pi). A linear 8 bit table if none was set
+        '''
+        if self.phaseToGrayscale is None:
+            return np.arange(256,dtype=np.uint8)
+        return self.phaseToGrayscale
+
+    def get_grayscaleAtPhase(self,phase,out=None):
+        '''
+        Converts a phase image into the gray levels sent to the SLM with a lookup in the phase to gray level table (see set_phaseToGrayscale)
+        Phases are wrapped to [0,2*pi) and rounded down to the closest table entry.
+        input:
+            - phase: (nd.array) the phase image in rad
+            - out: (nd.array) (default None) the array in which to write the gray levels. Must have the shape of phase and the dtype of the table
+        output: (nd.array of uint8 or uint16) the gray levels associated with the phase image
+        '''
+        lut=self.get_phaseToGrayscale()
+        levels=len(lut)
+        # Offsetting by a large multiple of the table length makes the truncation to integers a floor for negative phases too
+        indices=np.empty(np.shape(phase),dtype=np.intp)
+        np.add(np.multiply(phase,levels/(2*np.pi)),levels<<16,out=indices,casting='unsafe')
+        if levels&(levels-1)==0:
+            np.bitwise_and(indices,levels-1,out=indices)
+        else:
+            np.mod(indices,levels,out=indices)
+        return np.take(lut,indices,out=out)
+
+    def set_efficiencyMap(self,depths,efficiencyMap,amplitude,period):
+        '''
+        Sets the diffraction efficiency map of the SLM, i.e. the first order field amplitude at every column as a function of the grating depth
+        The map is normalized to the highest amplitude of every column and made non-decreasing with depth so that it can be inverted
+        input:
+            - depths: (1d.array) the increasing grating depths (amplitude mask values from 0 to 1) at which the map was measured
+            - efficiencyMap: (2d.array) the (columns,depths) diffracted field amplitude
+            - amplitude: (float) the amplitude of the measured grating in units of 2*pi
+            - period: (int) the period of the measured grating in pixels
+        '''
+        efficiencyMap=np.maximum.accumulate(np.clip(np.asarray(efficiencyMap,dtype=float),0,None),axis=1)
+        highest=efficiencyMap[:,-1:]
+        self.efficiencyMap=np.divide(efficiencyMap,highest,out=np.zeros_like(efficiencyMap),where=highest>0)
+        self.efficiencyDepths=np.asarray(depths,dtype=float)
+        self.efficiencyGrating=(amplitude,int(period))
+
+    def get_efficiencyMap(self):
+        '''
+        Gets the diffraction efficiency map of the SLM (see set_efficiencyMap)
+        output:
+            - (1d.array) the grating depths of the map or None if no map was set
+            - (2d.array) the (columns,depths) relative diffracted field amplitude or None if no map was set
+        '''
+        return self.efficiencyDepths,self.efficiencyMap
+
+    def save_efficiencyMap(self,filename):
+        '''
+        Saves the diffraction efficiency map to a .npz file so that it can be reloaded in later sessions
+        input:
+            - filename: (str) the path of the file
+        '''
+        np.savez(filename,depths=self.efficiencyDepths,efficiencyMap=self.efficiencyMap,grating=np.array(self.efficiencyGrating,dtype=float))
+
+    def load_efficiencyMap(self,filename):
+        '''
+        Loads a diffraction efficiency map saved with save_efficiencyMap
+        input:
+            - filename: (str) the path of the file
+        '''
+        with np.load(filename) as data:
+            amplitude,period=data['grating']
+            self.set_efficiencyMap(data['depths'],data['efficiencyMap'],float(amplitude),int(period))
+
+    def get_depthForAmplitude(self,targetAmplitude,amplitude,period):
+        '''
+        Gets the grating depth giving a target first order amplitude at every column by inverting the measured efficiency map
+        input:
+            - targetAmplitude: (1d.array) the target amplitude at every column, relative to the highest amplitude of the column (from 0 to 1)
+            - amplitude: (float) the amplitude of the grating in units of 2*pi
+            - period: (int) the period of the grating in pixels
+        output: (1d.array) the depth (amplitude mask value) at every column, or None if no map was measured with this grating
+        '''
+        if self.efficiencyMap is None or self.efficiencyGrating!=(amplitude,int(period)):
+            return None
+        targetAmplitude=np.clip(np.asarray(targetAmplitude,dtype=float),0,1)
+        columns=np.arange(self.efficiencyMap.shape[0])
+        # Index of the first depth reaching the target in every column (the map is non-decreasing along the depths)
+        following=np.clip(np.sum(self.efficiencyMap<targetAmplitude[:,np.newaxis],axis=1),1,len(self.efficiencyDepths)-1)
+        lower=self.efficiencyMap[columns,following-1]
+        upper=self.efficiencyMap[columns,following]
+        weights=np.divide(targetAmplitude-lower,upper-lower,out=np.ones_like(lower),where=upper>lower)
+        depths=self.efficiencyDepths[following-1]+np.clip(weights,0,1)*(self.efficiencyDepths[following]-self.efficiencyDepths[following-1])
+        return depths
 
     def user_input_assign_pixelnumber_to_wavelength(self,peak_pos):
         
@@ -83,4 +241,24 @@ class Calibration():
             
             
         return self.wavelength_calib
-        
+
+    def spectral_camera_pixel2wavelength_autocalib(self,spectrum,pixels,lines='Hg',degree=3,**kwargs):
+        ''' This function finds the peaks of a lamp spectrum, matches them automatically to the lamp's reference lines
+            and fits the matches to a polynomial function (see linematching.match_lines).
+
+                Inputs: spectrum: 1D array containing the lamp spectrum
+                        pixels: array of pixel numbers (size = 1024)
+                        lines: name of the lamp ('Hg', 'Ar' or 'HgAr') or 1D array of its line wavelengths (nm)
+                        degree: degree of polynomial fitting
+                        kwargs: other arguments of linematching.match_lines (tolerance, dispersionRange, wavelengthRange,...)
+
+                Outputs: calibrated wavelength array'''
+
+        peak_pos,_ = linematching.find_lines(spectrum)
+        self.line_matches = linematching.match_lines(peak_pos,lines,degree=degree,**kwargs)
+        self.fit_vals = self.line_matches['coefficients'][::-1]
+        self.f = np.poly1d(self.fit_vals)
+
+        self.wavelength_calib = self.f(pixels)
+
+        return self.wavelength_calib
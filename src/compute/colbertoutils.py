@@ -2,6 +2,7 @@
 from scipy.constants import c,h,pi,e
 
 from scipy.signal import find_peaks
+from concurrent.futures import ThreadPoolExecutor
 import datetime
 
 import tkinter as tk
@@ -63,6 +64,74 @@ def peak_finder(Data,height):
     
     return peak_pos, peak_heights
 
+def refine_peaks(window,method='gaussian'):
+    ''' Refines the position and height of peaks from the values around their highest pixel.
+            Inputs: window: 2D array (peaks x 2*half_window+1) of the values centered on the highest pixel of every peak
+                    method: 'gaussian' (parabola through the logarithm of the three central values, exact for gaussian peaks),
+                            'parabola' (parabola through the three central values) or 'centroid' (center of mass of the window above its minimum)
+            Outputs: shift: 1D array of the subpixel shifts of the peaks from their highest pixel
+                     heights: 1D array of the refined heights of the peaks'''
+
+    half_window = window.shape[1]//2
+    if method == 'centroid':
+        weights = window - window.min(axis=1, keepdims=True)
+        total = weights.sum(axis=1)
+        moment = weights @ np.arange(-half_window, half_window + 1.)
+        shift = np.divide(moment, total, out=np.zeros(len(total)), where=total > 0)
+        return shift, window[:, half_window]
+    before, center, after = window[:, half_window - 1], window[:, half_window], window[:, half_window + 1]
+    if method == 'gaussian':
+        tiny = np.finfo(float).tiny
+        before, center, after = (np.log(np.maximum(values, tiny)) for values in (before, center, after))
+    elif method != 'parabola':
+        raise(ValueError('Unknown peak refinement method {}'.format(method)))
+    curvature = before - 2*center + after
+    negative = curvature < 0
+    shift = np.clip(np.where(negative, (before - after)/(2*np.where(negative, curvature, -1)), 0), -0.5, 0.5)
+    heights = center - 0.25*(before - after)*shift
+    if method == 'gaussian':
+        heights = np.exp(heights)
+    return shift, heights
+
+def peak_finder_batch(Data, height, method='gaussian', half_window=1, workers=None, chunk_size=256):
+    ''' Finds the local maxima of many spectra at once and refines them to subpixel positions.
+        A peak is a pixel higher than its left neighbour, at least as high as its right one and above height.
+        Large batches are split in chunks of frames processed by several threads (numpy releases the GIL).
+            Inputs: Data: 2D array (frames x pixels) of spectra (a 1D array is treated as a single frame)
+                    height: required height of peaks, a scalar or an array with one value per frame
+                    method: subpixel refinement, 'gaussian', 'parabola' or 'centroid' (see refine_peaks)
+                    half_window: number of pixels on each side of the highest pixel used by the centroid (the fits use one)
+                    workers: number of threads (all the cores by default, 1 to stay in the calling thread)
+                    chunk_size: number of frames per chunk
+            Outputs: frames: 1D array with the frame index of every peak
+                     peak_pos: 1D array with the subpixel position of every peak (sorted by frame then position)
+                     peak_heights: 1D array with the refined heights of the peaks'''
+
+    Data = np.atleast_2d(np.asarray(Data, dtype=float))
+    if len(Data) == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0), np.zeros(0)
+    height = np.broadcast_to(np.asarray(height, dtype=float).reshape(-1, 1), (len(Data), 1))
+    offsets = np.arange(-half_window, half_window + 1) if method == 'centroid' else np.arange(-1, 2)
+
+    def find_chunk(start):
+        chunk = Data[start:start + chunk_size]
+        before, center, after = chunk[:, :-2], chunk[:, 1:-1], chunk[:, 2:]
+        frames, pixels = np.nonzero((center > before) & (center >= after) & (center >= height[start:start + chunk_size]))
+        pixels += 1
+        window = chunk[frames[:, np.newaxis], np.clip(pixels[:, np.newaxis] + offsets, 0, chunk.shape[1] - 1)]
+        shift, heights = refine_peaks(window, method)
+        return frames + start, pixels + shift, heights
+
+    starts = range(0, len(Data), chunk_size)
+    if workers == 1 or len(starts) == 1:
+        results = [find_chunk(start) for start in starts]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(find_chunk, starts))
+    frames, peak_pos, peak_heights = (np.concatenate(arrays) for arrays in zip(*results))
+
+    return frames, peak_pos, peak_heights
+
 def save_data(filename, Data):
     ''' Saves data to a user defined path.
             Inputs: filename: label the file as you want 
@@ -0,0 +1,168 @@
+#############################################################
+#############################################################
+# This module hosts a class composing the gratings of several beams sharing one SLM
+# into a single preallocated full-panel image
+# A wavefront correction (e.g. compute.zernike.get_zernikePhase) can be added to the gratings before they are converted to gray levels
+
+#############################################################
+#############################################################
+import numpy as np
+
+class Compositor:
+    def __init__(self,SLM,dtype=np.uint8):
+        """
+        Instantiates a Compositor object holding the full-panel image of an SLM
+        Input:
+            SLM: an SLM object on which the beams are displayed
+            dtype: the dtype of the gray levels (uint8 by default, must match the dtype of the beams' phase to gray level tables)
+        output:
+            Compositor Object
+        """
+        self.SLM=SLM
+        width,height=self.SLM.get_size()
+        self.image=np.zeros((height,width),dtype=dtype) # C-contiguous (rows,columns) gray levels as expected by SLM.write_image
+        self.beams={}
+        self.renderedStates={} # (state key,region,lookup table version) of the beam last rendered in the image, by beam name
+        self.wavefrontCorrection=None # (rows,columns) phase added to the gratings (rad)
+
+    def set_beams(self,beams):
+        '''
+            Sets the beams to compose (e.g. DataHandling.beams)
+            input:
+                - beams (dict): Beam objects by name
+        '''
+        self.beams=beams
+
+    def get_beams(self):
+        '''
+            Gets the beams composed in the image
+            output:
+                - dict: Beam objects by name
+        '''
+        return self.beams
+
+    def set_wavefrontCorrection(self,wavefrontCorrection):
+        '''
+            Sets the phase added to the gratings of every beam before their conversion to gray levels, e.g. to correct the aberrations of the SLM.
+            Every beam is rendered again at the next composition.
+            input:
+                - wavefrontCorrection (2d.array): the (rows,columns) full-panel phase in rad (see compute.zernike.get_zernikePhase), or None to remove the correction
+        '''
+        if wavefrontCorrection is not None:
+            wavefrontCorrection=np.asarray(wavefrontCorrection)
+            if wavefrontCorrection.shape!=self.image.shape:
+                raise(ValueError('The wavefront correction of shape %s does not match the (rows,columns) image of shape %s'%(wavefrontCorrection.shape,self.image.shape)))
+        self.wavefrontCorrection=wavefrontCorrection
+        self.invalidate()
+
+    def get_wavefrontCorrection(self):
+        '''
+            Gets the phase added to the gratings of every beam
+            output:
+                - 2d.array: the (rows,columns) phase in rad, or None
+        '''
+        return self.wavefrontCorrection
+
+    def get_image(self):
+        '''
+            Gets the full-panel image without recomposing it
+            output:
+                - 2d.array: The (rows,columns) image of the SLM
+        '''
+        return self.image
+
+    @staticmethod
+    def get_beamRegion(beam):
+        '''
+            Gets the region of the SLM covered by a beam
+            input:
+                - beam (Beam): The beam
+            output:
+                - tuple: (first row, end row, first column, end column) of the beam (0 indexed, end excluded)
+        '''
+        verticalDelimiters=beam.get_beamVerticalDelimiters()
+        horizontalDelimiters=beam.get_beamHorizontalDelimiters()
+        return (verticalDelimiters[0],verticalDelimiters[1],horizontalDelimiters[0],horizontalDelimiters[1])
+
+    @staticmethod
+    def check_overlap(regionA,regionB):
+        '''
+            Checks if two regions of the SLM overlap
+            input:
+                - regionA, regionB (tuple): (first row, end row, first column, end column) of the regions
+            output:
+                - bool: True if the regions share at least one pixel
+        '''
+        return (regionA[0]<regionB[1] and regionB[0]<regionA[1]) and (regionA[2]<regionB[3] and regionB[2]<regionA[3])
+
+    def get_overlaps(self):
+        '''
+            Finds the beams covering common regions of the SLM
+            output:
+                - list of tuple: The pairs of beam names whose regions overlap
+        '''
+        names=list(self.beams)
+        regions=[self.get_beamRegion(self.beams[name]) for name in names]
+        overlaps=[]
+        for i in range(len(names)):
+            for j in range(i+1,len(names)):
+                if self.check_overlap(regions[i],regions[j]):
+                    overlaps.append((names[i],names[j]))
+        return overlaps
+
+    def invalidate(self,beamName=None):
+        '''
+            Forces the beam (or every beam when no name is provided) to be rendered again at the next composition
+            input:
+                - beamName (str): (default None) The name of the beam to render again
+        '''
+        if beamName is None:
+            self.renderedStates={}
+        else:
+            self.renderedStates.pop(beamName,None)
+
+    def compose(self):
+        '''
+            Updates the full-panel image with the gratings of the beams. Only the bands of beams whose state changed since the last composition are rendered again.
+            Regions left by removed or moved beams are cleared.
+            output:
+                - 2d.array: The (rows,columns) image of the SLM (the internal buffer, not a copy)
+        '''
+        overlaps=self.get_overlaps()
+        if overlaps:
+            raise(ValueError('The regions of beams %s overlap on the SLM'%', '.join('%s and %s'%pair for pair in overlaps)))
+        # The lookup table is applied after makeGrating, so its version is compared here rather than in the state key of the frame cache
+        currentStates={name:(beam.get_stateKey(),self.get_beamRegion(beam),beam.calibration.get_phaseToGrayscaleVersion()) for name,beam in self.beams.items()}
+        changedNames=[name for name in currentStates if self.renderedStates.get(name)!=currentStates[name]]
+        # Clear the regions of removed or moved beams and render again the beams drawn over them
+        staleRegions=[state[1] for name,state in self.renderedStates.items() if name not in currentStates or state[1]!=currentStates[name][1]]
+        for region in staleRegions:
+            self.image[region[0]:region[1],region[2]:region[3]]=0
+            for name,state in currentStates.items():
+                if name not in changedNames and self.check_overlap(region,state[1]):
+                    changedNames.append(name)
+        for name in changedNames:
+            self.render_beam(name)
+        self.renderedStates=currentStates
+        return self.image
+
+    def render_beam(self,beamName):
+        '''
+            Writes the grating of a beam in place in its region of the full-panel image, with the wavefront correction added
+            input:
+                - beamName (str): The name of the beam to render
+        '''
+        beam=self.beams[beamName]
+        rowStart,rowEnd,columnStart,columnEnd=self.get_beamRegion(beam)
+        grating=beam.makeGrating()[columnStart:columnEnd]# (columns,rows) phase array
+        if self.wavefrontCorrection is not None:
+            grating=grating+self.wavefrontCorrection[rowStart:rowEnd,columnStart:columnEnd].T
+        beam.calibration.get_grayscaleAtPhase(grating,out=self.image[rowStart:rowEnd,columnStart:columnEnd].T)
+
+    def write_image(self):
+        '''
+            Composes the image and writes it to the SLM
+            output:
+                - The return value of SLM.write_image
+        '''
+        return self.SLM.write_image(self.compose(),self.image.dtype==np.uint8)
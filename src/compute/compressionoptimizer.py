@@ -0,0 +1,166 @@
+#############################################################
+#############################################################
+# This module hosts a closed-loop optimizer compressing the pulse of a beam
+# The phase coefficients of the beam are scanned one order at a time around the current optimum.
+# The frames of every scan are rendered at once (Beam.makeGratingSequence) and the figure of merit
+# measured by a spectrometer (e.g. integrated SHG) is interpolated by a parabola to find the best coefficient.
+# The scan ranges shrink at every round so that few hardware round trips are needed.
+#############################################################
+#############################################################
+import numpy as np
+from numpy.polynomial import Polynomial as P
+
+class CompressionOptimizer:
+    def __init__(self,beam,SLM,spectrometer,figureOfMerit=None,compositor=None):
+        """
+        Instantiates a CompressionOptimizer object maximizing a spectrometer figure of merit with the phase of a beam
+        Input:
+            beam: the Beam object whose phase is optimized
+            SLM: the SLM object on which the frames are written (write_image)
+            spectrometer: the spectrometer measuring the figure of merit (get_intensities), e.g. the SHG of the beam
+            figureOfMerit: (callable) function of the measured intensities returning the value to maximize. Integrated intensity by default
+            compositor: (Compositor) when provided, the other beams of the compositor are displayed during the optimization
+        output:
+            CompressionOptimizer Object
+        """
+        self.beam=beam
+        self.SLM=SLM
+        self.spectrometer=spectrometer
+        self.figureOfMerit=figureOfMerit if figureOfMerit is not None else np.sum
+        self.compositor=compositor
+        self.scanRanges={2:1000.,3:10000.,4:100000.} # Half range of the first scan of every phase order (fs^order)
+        self.history=[] # (relative phase coefficients in powers of fs, figure of merit) of every measurement
+
+    def set_scanRanges(self,scanRanges):
+        '''
+            Sets the half range of the first scan of every phase order
+            input:
+                - scanRanges (dict): The half ranges (in fs^order) by phase order (e.g. {2:1000,3:10000} for the GDD and TOD)
+        '''
+        self.scanRanges=dict(scanRanges)
+
+    def get_scanRanges(self):
+        '''
+            output:
+                - dict: The half range of the first scan (in fs^order) by phase order
+        '''
+        return self.scanRanges
+
+    def get_history(self):
+        '''
+            Gets every measurement done by the optimizer
+            output:
+                - list of tuple: (relative phase coefficients in powers of fs, figure of merit) in the order of the measurements
+        '''
+        return self.history
+
+    def get_roundTrips(self):
+        '''
+            output:
+                - int: The number of frames written to the SLM and measured by the spectrometer
+        '''
+        return len(self.history)
+
+    def get_baseImage(self):
+        '''
+            Gets the image in which the band of the beam is replaced by the candidate frames
+            output:
+                - 2d.array: The (rows,columns) image of the other beams of the compositor, or an empty image
+        '''
+        if self.compositor is not None:
+            return self.compositor.compose().copy()
+        width,height=self.SLM.get_size()
+        return np.zeros((height,width),dtype=self.beam.calibration.get_phaseToGrayscale().dtype)
+
+    def measure(self,candidates):
+        '''
+            Renders the frames of candidate phases at once, then writes every frame to the SLM and measures its figure of merit
+            input:
+                - candidates (2d.array): The (N,order) matrix of phase coefficients relative to the optimal phase (in powers of fs)
+            output:
+                - 1d.array: The figure of merit of every candidate
+        '''
+        frames=self.beam.makeGratingSequence(candidates,mode='relative',unit='fs')
+        rowStart,rowEnd=self.beam.get_beamVerticalDelimiters()
+        image=self.get_baseImage()
+        figuresOfMerit=np.zeros(len(candidates))
+        for index,(candidate,frame) in enumerate(zip(candidates,frames)):
+            image[rowStart:rowEnd]=frame
+            self.SLM.write_image(image,image.dtype==np.uint8)
+            figuresOfMerit[index]=self.figureOfMerit(np.asarray(self.spectrometer.get_intensities()))
+            self.history.append((candidate.copy(),figuresOfMerit[index]))
+        return figuresOfMerit
+
+    @staticmethod
+    def find_maximum(values,figuresOfMerit):
+        '''
+            Finds the maximum of a figure of merit sampled on an evenly spaced scan by fitting a parabola on the best sample and its neighbours
+            input:
+                - values (1d.array): The evenly spaced scanned values
+                - figuresOfMerit (1d.array): The figure of merit at every value
+            output:
+                - float: The value maximizing the figure of merit (the best sample when it lies on the edge of the scan)
+        '''
+        best=int(np.argmax(figuresOfMerit))
+        if best==0 or best==len(values)-1:
+            return values[best]
+        before,center,after=figuresOfMerit[best-1:best+2]
+        curvature=before-2*center+after
+        if curvature>=0:
+            return values[best]
+        return values[best]+(values[1]-values[0])*(before-after)/(2*curvature)
+
+    def scan_order(self,coefficients,order,halfRange,points):
+        '''
+            Scans one phase coefficient around the current coefficients and finds the best value
+            input:
+                - coefficients (1d.array): The relative phase coefficients (in powers of fs) around which to scan
+                - order (int): The power of the scanned coefficient
+                - halfRange (float): The half range of the scan (in fs^order)
+                - points (int): The number of candidates of the scan
+            output:
+                - 1d.array: The coefficients with the best value of the scanned coefficient
+                - bool: True if the best value lies on the edge of the scan
+        '''
+        values=coefficients[order]+np.linspace(-halfRange,halfRange,points)
+        candidates=np.tile(coefficients,(points,1))
+        candidates[:,order]=values
+        figuresOfMerit=self.measure(candidates)
+        coefficients=coefficients.copy()
+        coefficients[order]=self.find_maximum(values,figuresOfMerit)
+        best=int(np.argmax(figuresOfMerit))
+        return coefficients,best in (0,points-1)
+
+    def optimize(self,orders=(2,3),points=7,rounds=4,shrink=0.3,apply=True):
+        '''
+            Maximizes the figure of merit by scanning the phase coefficients one order at a time, shrinking the scans at every round.
+            A scan whose best candidate lies on its edge is repeated around it with the same range at the next round.
+            input:
+                - orders (tuple of int): The phase orders to optimize (2 for the GDD, 3 for the TOD,...). Must be in the scan ranges
+                - points (int): The number of candidates per scan (odd numbers include the current coefficient)
+                - rounds (int): The number of scans per order
+                - shrink (float): The factor applied to the scan ranges after every round
+                - apply (bool): When True, the optimal phase of the beam is updated and its current phase set to it
+            output:
+                - 1d.array: The best phase coefficients found, relative to the initial optimal phase (in powers of fs)
+        '''
+        coefficients=np.zeros(max(orders)+1)
+        halfRanges={order:self.scanRanges[order] for order in orders}
+        for _ in range(rounds):
+            for order in orders:
+                coefficients,onEdge=self.scan_order(coefficients,order,halfRanges[order],points)
+                if not onEdge:
+                    halfRanges[order]*=shrink
+        if apply:
+            self.apply_coefficients(coefficients)
+        return coefficients
+
+    def apply_coefficients(self,coefficients):
+        '''
+            Adds relative phase coefficients to the optimal phase of the beam and sets the current phase to the new optimal phase
+            input:
+                - coefficients (1d.array): The relative phase coefficients (in powers of fs)
+        '''
+        optimalCoefficients=self.beam.get_phaseCoefficients(np.asarray(coefficients),mode='relative',unit='fs',outputUnit='s')[0]
+        self.beam.set_optimalPhase(P(optimalCoefficients),unit='s')
+        self.beam.set_currentPhase(P([0.]),mode='relative',unit='s')
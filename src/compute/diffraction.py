@@ -0,0 +1,79 @@
+#############################################################
+#############################################################
+# This module hosts functions describing the diffraction of the sawtooth gratings displayed on the SLM
+# They relate the depth of a grating (fraction of its full amplitude) to the amplitude and phase of the first diffraction order
+
+#############################################################
+#############################################################
+from functools import lru_cache
+import numpy as np
+from scipy.constants import pi
+from scipy.signal import sawtooth
+
+def get_firstOrderField(profiles,period):
+    '''
+        Computes the complex first order diffraction coefficient of periodic phase profiles
+        input:
+            - profiles (nd.array): phase profiles over one period (last axis of length period) in rad
+            - period (int): the period of the profiles in pixels
+        output:
+            - nd.array (complex): the first order field of every profile relative to the incident field
+    '''
+    indices=np.arange(period)
+    return np.mean(np.exp(1j*profiles)*np.exp(2j*pi*indices/period),axis=-1)
+
+@lru_cache(maxsize=32)
+def get_efficiencyTable(amplitude,period,samples=1025,shifts=16):
+    '''
+        Computes the first order field diffracted by the sawtooth grating of a Beam for depths from 0 to 1 (amplitude mask values)
+        The table is computed from one period of the sampled grating (the sawtooth of Beam.generate_1Dgrating) and cached per grating amplitude and period.
+        Since the sampled grating changes with the imparted phase, the field is averaged over phases spanning one pixel of the grating.
+        input:
+            - amplitude (float): the amplitude of the grating in units of 2*pi
+            - period (int): the period of the grating in pixels
+            - samples (int): the number of depths in the table
+            - shifts (int): the number of imparted phases over which the field is averaged
+        output:
+            - depths (1d.array): the depths (fraction of the grating amplitude) from 0 to 1
+            - efficiency (1d.array): the first order field amplitude at each depth, made non-decreasing so that it can be inverted
+            - phaseOffset (1d.array): the phase of the first order at each depth relative to full depth (in rad)
+    '''
+    depths=np.linspace(0,1,samples)
+    phases=np.arange(shifts)*2*pi/(period*shifts)
+    profiles=amplitude*sawtooth(2*pi*np.arange(period)/period-phases[:,np.newaxis],width=0) % 2*pi
+    fields=get_firstOrderField(depths[:,np.newaxis,np.newaxis]*profiles,period)
+    field=np.mean(fields*np.exp(-1j*phases),axis=-1)
+    efficiency=np.maximum.accumulate(np.abs(field))
+    phaseOffset=np.unwrap(np.angle(field/field[-1]))
+    for table in (depths,efficiency,phaseOffset):
+        table.flags.writeable=False
+    return depths,efficiency,phaseOffset
+
+def get_depthForAmplitude(targetAmplitude,amplitude,period):
+    '''
+        Gets the grating depths giving a target first order field amplitude, by interpolation in the inverse efficiency table
+        input:
+            - targetAmplitude (nd.array): the target field amplitude from 0 to 1 (1 is the amplitude diffracted at full depth)
+            - amplitude (float): the amplitude of the grating in units of 2*pi
+            - period (int): the period of the grating in pixels
+        output:
+            - depths (nd.array): the depths (amplitude mask values) giving the target amplitudes
+            - phaseOffsets (nd.array): the phase of the first order at these depths relative to full depth (in rad)
+    '''
+    depths,efficiency,phaseOffset=get_efficiencyTable(amplitude,period)
+    targetEfficiency=np.clip(targetAmplitude,0,1)*efficiency[-1]
+    targetDepths=np.interp(targetEfficiency,efficiency,depths)
+    return targetDepths,get_phaseOffsetAtDepth(targetDepths,amplitude,period)
+
+def get_phaseOffsetAtDepth(depths,amplitude,period):
+    '''
+        Gets the phase of the first order diffracted at given grating depths relative to full depth, by interpolation in the efficiency table
+        input:
+            - depths (nd.array): the depths (amplitude mask values) from 0 to 1
+            - amplitude (float): the amplitude of the grating in units of 2*pi
+            - period (int): the period of the grating in pixels
+        output:
+            - nd.array: the phase of the first order at these depths relative to full depth (in rad)
+    '''
+    tableDepths,_,phaseOffset=get_efficiencyTable(amplitude,period)
+    return np.interp(depths,tableDepths,phaseOffset)
@@ -0,0 +1,90 @@
+#############################################################
+#############################################################
+# This module hosts a procedure measuring the diffraction efficiency map of the SLM
+# Gratings of increasing depth are displayed over the whole beam and the spectrometer measures
+# the diffracted spectrum, so that every block of columns is measured at once for each depth.
+# The amplitude diffracted by every column as a function of depth is stored in the Calibration
+# (set_efficiencyMap) and used by Beam.set_targetAmplitude to pre-compensate the amplitude mask.
+#############################################################
+#############################################################
+import numpy as np
+from src.compute.beams import Beam
+
+class EfficiencyCalibrator:
+    def __init__(self,calibration,spectrometer,rows=None,period=10,amplitude=1):
+        """
+        Instantiates an EfficiencyCalibrator object measuring the diffraction efficiency of every SLM column versus grating depth
+        Input:
+            calibration: the Calibration object of the SLM (its pixel to wavelength calibration must be set), in which the map is stored
+            spectrometer: the spectrometer measuring the diffracted beam (get_wavelength in nm and get_intensities)
+            rows: the [beginning, end] rows of the beam on the SLM. The whole SLM height by default
+            period: the period of the grating in pixels
+            amplitude: the amplitude of the grating in units of 2*pi
+        output:
+            EfficiencyCalibrator Object
+        """
+        self.calibration=calibration
+        self.SLM=calibration.SLM
+        self.spectrometer=spectrometer
+        width,height=self.SLM.get_size()
+        self.rows=[0,height] if rows is None else rows
+        self.period=period
+        self.amplitude=amplitude
+        # Flat phase grating of the band (columns,rows), scaled by the depth of every frame
+        self.grating=Beam.generate_2Dgrating(amplitude,period,np.zeros(width),num=self.rows[1]-self.rows[0])
+        self.image=np.zeros((height,width),dtype=calibration.get_phaseToGrayscale().dtype)
+        self.blockAmplitudes=None # Measured (blocks,depths) diffracted field amplitude
+        self.acquisitions=0
+
+    def acquire(self,depth):
+        '''
+            Displays the grating with a given depth on the rows of the beam and acquires a spectrum
+            input:
+                - depth (float): the depth of the grating (amplitude mask value from 0 to 1)
+            output:
+                - 1d.array: the wavelengths of the spectrometer (nm)
+                - 1d.array: the intensities measured
+        '''
+        self.calibration.get_grayscaleAtPhase(self.grating*depth,out=self.image[self.rows[0]:self.rows[1]].T)
+        self.SLM.write_image(self.image,self.image.dtype==np.uint8)
+        self.acquisitions+=1
+        return np.asarray(self.spectrometer.get_wavelength(),dtype=float),np.asarray(self.spectrometer.get_intensities(),dtype=float)
+
+    def measure(self,depths=np.linspace(0,1,17),numberBlocks=64,apply=True):
+        '''
+            Measures the diffracted field amplitude of every block of columns for a sweep of grating depths (one acquisition per depth)
+            The spectrum of every depth is mapped on the SLM columns with the pixel to wavelength calibration, the spectrum without grating is subtracted
+            and the amplitude of each block (mean over its columns) is interpolated back on every column.
+            input:
+                - depths (1d.array): the increasing grating depths of the sweep from 0 to 1. The first one should be 0 (background)
+                - numberBlocks (int): the number of blocks of columns
+                - apply (bool): when True, the map is stored in the calibration with set_efficiencyMap
+            output:
+                - 2d.array: the (columns,depths) diffracted field amplitude (not normalized)
+        '''
+        depths=np.asarray(depths,dtype=float)
+        numberColumns=self.SLM.get_size()[0]
+        columnWaves=self.calibration.get_spectralAxis('wavelength')*1e9
+        blockStarts=np.linspace(0,numberColumns,numberBlocks+1).round().astype(int)[:-1]
+        blockSizes=np.diff(np.append(blockStarts,numberColumns))
+        blockCenters=blockStarts+(blockSizes-1)/2
+        intensities=np.zeros((len(depths),numberBlocks))
+        for index,depth in enumerate(depths):
+            wavelengths,spectrum=self.acquire(depth)
+            order=np.argsort(wavelengths)
+            columnIntensities=np.interp(columnWaves,wavelengths[order],spectrum[order],left=0,right=0)
+            intensities[index]=np.add.reduceat(columnIntensities,blockStarts)/blockSizes
+        if depths[0]==0:
+            intensities-=intensities[0]
+        self.blockAmplitudes=np.sqrt(np.clip(intensities,0,None)).T
+        efficiencyMap=np.array([np.interp(np.arange(numberColumns),blockCenters,amplitudes) for amplitudes in self.blockAmplitudes.T]).T
+        if apply:
+            self.calibration.set_efficiencyMap(depths,efficiencyMap,self.amplitude,self.period)
+        return efficiencyMap
+
+    def get_acquisitions(self):
+        '''
+            output:
+                - int: the number of spectra acquired since the calibrator was instantiated
+        '''
+        return self.acquisitions
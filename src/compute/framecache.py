@@ -0,0 +1,114 @@
+#############################################################
+#############################################################
+# This module hosts a least-recently-used cache of rendered SLM frames
+# Frames are stored under a key describing the state that produced them
+# (see Beam.get_stateKey) so that revisited scan points are served without recomputation
+#############################################################
+#############################################################
+from collections import OrderedDict
+
+class FrameCache:
+    def __init__(self,memoryBudget=512e6):
+        """
+        Instantiates a FrameCache object holding rendered frames up to a given memory budget
+        Input:
+            memoryBudget: (float) Maximal memory used by the cached frames in bytes (default 512 MB)
+        output:
+            FrameCache Object
+        """
+        self.memoryBudget=memoryBudget
+        self.frames=OrderedDict() # Ordered from least to most recently used
+        self.memoryUsed=0
+        self.hits=0
+        self.misses=0
+        self.evictions=0
+
+    def set_memoryBudget(self,memoryBudget):
+        '''
+            Sets the maximal memory used by the cached frames and evicts frames if needed
+            input:
+                - memoryBudget (float): Maximal memory used by the cached frames in bytes
+        '''
+        self.memoryBudget=memoryBudget
+        self.evict()
+
+    def get_memoryBudget(self):
+        '''
+            Gets the maximal memory used by the cached frames
+            output:
+                - (float): Maximal memory used by the cached frames in bytes
+        '''
+        return self.memoryBudget
+
+    def get(self,key):
+        '''
+            Gets the frame stored under key and marks it as the most recently used
+            input:
+                - key (hashable): The key describing the state that produced the frame
+            output:
+                - nd.array: The (read-only) cached frame or None if the key is not in the cache
+        '''
+        frame=self.frames.get(key)
+        if frame is None:
+            self.misses+=1
+            return None
+        self.frames.move_to_end(key)
+        self.hits+=1
+        return frame
+
+    def put(self,key,frame):
+        '''
+            Stores a frame under key. The frame is made read-only since it is shared with every later hit,
+            also when it is larger than the memory budget and not stored, so that callers see the same frames either way.
+            Least recently used frames are evicted until the memory budget is respected.
+            input:
+                - key (hashable): The key describing the state that produced the frame
+                - frame (nd.array): The frame to store
+        '''
+        frame.flags.writeable=False
+        if frame.nbytes>self.memoryBudget:
+            return
+        if key in self.frames:
+            self.memoryUsed-=self.frames.pop(key).nbytes
+        self.frames[key]=frame
+        self.memoryUsed+=frame.nbytes
+        self.evict()
+
+    def evict(self):
+        '''
+            Evicts the least recently used frames until the memory budget is respected
+        '''
+        while self.memoryUsed>self.memoryBudget and self.frames:
+            _,frame=self.frames.popitem(last=False)
+            self.memoryUsed-=frame.nbytes
+            self.evictions+=1
+
+    def clear(self):
+        '''
+            Removes all frames from the cache and resets the counters
+        '''
+        self.frames.clear()
+        self.memoryUsed=0
+        self.hits=0
+        self.misses=0
+        self.evictions=0
+
+    def get_stats(self):
+        '''
+            Gets the usage statistics of the cache
+            output:
+                - dict: number of frames, memory used (bytes), hits, misses, evictions and hit rate
+        '''
+        requests=self.hits+self.misses
+        return {'frames':len(self.frames),
+                'memoryUsed':self.memoryUsed,
+                'hits':self.hits,
+                'misses':self.misses,
+                'evictions':self.evictions,
+                'hitRate':self.hits/requests if requests else 0.}
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __contains__(self,key):
+        return key in self.frames
@@ -0,0 +1,206 @@
+#############################################################
+#############################################################
+# This module hosts a phase-only hologram engine for the SLM
+# Holograms of target images are computed by the Gerchberg-Saxton algorithm and holograms of
+# spot arrays (positions, defocus and intensities) by the weighted Gerchberg-Saxton algorithm.
+# The FFTs run on several threads (scipy.fft workers) and the iterations stop when the error converges.
+# The last hologram is kept to warm start the next one, so that sequences of similar targets converge
+# in a few iterations. The random initial phase is seeded so that the holograms are reproducible.
+#############################################################
+#############################################################
+import numpy as np
+from scipy import fft
+
+def phaseToGray(phase,out=None):
+    '''
+        Converts phases to gray levels wrapped on 256 levels (one level is 2*pi/256)
+        input:
+            - phase (nd.array): the phase (rad)
+            - out (nd.array): (default None) uint8 array in which to write the gray levels
+        output:
+            - nd.array: the uint8 gray levels
+    '''
+    gray=np.floor(phase*(256/(2*np.pi))).astype(np.int64).astype(np.uint8)
+    if out is None:
+        return gray
+    out[...]=gray
+    return out
+
+def get_uniformity(intensities):
+    '''
+        output:
+            - float: the uniformity 1-(max-min)/(max+min) of the intensities (1 for equal intensities)
+    '''
+    return 1-(intensities.max()-intensities.min())/(intensities.max()+intensities.min())
+
+class HologramEngine:
+    def __init__(self,shape,workers=-1,tolerance=1e-3,seed=0,warmStart=True,precision='single'):
+        """
+        Instantiates a HologramEngine object computing phase holograms of a given size
+        Input:
+            shape: (tuple) the (rows, columns) of the holograms, i.e. of the SLM
+            workers: (int) the number of threads of the FFTs (-1 for all the cores)
+            tolerance: (float) the iterations stop when the relative decrease of the error (or the change of the spot uniformity) is below tolerance
+            seed: (int) the seed of the random initial phase
+            warmStart: (bool) when True the last hologram is the initial phase of the next one
+            precision: (str) 'single' (complex64, twice faster) or 'double' (complex128)
+        output:
+            HologramEngine Object
+        """
+        self.shape=tuple(shape)
+        self.workers=workers
+        self.tolerance=tolerance
+        self.seed=seed
+        self.warmStart=warmStart
+        self.dtype=np.complex64 if precision=='single' else np.complex128
+        self.realType=np.float32 if precision=='single' else np.float64
+        self.phase=None # Last hologram (rad), (holograms, rows, columns)
+        self.errors=[] # Error of every hologram at every iteration of the last call
+        self.rows=np.arange(self.shape[0])-self.shape[0]/2 # Coordinates of the pixels from the center of the SLM
+        self.columns=np.arange(self.shape[1])-self.shape[1]/2
+
+    def get_initialPhase(self,initialPhase,holograms):
+        '''
+            Gets the initial phase of the holograms
+            input:
+                - initialPhase (nd.array): the phase given by the user (rad), None for the last hologram (warm start) or a random phase
+                - holograms (int): the number of holograms
+            output:
+                - nd.array: the (holograms, rows, columns) initial phase (rad)
+        '''
+        shape=(holograms,)+self.shape
+        if initialPhase is None and self.warmStart and self.phase is not None and len(self.phase) in (1,holograms):
+            initialPhase=self.phase
+        if initialPhase is None:
+            # The same phase for every hologram, so that a hologram does not depend on the batch it is computed in
+            return np.broadcast_to(np.random.default_rng(self.seed).uniform(0,2*np.pi,self.shape),shape)
+        return np.broadcast_to(np.asarray(initialPhase,dtype=float).reshape((-1,)+self.shape),shape)
+
+    def reset(self):
+        '''
+            Forgets the last hologram so that the next one starts from a random phase
+        '''
+        self.phase=None
+
+    def gerchberg_saxton(self,targets,iterations=50,initialPhase=None,sourceAmplitude=None,callback=None):
+        '''
+            Computes the phase holograms whose far field (Fourier transform) intensities best match target images
+            input:
+                - targets (nd.array): the (rows, columns) target intensity, or a (holograms, rows, columns) batch computed together. Every target needs a positive value.
+                  The zero order of the far field is at the center of the images
+                - iterations (int): the largest number of iterations
+                - initialPhase (nd.array): (default None) the initial phase (rad). The last hologram (warm start) or a random phase when None
+                - sourceAmplitude (nd.array): (default None) the amplitude of the beam on the SLM. Uniform when None
+                - callback (callable): (default None) called after every iteration with the iteration number and the errors of the holograms
+            output:
+                - nd.array: the phase holograms (rad, between 0 and 2*pi), with the shape of targets
+                - 1d.array: the final error of every hologram (rms difference of the normalized far field amplitudes)
+        '''
+        targets=np.asarray(targets,dtype=float)
+        single=targets.ndim==2
+        targets=targets.reshape((-1,)+self.shape)
+        holograms=len(targets)
+        if np.any(np.sum(np.maximum(targets,0),axis=(-2,-1))==0):
+            raise(ValueError('The target intensities must have at least one positive value'))
+        # Amplitudes normalized to unit energy, in the FFT order (zero order at [0,0]) so that no shift is needed in the loop
+        target=np.sqrt(np.maximum(fft.ifftshift(targets,axes=(-2,-1)),0))
+        target=(target/np.sqrt(np.sum(target**2,axis=(-2,-1),keepdims=True))).astype(self.realType)
+        source=np.ones(self.shape) if sourceAmplitude is None else np.asarray(sourceAmplitude,dtype=float)
+        source=(source/np.sqrt(np.sum(source**2))).astype(self.realType)
+        tiny=np.finfo(self.realType).tiny
+        field=(source*np.exp(1j*self.get_initialPhase(initialPhase,holograms))).astype(self.dtype)
+        errors=np.full(holograms,np.inf)
+        active=np.arange(holograms)
+        self.errors=[]
+        for iteration in range(iterations):
+            subset=len(active)<holograms
+            far=fft.fft2(field[active] if subset else field,norm='ortho',workers=self.workers,overwrite_x=True)
+            amplitude=np.abs(far)
+            activeTarget=target[active] if subset else target
+            error=np.sqrt(np.sum((amplitude-activeTarget)**2,axis=(-2,-1)))
+            far*=activeTarget/np.maximum(amplitude,tiny)
+            near=fft.ifft2(far,norm='ortho',workers=self.workers,overwrite_x=True)
+            near*=source/np.maximum(np.abs(near),tiny)
+            field[active]=near
+            converged=errors[active]-error<self.tolerance*error
+            errors[active]=error
+            self.errors.append(errors.copy())
+            if callback is not None:
+                callback(iteration,errors.copy())
+            active=active[~converged]
+            if len(active)==0:
+                break
+        phase=np.angle(field)%(2*np.pi)
+        self.phase=phase
+        return (phase[0] if single else phase),errors
+
+    def get_spotFactors(self,x,y,z,radius):
+        '''
+            Gets the phase factors of every spot along the rows and the columns. The tilt and defocus of a spot are separable,
+            exp(i*phase)=rowFactor*columnFactor, so that the spot fields and the superposition are matrix products
+            input:
+                - x, y (1d.array): the positions of the spots in the far field (FFT pixels from the zero order, x along the columns)
+                - z (1d.array): the defocus of the spots (waves at the pupil radius)
+                - radius (float): the pupil radius (pixels)
+            output:
+                - 2d.array: the (spots, rows) row factors
+                - 2d.array: the (spots, columns) column factors
+        '''
+        rowFactors=np.exp(2j*np.pi*(y[:,np.newaxis]*self.rows/self.shape[0]+z[:,np.newaxis]*(self.rows/radius)**2)).astype(self.dtype)
+        columnFactors=np.exp(2j*np.pi*(x[:,np.newaxis]*self.columns/self.shape[1]+z[:,np.newaxis]*(self.columns/radius)**2)).astype(self.dtype)
+        return rowFactors,columnFactors
+
+    def generate_spots(self,x,y,z=None,intensities=None,iterations=30,initialPhase=None,radius=None,callback=None):
+        '''
+            Computes the phase hologram of an array of spots by the weighted Gerchberg-Saxton algorithm
+            input:
+                - x, y (1d.array): the positions of the spots in the far field (FFT pixels from the zero order, x along the columns)
+                - z (1d.array): (default None) the defocus of the spots (waves at the pupil radius). In focus when None
+                - intensities (1d.array): (default None) the relative intensities of the spots. Equal when None.
+                  Spots of intensity 0 are left out of the weighting and of the uniformity (their intensity is still returned)
+                - iterations (int): the largest number of iterations
+                - initialPhase (nd.array): (default None) the initial phase (rad). The last hologram (warm start) or random spot phases when None
+                - radius (float): (default None) the pupil radius for the defocus (pixels). Half the smallest side of the SLM when None
+                - callback (callable): (default None) called after every iteration with the iteration number and the spot intensities
+            output:
+                - 2d.array: the phase hologram (rad, between 0 and 2*pi)
+                - 1d.array: the intensity of every spot (fraction of the SLM light)
+        '''
+        x,y=np.atleast_1d(np.asarray(x,dtype=float)),np.atleast_1d(np.asarray(y,dtype=float))
+        z=np.zeros(len(x)) if z is None else np.broadcast_to(np.asarray(z,dtype=float),x.shape)
+        intensities=np.ones(len(x)) if intensities is None else np.broadcast_to(np.asarray(intensities,dtype=float),x.shape)
+        if np.any(intensities<0) or not np.any(intensities>0):
+            raise(ValueError('The spot intensities must be positive or 0, with at least one positive'))
+        lit=intensities>0
+        radius=min(self.shape)/2 if radius is None else float(radius)
+        rowFactors,columnFactors=self.get_spotFactors(x,y,z,radius)
+        amplitudes=np.sqrt(intensities/intensities.sum())
+        weights=np.ones(len(x))
+        pixels=self.shape[0]*self.shape[1]
+        def get_spotFields(phase):
+            field=np.exp(1j*phase).astype(self.dtype)
+            return np.einsum('ms,sm->m',np.conj(rowFactors),field@np.conj(columnFactors).T)/pixels
+        if initialPhase is None and not (self.warmStart and self.phase is not None and len(self.phase)==1):
+            spotPhases=np.random.default_rng(self.seed).uniform(0,2*np.pi,len(x))
+        else:
+            spotPhases=np.angle(get_spotFields(self.get_initialPhase(initialPhase,1)[0]))
+        uniformity=-np.inf
+        self.errors=[]
+        for iteration in range(iterations):
+            superposition=(rowFactors.T*(weights*amplitudes*np.exp(1j*spotPhases)).astype(self.dtype))@columnFactors
+            phase=np.angle(superposition)
+            spotFields=get_spotFields(phase)
+            spotIntensities=np.abs(spotFields)**2
+            spotPhases=np.angle(spotFields)
+            normalized=np.sqrt(spotIntensities[lit])/amplitudes[lit]
+            # Square root (damped) update: the full correction overshoots and oscillates for few spots of unequal intensities
+            weights[lit]*=np.sqrt(normalized.mean()/np.maximum(normalized,np.finfo(float).tiny))
+            previous,uniformity=uniformity,get_uniformity(spotIntensities[lit]/intensities[lit])
+            self.errors.append(1-uniformity)
+            if callback is not None:
+                callback(iteration,spotIntensities)
+            if abs(uniformity-previous)<self.tolerance:
+                break
+        phase=phase%(2*np.pi)
+        self.phase=phase[np.newaxis]
+        return phase,spotIntensities
@@ -0,0 +1,273 @@
+#############################################################
+#############################################################
+# This module hosts the automatic pixel to wavelength calibration of spectrometer cameras from lamp spectra
+# The peaks of a lamp spectrum are matched to reference emission lines by a robust (RANSAC-like) search:
+# every pair of peaks and pair of lines gives a linear hypothesis, the hypothesis matching the most peaks
+# is kept and refined by polynomial fits. Results are cached per camera, grating and center wavelength.
+#############################################################
+#############################################################
+import json
+import os
+from pathlib import Path
+import numpy as np
+from numpy.polynomial import Polynomial as P
+from scipy.signal import find_peaks
+from src.compute import colbertoutils as co
+
+# Reference emission lines of calibration lamps (nm, in air)
+referenceLines={'Hg':np.array([253.652,296.728,302.150,313.155,334.148,365.015,404.656,407.783,435.833,546.074,576.960,579.066]),
+                'Ar':np.array([696.543,706.722,714.704,727.294,738.398,750.387,751.465,763.511,772.376,794.818,800.616,801.479,
+                               810.369,811.531,826.452,840.821,842.465,852.144,866.794,912.297,922.450])}
+referenceLines['HgAr']=np.sort(np.concatenate([referenceLines['Hg'],referenceLines['Ar']]))
+
+def find_lines(spectrum,prominence=0.02,maximumPeaks=20):
+    '''
+        Finds the emission lines of a lamp spectrum and refines their positions by a parabola on the three highest pixels
+        input:
+            - spectrum (1d.array): the lamp spectrum
+            - prominence (float): the minimal prominence of a line relative to the height of the spectrum above its median
+            - maximumPeaks (int): the number of most prominent lines kept
+        output:
+            - 1d.array: the subpixel positions of the lines (sorted)
+            - 1d.array: the heights of the lines
+    '''
+    spectrum=np.asarray(spectrum,dtype=float)
+    peaks,properties=find_peaks(spectrum,prominence=prominence*(spectrum.max()-np.median(spectrum)))
+    strongest=np.sort(np.argsort(properties['prominences'])[::-1][:maximumPeaks])
+    peaks=peaks[strongest]
+    peaks=peaks[(peaks>0)&(peaks<len(spectrum)-1)]
+    shift,_=co.refine_peaks(spectrum[peaks[:,np.newaxis]+np.arange(-1,2)],'parabola')
+    return peaks+shift,spectrum[peaks]
+
+def nearest_lines(wavelengths,lines):
+    '''
+        Finds the closest reference line to every wavelength
+        input:
+            - wavelengths (nd.array): the wavelengths (nm)
+            - lines (1d.array): the sorted reference lines (nm)
+        output:
+            - nd.array of int: the index of the closest line
+            - nd.array: the distance to the closest line (nm)
+    '''
+    following=np.clip(np.searchsorted(lines,wavelengths),1,len(lines)-1)
+    distancePreceding=np.abs(wavelengths-lines[following-1])
+    distanceFollowing=np.abs(wavelengths-lines[following])
+    closest=np.where(distancePreceding<distanceFollowing,following-1,following)
+    return closest,np.minimum(distancePreceding,distanceFollowing)
+
+def refine_match(peaks,lines,model,degree,tolerance,iterations):
+    '''
+        Refines a pixel to wavelength model by alternately matching every peak to its closest line and fitting the polynomial on the matches.
+        The first matching uses 3*tolerance, the following ones tolerance. A line is attributed to its closest peak only.
+        input:
+            - peaks (1d.array): the sorted peak positions (pixels)
+            - lines (1d.array): the sorted reference lines (nm)
+            - model (numpy Polynomial): the initial pixel to wavelength model
+            - degree (int): the degree of the fitted polynomial (lowered when there are not enough matches)
+            - tolerance (float): the largest distance between a fitted peak wavelength and its line (nm)
+            - iterations (int): the number of refinements after the first one
+        output:
+            - numpy Polynomial: the refined model, or None when less than two peaks match
+            - 1d.array of bool: the matched peaks
+            - 1d.array of int: the index of the line closest to every peak
+    '''
+    matchTolerance=3*tolerance
+    for _ in range(iterations+1):
+        closest,distances=nearest_lines(model(peaks),lines)
+        matched=distances<matchTolerance
+        for line in np.unique(closest[matched]):
+            candidates=np.flatnonzero(matched&(closest==line))
+            best=np.argmin(distances[candidates])
+            matched[candidates[:best]]=False
+            matched[candidates[best+1:]]=False
+        fitDegree=min(degree,int(matched.sum())-1)
+        if fitDegree<1:
+            return None,matched,closest
+        model=P.fit(peaks[matched],lines[closest[matched]],fitDegree).convert()
+        matchTolerance=tolerance
+    closest,distances=nearest_lines(model(peaks),lines)
+    matched&=distances<tolerance
+    return model,matched,closest
+
+def match_lines(peaks,lines,degree=2,tolerance=0.5,dispersionRange=(0.01,5),wavelengthRange=None,iterations=3,hypotheses=32):
+    '''
+        Matches peak positions to reference lines and fits the pixel to wavelength polynomial
+        Every pair of peaks matched to every pair of lines gives a linear hypothesis (both orientations, dispersions within dispersionRange),
+        scored at once by the number of distinct lines it predicts within 3*tolerance of a peak. The best hypotheses are refined (see refine_match)
+        and the one matching the most peaks, then with the smallest rms residual, is kept.
+        input:
+            - peaks (1d.array): the peak positions (pixels)
+            - lines (1d.array or str): the reference lines (nm) or the name of a lamp in referenceLines ('Hg', 'Ar' or 'HgAr')
+            - degree (int): the degree of the fitted polynomial (lowered when there are not enough matches)
+            - tolerance (float): the largest distance between a fitted peak wavelength and its line (nm)
+            - dispersionRange (tuple): the smallest and largest absolute dispersion considered (nm per pixel)
+            - wavelengthRange (tuple): (default None) the range of wavelengths seen by the camera (nm). All the lines are considered when None
+            - iterations (int): the number of fit and match refinements
+            - hypotheses (int): the number of best linear hypotheses refined
+        output:
+            - dict: 'coefficients' of the polynomial (lowest power first, pixel to nm), matched 'pixels' and 'wavelengths', their 'residuals' (nm) and 'rms' (nm)
+    '''
+    lines=np.sort(referenceLines[lines] if isinstance(lines,str) else np.asarray(lines,dtype=float))
+    if wavelengthRange is not None:
+        lines=lines[(lines>=wavelengthRange[0])&(lines<=wavelengthRange[1])]
+    peaks=np.sort(np.asarray(peaks,dtype=float))
+    if len(peaks)<2 or len(lines)<2:
+        raise(ValueError('At least two peaks and two reference lines are needed, got %d peaks and %d lines'%(len(peaks),len(lines))))
+    peakFirst,peakSecond=np.triu_indices(len(peaks),1)
+    lineFirst,lineSecond=np.nonzero(~np.eye(len(lines),dtype=bool))
+    slopes=(lines[lineSecond][np.newaxis,:]-lines[lineFirst][np.newaxis,:])/(peaks[peakSecond]-peaks[peakFirst])[:,np.newaxis]
+    intercepts=lines[lineFirst][np.newaxis,:]-slopes*peaks[peakFirst][:,np.newaxis]
+    valid=(np.abs(slopes)>=dispersionRange[0])&(np.abs(slopes)<=dispersionRange[1])
+    slopes,intercepts=slopes[valid],intercepts[valid]
+    if len(slopes)==0:
+        raise(ValueError('No pair of peaks and lines gives a dispersion within %s nm per pixel'%(dispersionRange,)))
+    closest,distances=nearest_lines(intercepts[:,np.newaxis]+slopes[:,np.newaxis]*peaks,lines)
+    inliers=distances<3*tolerance
+    # Hypotheses are scored by the number of distinct lines matched (several peaks on one line count once), ties broken by the distances
+    matchedLines=np.sort(np.where(inliers,closest,-1),axis=1)
+    distinctLines=(np.diff(matchedLines,axis=1)>0).sum(axis=1)+(matchedLines[:,0]>=0)
+    score=distinctLines-np.where(inliers,distances,0).sum(axis=1)/(3*tolerance*len(peaks)+1)
+    best=None
+    for hypothesis in np.argsort(score)[::-1][:hypotheses]:
+        model,matched,closest=refine_match(peaks,lines,P([intercepts[hypothesis],slopes[hypothesis]]),degree,tolerance,iterations)
+        if model is None or matched.sum()<2:
+            continue
+        residuals=model(peaks[matched])-lines[closest[matched]]
+        rank=(int(matched.sum()),-np.sqrt(np.mean(residuals**2)))
+        if best is None or rank>best[0]:
+            best=(rank,model,matched,closest,residuals)
+    if best is None:
+        raise(ValueError('No hypothesis matched two peaks to reference lines within %g nm'%tolerance))
+    _,model,matched,closest,residuals=best
+    return {'coefficients':model.coef.tolist(),
+            'pixels':peaks[matched].tolist(),
+            'wavelengths':lines[closest[matched]].tolist(),
+            'residuals':residuals.tolist(),
+            'rms':float(np.sqrt(np.mean(residuals**2)))}
+
+def load_spectrum(filename):
+    '''
+        Loads a lamp spectrum saved as text, either as two rows or two columns (pixels, intensities) or as a single column of intensities
+        input:
+            - filename (str): the path of the file
+        output:
+            - 1d.array: the pixel numbers
+            - 1d.array: the intensities
+    '''
+    data=np.loadtxt(filename)
+    if data.ndim==1:
+        return np.arange(len(data)),data
+    if data.shape[0]==2:
+        return data[0],data[1]
+    return data[:,0],data[:,1]
+
+class LineCalibrator:
+    def __init__(self,lines='Hg',cacheFile=None,degree=2,tolerance=0.5,prominence=0.02,**matchArguments):
+        """
+        Instantiates a LineCalibrator object calibrating spectrometer cameras from lamp spectra
+        Input:
+            lines: the reference lines (nm) or the name of a lamp in referenceLines ('Hg', 'Ar' or 'HgAr')
+            cacheFile: (str) the JSON file in which the calibrations are cached per camera, grating and center wavelength. Memory only when None
+            degree: the degree of the fitted polynomial
+            tolerance: the largest distance between a fitted peak wavelength and its line (nm)
+            prominence: the minimal prominence of a line relative to the height of the spectrum above its median
+            matchArguments: other arguments of match_lines (dispersionRange, wavelengthRange, iterations)
+        output:
+            LineCalibrator Object
+        """
+        self.lines=lines
+        self.cacheFile=cacheFile
+        self.degree=degree
+        self.tolerance=tolerance
+        self.prominence=prominence
+        self.matchArguments=matchArguments
+        self.cache={}
+        if cacheFile is not None and os.path.exists(cacheFile):
+            with open(cacheFile) as file:
+                self.cache=json.load(file)
+
+    @staticmethod
+    def get_key(camera,grating,center):
+        '''
+            output:
+                - str: the key of a calibration in the cache
+        '''
+        return '%s|%s|%s'%(camera,grating,center)
+
+    def get_cached(self,camera,grating,center):
+        '''
+            Gets a cached calibration
+            input:
+                - camera,grating,center: the camera name, grating and center wavelength of the spectrometer
+            output:
+                - dict: the calibration (see match_lines) or None if it is not cached
+        '''
+        return self.cache.get(self.get_key(camera,grating,center))
+
+    def write_cache(self):
+        '''
+            Writes the cached calibrations to the cache file
+        '''
+        if self.cacheFile is not None:
+            temporaryFile=self.cacheFile+'.tmp'
+            with open(temporaryFile,'w') as file:
+                json.dump(self.cache,file,indent=1)
+            os.replace(temporaryFile,self.cacheFile)
+
+    def calibrate(self,spectrum,camera,grating,center,force=False,write=True):
+        '''
+            Calibrates the camera from a lamp spectrum, or gets the cached calibration of this camera, grating and center wavelength
+            input:
+                - spectrum (1d.array): the lamp spectrum
+                - camera,grating,center: the camera name, grating and center wavelength of the spectrometer
+                - force (bool): when True the calibration is done even if it is cached
+                - write (bool): when True the cache file is updated
+            output:
+                - dict: the calibration (see match_lines)
+        '''
+        key=self.get_key(camera,grating,center)
+        if not force and key in self.cache:
+            return self.cache[key]
+        peaks,_=find_lines(spectrum,prominence=self.prominence)
+        result=match_lines(peaks,self.lines,degree=self.degree,tolerance=self.tolerance,**self.matchArguments)
+        self.cache[key]=result
+        if write:
+            self.write_cache()
+        return result
+
+    def calibrate_folder(self,folder,camera,grating,pattern='*',get_center=None,force=False):
+        '''
+            Calibrates every lamp spectrum of a folder in one call (see load_spectrum for the file layout)
+            input:
+                - folder (str): the folder of the spectra
+                - camera,grating: the camera name and grating of the spectrometer
+                - pattern (str): the glob pattern of the spectra files
+                - get_center (callable): function giving the center wavelength from the path of a file. The file name (without extension) is used when None
+                - force (bool): when True the calibrations are done even if they are cached
+            output:
+                - dict: the calibration (see match_lines) of every file by path. Files which could not be calibrated hold the error message
+        '''
+        results={}
+        for path in sorted(Path(folder).glob(pattern)):
+            if not path.is_file():
+                continue
+            center=get_center(path) if get_center is not None else path.stem
+            try:
+                _,spectrum=load_spectrum(path)
+                results[str(path)]=self.calibrate(spectrum,camera,grating,center,force=force,write=False)
+            except ValueError as error:
+                results[str(path)]={'error':str(error)}
+        self.write_cache()
+        return results
+
+    @staticmethod
+    def get_wavelengthAxis(result,pixels):
+        '''
+            Evaluates a calibration on the camera pixels
+            input:
+                - result (dict): the calibration (see match_lines)
+                - pixels (nd.array): the pixel numbers
+            output:
+                - nd.array: the wavelength of every pixel (nm)
+        '''
+        return P(result['coefficients'])(pixels)
@@ -0,0 +1,211 @@
+#############################################################
+#############################################################
+# This module hosts a bank of named beam presets stored on disk
+# Each preset holds the state of the beams (see Beam.get_state) in a JSON file
+# and the full-panel SLM frame they produce in a memory-mapped .npy stack,
+# so that switching presets is a slice of the stack instead of a new computation.
+# A full stack is grown into a new versioned file: a mapped file is never replaced (Windows forbids it),
+# and the former file is deleted once it is no longer mapped
+#############################################################
+#############################################################
+import json
+import os
+import numpy as np
+from src.compute.compositor import Compositor
+
+class PresetBank:
+    metadataFilename='presets.json'
+    framesFilename='frames.npy' # Stack of the banks created before the stacks were versioned
+    versionedFramesFilename='frames_%d.npy'
+
+    def __init__(self,directory,SLM=None,dtype=np.uint8,capacity=16):
+        """
+        Instantiates a PresetBank object stored in a directory. The presets already saved in the directory are reloaded.
+        Input:
+            directory: (str) the directory holding the metadata (presets.json) and the frames (frames_<version>.npy) of the bank. Created if needed
+            SLM: the SLM object on which the frames are displayed. Required to create a new bank (sets the frame size)
+            dtype: the dtype of the gray levels of a new bank (uint8 by default)
+            capacity: the number of frames allocated in a new bank. The stack is reallocated with twice the capacity when full
+        output:
+            PresetBank Object
+        """
+        self.directory=directory
+        self.frames=None
+        if os.path.exists(self.get_metadataPath()):
+            with open(self.get_metadataPath()) as file:
+                self.metadata=json.load(file)
+            self.frames=np.load(self.get_framesPath(),mmap_mode='r+')
+            self.delete_staleFrames()
+        else:
+            if SLM is None:
+                raise(ValueError('An SLM is required to create a new preset bank in %s'%directory))
+            os.makedirs(directory,exist_ok=True)
+            width,height=SLM.get_size()
+            self.metadata={'shape':[height,width],'dtype':np.dtype(dtype).str,'presets':{},'framesVersion':0,'staleFrames':[]}
+            self.allocate_frames(capacity)
+
+    def get_metadataPath(self):
+        '''
+            output:
+                - str: the path of the JSON file holding the beam states and frame indices of the presets
+        '''
+        return os.path.join(self.directory,self.metadataFilename)
+
+    def get_framesPath(self):
+        '''
+            output:
+                - str: the path of the current .npy stack of frames
+        '''
+        version=self.metadata.get('framesVersion',0)
+        return os.path.join(self.directory,self.versionedFramesFilename%version if version else self.framesFilename)
+
+    def write_metadata(self):
+        '''
+            Writes the presets metadata to disk. The file is replaced atomically so that the bank stays readable if interrupted
+        '''
+        temporaryPath=self.get_metadataPath()+'.tmp'
+        with open(temporaryPath,'w') as file:
+            json.dump(self.metadata,file,indent=1)
+        os.replace(temporaryPath,self.get_metadataPath())
+
+    def allocate_frames(self,capacity):
+        '''
+            Allocates the memory-mapped stack of frames with a given capacity in a new versioned file, keeping the frames already stored.
+            The metadata is switched to the new file before the former one is deleted, so that the bank stays readable if interrupted.
+            input:
+                - capacity (int): the number of frames of the new stack
+        '''
+        formerPath=None if self.frames is None else self.get_framesPath()
+        version=self.metadata.get('framesVersion',0)+1
+        shape=(capacity,)+tuple(self.metadata['shape'])
+        path=os.path.join(self.directory,self.versionedFramesFilename%version)
+        frames=np.lib.format.open_memmap(path,mode='w+',dtype=np.dtype(self.metadata['dtype']),shape=shape)
+        if self.frames is not None:
+            numberFrames=len(self)
+            frames[:numberFrames]=self.frames[:numberFrames]
+        frames.flush()
+        self.frames=frames # Drops the mapping of the former stack (frames previously returned by get_frame keep it alive)
+        self.metadata['framesVersion']=version
+        if formerPath is not None:
+            self.metadata.setdefault('staleFrames',[]).append(os.path.basename(formerPath))
+        self.write_metadata()
+        self.delete_staleFrames()
+
+    def delete_staleFrames(self):
+        '''
+            Deletes the former stacks of frames. A stack still mapped by frames returned by get_frame cannot be deleted on Windows:
+            it is kept and deleted by a later call, once the views are released
+        '''
+        staleFrames=self.metadata.get('staleFrames',[])
+        remaining=[]
+        for filename in staleFrames:
+            try:
+                os.remove(os.path.join(self.directory,filename))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                remaining.append(filename)
+        if remaining!=staleFrames:
+            self.metadata['staleFrames']=remaining
+            self.write_metadata()
+
+    def get_capacity(self):
+        '''
+            Gets the number of frames allocated on disk
+            output:
+                - int: the capacity of the stack of frames
+        '''
+        return self.frames.shape[0]
+
+    def get_names(self):
+        '''
+            Gets the names of the presets in the bank
+            output:
+                - list of str: the preset names in the order they were saved
+        '''
+        return list(self.metadata['presets'])
+
+    def save_preset(self,name,beams,frame=None):
+        '''
+            Saves the state of the beams and their frame under a name (an existing preset with this name is replaced)
+            input:
+                - name (str): the name of the preset
+                - beams (dict): the Beam objects by name (e.g. DataHandling.beams)
+                - frame (2d.array): (default None) the (rows,columns) full-panel frame of the beams. Composed from the beams when not provided
+        '''
+        if frame is None:
+            if not beams:
+                raise(ValueError('A frame or at least one beam is required to save a preset'))
+            compositor=Compositor(next(iter(beams.values())).calibration.SLM,dtype=np.dtype(self.metadata['dtype']))
+            compositor.set_beams(beams)
+            frame=compositor.compose()
+        if tuple(np.shape(frame))!=tuple(self.metadata['shape']):
+            raise(ValueError('The frame shape %s does not match the shape %s of the bank'%(np.shape(frame),tuple(self.metadata['shape']))))
+        if name in self.metadata['presets']:
+            index=self.metadata['presets'][name]['index']
+        else:
+            index=len(self)
+            if index==self.get_capacity():
+                self.allocate_frames(2*self.get_capacity())
+        self.frames[index]=frame
+        self.frames.flush()
+        self.metadata['presets'][name]={'index':index,'beams':{beamName:beam.get_state() for beamName,beam in beams.items()}}
+        self.write_metadata()
+
+    def get_frame(self,name):
+        '''
+            Gets the frame of a preset without any computation
+            input:
+                - name (str): the name of the preset
+            output:
+                - 2d.array: the (rows,columns) frame of the preset, a read-only view of the memory-mapped stack
+        '''
+        frame=self.frames[self.metadata['presets'][name]['index']]
+        frame.flags.writeable=False
+        return frame
+
+    def get_beamStates(self,name):
+        '''
+            Gets the beam states saved in a preset
+            input:
+                - name (str): the name of the preset
+            output:
+                - dict: the states (see Beam.get_state) by beam name
+        '''
+        return self.metadata['presets'][name]['beams']
+
+    def load_preset(self,name,beams):
+        '''
+            Restores the state of the beams saved in a preset and gets its frame
+            input:
+                - name (str): the name of the preset
+                - beams (dict): the Beam objects by name. Beams present in the preset are updated, the others are left untouched
+            output:
+                - 2d.array: the (rows,columns) frame of the preset, a read-only view of the memory-mapped stack
+        '''
+        for beamName,state in self.get_beamStates(name).items():
+            if beamName in beams:
+                beams[beamName].set_state(state)
+        return self.get_frame(name)
+
+    def delete_preset(self,name):
+        '''
+            Removes a preset from the bank. The last frame of the stack is moved in its slot to keep the stack contiguous
+            input:
+                - name (str): the name of the preset
+        '''
+        index=self.metadata['presets'].pop(name)['index']
+        lastIndex=len(self)
+        if index!=lastIndex:
+            for preset in self.metadata['presets'].values():
+                if preset['index']==lastIndex:
+                    self.frames[index]=self.frames[lastIndex]
+                    preset['index']=index
+            self.frames.flush()
+        self.write_metadata()
+
+    def __len__(self):
+        return len(self.metadata['presets'])
+
+    def __contains__(self,name):
+        return name in self.metadata['presets']
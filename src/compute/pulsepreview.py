@@ -0,0 +1,188 @@
+#############################################################
+#############################################################
+# This module hosts a class previewing the temporal pulse shaped by a beam
+# The spectrum on the SLM columns is resampled on a uniform angular frequency grid
+# and the temporal field is obtained by FFT. The grid, interpolation weights, phase basis
+# and FFT buffer are cached so that the preview can be refreshed at camera rates
+#############################################################
+#############################################################
+import numpy as np
+import scipy.fft
+from scipy.constants import pi
+
+class PulsePreview:
+    def __init__(self,beam,numberPoints=1024,padding=8,workers=-1):
+        """
+        Instantiates a PulsePreview object computing the temporal pulse shaped by a beam
+        Input:
+            beam: the Beam object whose current phase is previewed
+            numberPoints: (int) number of points of the uniform angular frequency grid spanning the SLM
+            padding: (int) zero padding factor of the FFT. Sets the time sampling (the time window is fixed by numberPoints)
+            workers: (int) number of threads used by scipy.fft (-1 uses all the cores)
+        output:
+            PulsePreview Object
+        """
+        self.beam=beam
+        self.numberPoints=numberPoints
+        self.padding=padding
+        self.workers=workers
+        self.spectrum=None # Spectral intensity at every SLM column. Flat when None
+        self.detuningAxis=None # Detuning axis of the beam for which the grid was computed
+        self.uniformDetuning=None # Uniform angular frequency grid (detuning from the compression carrier in rad.Hz)
+        self.interpolationIndices=None # Indices of the SLM columns preceding and following every point of the grid
+        self.interpolationWeights=None # Linear interpolation weight of the following column at every point of the grid
+        self.spectralAmplitude=None # Field amplitude on the grid
+        self.phaseBasis=None # Vandermonde matrix of the grid (powers of fs)
+        self.timeAxis=None # Time axis of the preview (fs)
+        self.fieldBuffer=None # Zero padded spectral field handed to the FFT
+
+    def set_spectrum(self,spectrum):
+        '''
+            Sets the spectral intensity of the beam on the SLM (e.g. measured by the spectrometer and mapped on the SLM columns)
+            input:
+                - spectrum (1d.array): The spectral intensity at every column of the SLM. A flat spectrum is used when None
+        '''
+        self.spectrum=None if spectrum is None else np.asarray(spectrum,dtype=float)
+        self.spectralAmplitude=None
+
+    def update_grid(self):
+        '''
+            Computes the uniform angular frequency grid, the interpolation weights from the SLM columns, the phase basis and the time axis
+            Done only when the detuning axis of the beam changed (calibration or compression carrier)
+        '''
+        detuningAxis=self.beam.get_detuningAxis()
+        if detuningAxis is self.detuningAxis:
+            return
+        order=np.argsort(detuningAxis)
+        sortedDetuning=detuningAxis[order]
+        self.uniformDetuning=np.linspace(sortedDetuning[0],sortedDetuning[-1],self.numberPoints)
+        following=np.clip(np.searchsorted(sortedDetuning,self.uniformDetuning,side='right'),1,len(sortedDetuning)-1)
+        self.interpolationWeights=(self.uniformDetuning-sortedDetuning[following-1])/(sortedDetuning[following]-sortedDetuning[following-1])
+        self.interpolationIndices=order[following-1],order[following]
+        self.phaseBasis=np.polynomial.polynomial.polyvander(self.uniformDetuning*1e-15,2)
+        step=self.uniformDetuning[1]-self.uniformDetuning[0]
+        numberTimes=self.numberPoints*self.padding
+        self.timeAxis=scipy.fft.fftshift(scipy.fft.fftfreq(numberTimes,d=step/(2*pi)))*1e15
+        self.fieldBuffer=np.zeros(numberTimes,dtype=complex)
+        self.spectralAmplitude=None
+        self.detuningAxis=detuningAxis
+
+    def resample(self,values):
+        '''
+            Resamples values defined on the SLM columns on the uniform angular frequency grid (linear interpolation with cached weights)
+            input:
+                - values (nd.array): The values at every SLM column (last axis)
+            output:
+                - nd.array: The values on the uniform grid
+        '''
+        self.update_grid()
+        preceding,following=self.interpolationIndices
+        values=np.asarray(values)
+        return values[...,preceding]*(1-self.interpolationWeights)+values[...,following]*self.interpolationWeights
+
+    def get_spectralAmplitude(self):
+        '''
+            Gets the field amplitude on the uniform grid, normalized to a unit maximum
+            output:
+                - 1d.array: The field amplitude at every point of the grid
+        '''
+        self.update_grid()
+        if self.spectralAmplitude is None:
+            if self.spectrum is None:
+                amplitude=np.ones(self.numberPoints)
+            else:
+                amplitude=np.sqrt(np.clip(self.resample(self.spectrum),0,None))
+            self.spectralAmplitude=amplitude/amplitude.max()
+        return self.spectralAmplitude
+
+    def get_uniformDetuning(self):
+        '''
+            Gets the uniform angular frequency grid
+            output:
+                - 1d.array: The detuning from the compression carrier at every point of the grid (rad.Hz)
+        '''
+        self.update_grid()
+        return self.uniformDetuning
+
+    def get_timeAxis(self):
+        '''
+            Gets the time axis of the preview, centered on zero
+            output:
+                - 1d.array: The times (fs)
+        '''
+        self.update_grid()
+        return self.timeAxis
+
+    def get_phaseBasis(self,order):
+        '''
+            Gets the Vandermonde matrix of the uniform grid, grown on demand
+            input:
+                - order (int): The number of powers (number of polynomial coefficients)
+            output:
+                - 2d.array: The (points,order) matrix of the powers of the detuning (in fs^-n)
+        '''
+        self.update_grid()
+        if self.phaseBasis.shape[1]<order:
+            self.phaseBasis=np.polynomial.polynomial.polyvander(self.uniformDetuning*1e-15,order-1)
+        return self.phaseBasis[:,:order]
+
+    def get_spectralPhase(self,phases=None,mode='relative',unit='fs'):
+        '''
+            Evaluates spectral phases on the uniform grid
+            input:
+                - phases (list of numpy Polynomial objects or 2d.array): (default None) N phase profiles or a (N,order) matrix of their coefficients (see Beam.evaluate_phases).
+                    The current phase of the beam is used when None
+                - mode (string): Specifies if the phases are relative to the optimal phase profile ('relative', default) or absolute ('absolute')
+                - unit (str, default 'fs'): The units in which the phase coefficients are provided.
+            output:
+                - nd.array: The phase (rad) on the grid, of shape (points,) for the current phase or (N,points) otherwise
+        '''
+        if phases is None:
+            coefficients=self.beam.get_phaseCoefficients([self.beam.get_currentPhase()],mode='absolute',unit='s',outputUnit='fs')[0]
+        else:
+            coefficients=self.beam.get_phaseCoefficients(phases,mode=mode,unit=unit,outputUnit='fs')
+        return coefficients@self.get_phaseBasis(coefficients.shape[-1]).T
+
+    def get_temporalField(self,phases=None,mode='relative',unit='fs'):
+        '''
+            Computes the temporal field of the pulse by FFT of the spectral field on the uniform grid.
+            A positive linear phase coefficient delays the pulse to positive times.
+            input:
+                - phases: (default None) the phases to preview (see get_spectralPhase). The current phase of the beam is used when None
+                - mode (string): Specifies if the phases are relative to the optimal phase profile ('relative', default) or absolute ('absolute')
+                - unit (str, default 'fs'): The units in which the phase coefficients are provided.
+            output:
+                - nd.array (complex): The temporal envelope on the time axis (see get_timeAxis), of shape (times,) or (N,times)
+                    normalized so that a flat phase gives a unit peak
+        '''
+        spectralPhase=self.get_spectralPhase(phases,mode=mode,unit=unit)
+        spectralAmplitude=self.get_spectralAmplitude()
+        normalization=1/spectralAmplitude.sum()
+        if spectralPhase.ndim==1:
+            # The preallocated zero padded buffer is reused for the current phase
+            np.multiply(spectralAmplitude*normalization,np.exp(1j*spectralPhase),out=self.fieldBuffer[:self.numberPoints])
+            temporalField=scipy.fft.fft(self.fieldBuffer,workers=self.workers)
+        else:
+            temporalField=scipy.fft.fft(spectralAmplitude*normalization*np.exp(1j*spectralPhase),n=len(self.fieldBuffer),axis=-1,workers=self.workers)
+        return scipy.fft.fftshift(temporalField,axes=-1)
+
+    def get_temporalIntensity(self,phases=None,mode='relative',unit='fs'):
+        '''
+            Computes the temporal intensity of the pulse (see get_temporalField)
+            output:
+                - nd.array: The temporal intensity on the time axis, relative to the peak of the pulse with a flat phase
+        '''
+        temporalField=self.get_temporalField(phases,mode=mode,unit=unit)
+        return temporalField.real**2+temporalField.imag**2
+
+    def get_pulseDuration(self,phases=None,mode='relative',unit='fs'):
+        '''
+            Computes the root mean square duration of the pulse
+            output:
+                - float or 1d.array: The rms duration (fs) of the pulse, or of each of the N phases
+        '''
+        intensity=self.get_temporalIntensity(phases,mode=mode,unit=unit)
+        timeAxis=self.get_timeAxis()
+        energy=intensity.sum(axis=-1)
+        meanTime=intensity@timeAxis/energy
+        return np.sqrt(np.clip(intensity@timeAxis**2/energy-meanTime**2,0,None))
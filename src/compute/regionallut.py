@@ -0,0 +1,116 @@
+#############################################################
+#############################################################
+# This module hosts the regional lookup tables of the SLM, converting gray levels to the levels sent to
+# the panel with a different table in every region of the panel (e.g. 8x8 regions of Meadowlark SLMs)
+# Every table file is parsed once into a compact (regions,levels) array, and every frame is converted
+# with a single lookup indexed by a precomputed map of the region of every pixel.
+#############################################################
+#############################################################
+from functools import lru_cache
+import os
+import numpy as np
+
+@lru_cache(maxsize=16)
+def parse_tables(filename,modified):
+    '''
+        Parses a regional lookup table file, cached per file and modification time
+        input:
+            - filename (str): the path of the file
+            - modified (int): the modification time of the file (ns), so that a modified file is parsed again
+        output:
+            - 2d.array: the read-only (regions,levels) tables
+    '''
+    table=np.loadtxt(filename,ndmin=2)
+    # One line per input level: the level followed by the output level of every region
+    tables=np.ascontiguousarray(table[:,1:].T)
+    tables=tables.astype(np.uint8 if tables.max()<256 else np.uint16)
+    tables.flags.writeable=False
+    return tables
+
+def load_tables(filename):
+    '''
+        Loads the tables of a regional lookup table file, laid out as one line per input gray level
+        holding the level followed by the output level of every region (regions numbered row by row from the top left)
+        input:
+            - filename (str): the path of the file
+        output:
+            - 2d.array: the read-only (regions,levels) tables, uint8 or uint16 depending on the largest level
+    '''
+    filename=os.path.abspath(filename)
+    return parse_tables(filename,os.stat(filename).st_mtime_ns)
+
+@lru_cache(maxsize=4)
+def get_regionMap(width,height,regions):
+    '''
+        Gets the region of every pixel of the SLM, cached per size and number of regions
+        input:
+            - width, height (int): the size of the SLM (pixels)
+            - regions (int): the number of regions, a square number (e.g. 64 for 8x8 regions)
+        output:
+            - 2d.array: the read-only (rows,columns) region indices, numbered row by row from the top left
+    '''
+    grid=int(round(np.sqrt(regions)))
+    if grid*grid!=regions:
+        raise(ValueError('%d regions do not make a square grid'%regions))
+    regionMap=(np.arange(height)*grid//height)[:,np.newaxis]*grid+(np.arange(width)*grid//width)[np.newaxis,:]
+    regionMap.flags.writeable=False
+    return regionMap
+
+class RegionalLUT:
+    def __init__(self,width,height,tables=None):
+        """
+        Instantiates a RegionalLUT object converting the frames of an SLM with one lookup table per region
+        Input:
+            width, height: (int) the size of the SLM (pixels)
+            tables: (2d.array or str) (default None) the (regions,levels) tables, or the path of a table file (see load_tables)
+        output:
+            RegionalLUT Object
+        """
+        self.width=width
+        self.height=height
+        self.tables=None
+        self.flatTables=None
+        self.offsets=None # Index of the table of every pixel in the flattened tables, (rows,columns)
+        self.indices=None # Preallocated lookup indices
+        if tables is not None:
+            self.set_tables(tables)
+
+    def set_tables(self,tables):
+        '''
+            Sets the lookup tables. Tables of the same shape are swapped without recomputing the region map
+            input:
+                - tables (2d.array or str): the (regions,levels) tables, or the path of a table file (parsed once, see load_tables)
+        '''
+        if isinstance(tables,(str,os.PathLike)):
+            tables=load_tables(tables)
+        tables=np.asarray(tables)
+        if tables.ndim!=2:
+            raise(ValueError('The regional tables must be a (regions,levels) array, got shape %s'%(tables.shape,)))
+        if self.tables is None or self.tables.shape!=tables.shape:
+            regions,levels=tables.shape
+            self.offsets=get_regionMap(self.width,self.height,regions)*levels
+            self.indices=np.empty((self.height,self.width),dtype=np.intp)
+        self.tables=tables
+        self.flatTables=tables.reshape(-1)
+
+    def get_tables(self):
+        '''
+            output:
+                - 2d.array: the (regions,levels) tables, None if none was set
+        '''
+        return self.tables
+
+    def apply(self,image,out=None):
+        '''
+            Converts a frame with the table of the region of every pixel
+            input:
+                - image (2d.array): the (rows,columns) gray levels, lower than the number of levels of the tables (not checked)
+                - out (2d.array): (default None) the array in which to write the converted frame (may be image itself when the dtypes match)
+            output:
+                - 2d.array: the (rows,columns) converted frame, with the dtype of the tables
+        '''
+        if self.tables is None:
+            raise(ValueError('No regional tables were set'))
+        np.add(self.offsets,image,out=self.indices)
+        # mode='clip' writes directly in out (the default mode goes through a temporary copy to check the indices)
+        return np.take(self.flatTables,self.indices,out=out,mode='clip')
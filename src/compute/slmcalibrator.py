@@ -0,0 +1,163 @@
+#############################################################
+#############################################################
+# This module hosts a procedure calibrating the wavelength diffracted by every column of the SLM
+# Narrow windows of grating are displayed across the SLM columns and the peaks they produce
+# on a spectrometer are fitted by a polynomial stored in the Calibration (set_pixelToWavelength).
+# Several windows are displayed per frame to reduce the number of acquisitions. Their peaks are
+# attributed from a coarse calibration measured first with single-window reference frames.
+#############################################################
+#############################################################
+import numpy as np
+from numpy.polynomial import Polynomial as P
+from scipy.signal import find_peaks
+from src.compute import colbertoutils as co
+from src.compute.beams import Beam
+
+class SLMCalibrator:
+    def __init__(self,calibration,spectrometer,rows=None,period=10,amplitude=1):
+        """
+        Instantiates a SLMCalibrator object measuring the pixel to wavelength calibration of an SLM
+        Input:
+            calibration: the Calibration object of the SLM, in which the fitted polynomial is stored. Its phase to gray level table is used to render the windows
+            spectrometer: the spectrometer measuring the diffracted beam (get_wavelength in nm and get_intensities)
+            rows: the [beginning, end] rows of the beam on the SLM. The whole SLM height by default
+            period: the period of the grating of the windows in pixels
+            amplitude: the amplitude of the grating of the windows in units of 2*pi
+        output:
+            SLMCalibrator Object
+        """
+        self.calibration=calibration
+        self.SLM=calibration.SLM
+        self.spectrometer=spectrometer
+        width,height=self.SLM.get_size()
+        self.rows=[0,height] if rows is None else rows
+        self.period=period
+        self.amplitude=amplitude
+        # Flat phase grating of the band (columns,rows), windowed by the masks of every frame
+        self.grating=Beam.generate_2Dgrating(amplitude,period,np.zeros(width),num=self.rows[1]-self.rows[0])
+        self.image=np.zeros((height,width),dtype=calibration.get_phaseToGrayscale().dtype)
+        self.columns=None # SLM columns of the windows whose peak was found
+        self.wavelengths=None # Wavelength (m) of the peak of each window
+        self.residuals=None # Difference between the fitted and measured wavelengths (m)
+        self.acquisitions=0
+
+    @staticmethod
+    def get_windowsMask(centers,windowWidth,numberColumns):
+        '''
+            Builds an amplitude mask made of windows of full grating depth
+            input:
+                - centers (1d.array of int): the central column of every window
+                - windowWidth (int): the number of columns of every window
+                - numberColumns (int): the number of columns of the SLM
+            output:
+                - 1d.array: the mask at every column (1 in the windows, 0 elsewhere)
+        '''
+        mask=np.zeros(numberColumns)
+        for center in centers:
+            mask[max(center-windowWidth//2,0):center-windowWidth//2+windowWidth]=1
+        return mask
+
+    def acquire(self,mask):
+        '''
+            Displays the windowed grating on the SLM and acquires a spectrum
+            input:
+                - mask (1d.array): the amplitude mask of the grating at every column
+            output:
+                - 1d.array: the wavelengths of the spectrometer (nm)
+                - 1d.array: the intensities measured
+        '''
+        self.calibration.get_grayscaleAtPhase(self.grating*mask[:,np.newaxis],out=self.image[self.rows[0]:self.rows[1]].T)
+        self.SLM.write_image(self.image,self.image.dtype==np.uint8)
+        self.acquisitions+=1
+        return np.asarray(self.spectrometer.get_wavelength(),dtype=float),np.asarray(self.spectrometer.get_intensities(),dtype=float)
+
+    @staticmethod
+    def find_windowPeaks(wavelengths,intensities,threshold,distance=None):
+        '''
+            Finds the peaks produced by the windows in a spectrum, refined to subpixel positions by a parabola on the three highest points
+            input:
+                - wavelengths (1d.array): the wavelengths of the spectrometer pixels (nm)
+                - intensities (1d.array): the spectrum
+                - threshold (float): the minimal height of a peak relative to the highest one
+                - distance (int): the minimal distance between peaks in spectrometer pixels
+            output:
+                - 1d.array: the wavelengths of the peaks (nm), sorted
+        '''
+        peaks,_=find_peaks(intensities,height=threshold*intensities.max(),distance=distance)
+        peaks=peaks[(peaks>0)&(peaks<len(intensities)-1)]
+        shift,_=co.refine_peaks(intensities[peaks[:,np.newaxis]+np.arange(-1,2)],'parabola')
+        return np.sort(np.interp(peaks+shift,np.arange(len(wavelengths)),wavelengths))
+
+    def calibrate(self,windowWidth=8,numberWindows=48,windowsPerFrame=8,referenceWindows=5,degree=2,threshold=0.2,margin=None,apply=True):
+        '''
+            Sweeps windows across the SLM columns, fits the wavelength of their peaks and stores the polynomial in the calibration
+            A first coarse linear calibration (orientation and dispersion) is measured with one window per frame. The windows displayed together
+            are then attributed to the peaks closest to their coarse wavelength, which requires the windows of a frame to be further apart than the coarse calibration error.
+            input:
+                - windowWidth (int): the number of columns of every window
+                - numberWindows (int): the number of windows swept across the SLM
+                - windowsPerFrame (int): the number of windows displayed in every frame
+                - referenceWindows (int): the number of single window frames of the coarse calibration (at least 2 must give a peak)
+                - degree (int): the degree of the fitted polynomial
+                - threshold (float): the minimal height of a peak relative to the highest one in each spectrum
+                - margin (int): the number of columns left on the sides of the SLM. One window width by default
+                - apply (bool): when True, the polynomial is stored in the calibration with set_pixelToWavelength
+            output:
+                - numpy Polynomial: the wavelength (m) diffracted at every SLM column
+        '''
+        numberColumns=self.SLM.get_size()[0]
+        margin=windowWidth if margin is None else margin
+        centers=np.linspace(margin,numberColumns-1-margin,numberWindows).round().astype(int)
+        numberFrames=int(np.ceil(numberWindows/windowsPerFrame))
+        # Coarse calibration from single window frames spread over the central part of the SLM
+        referenceCenters=np.linspace(numberColumns/4,3*numberColumns/4,referenceWindows).round().astype(int)
+        referenceColumns,referenceWavelengths=[],[]
+        for center in referenceCenters:
+            wavelengths,intensities=self.acquire(self.get_windowsMask([center],windowWidth,numberColumns))
+            peaks=self.find_windowPeaks(wavelengths,intensities,threshold)
+            if len(peaks)==1:
+                referenceColumns.append(center)
+                referenceWavelengths.append(peaks[0])
+        if len(referenceColumns)<2:
+            raise(ValueError('Only %d of the %d reference windows gave a single peak on the spectrometer'%(len(referenceColumns),referenceWindows)))
+        coarseCalibration=P.fit(referenceColumns,referenceWavelengths,1)
+        # Grouped windows attributed to the peak closest to their coarse wavelength
+        tolerance=abs(coarseCalibration.deriv()(numberColumns/2))*numberFrames*(centers[1]-centers[0])/2
+        columns,peakWavelengths=[],[]
+        for frame in range(numberFrames):
+            frameCenters=centers[frame::numberFrames]
+            wavelengths,intensities=self.acquire(self.get_windowsMask(frameCenters,windowWidth,numberColumns))
+            peaks=self.find_windowPeaks(wavelengths,intensities,threshold)
+            if len(peaks)==0:
+                continue
+            for center,expected in zip(frameCenters,coarseCalibration(frameCenters)):
+                closest=np.argmin(np.abs(peaks-expected))
+                if abs(peaks[closest]-expected)<tolerance:
+                    columns.append(center)
+                    peakWavelengths.append(peaks[closest])
+        if len(columns)<=degree:
+            raise(ValueError('Only %d windows gave a peak, not enough to fit a polynomial of degree %d'%(len(columns),degree)))
+        order=np.argsort(columns)
+        self.columns=np.array(columns)[order]
+        self.wavelengths=np.array(peakWavelengths)[order]*1e-9
+        pixelToWavelength=P.fit(self.columns,self.wavelengths,degree).convert()
+        self.residuals=pixelToWavelength(self.columns)-self.wavelengths
+        if apply:
+            self.calibration.set_pixelToWavelength(pixelToWavelength)
+        return pixelToWavelength
+
+    def get_residuals(self):
+        '''
+            Gets the residuals of the last calibration
+            output:
+                - 1d.array: the SLM columns of the windows whose peak was found
+                - 1d.array: the difference between the fitted and measured wavelengths (m)
+        '''
+        return self.columns,self.residuals
+
+    def get_acquisitions(self):
+        '''
+            output:
+                - int: the number of spectra acquired since the calibrator was instantiated
+        '''
+        return self.acquisitions
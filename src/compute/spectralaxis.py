@@ -0,0 +1,97 @@
+#############################################################
+#############################################################
+# This module hosts a class holding a spectral axis in one canonical unit
+# The wavelength, frequency, angular frequency and energy representations are computed on first request
+# and cached (read-only), so that an axis shared by the calibration, the beams and the data handling is
+# converted once. Slicing an axis slices every cached representation without copying.
+#############################################################
+#############################################################
+import numpy as np
+from scipy.constants import c,h,pi,e
+
+# Every unit is related to the vacuum wavelength (m) by value=reciprocalConstants[unit]/wavelength
+reciprocalConstants={'frequency':c, # Hz
+                     'ang_frequency':2*pi*c, # rad.Hz
+                     'energy':h*c/e} # eV
+units=('wavelength',)+tuple(reciprocalConstants)
+
+def convert(values,unit,outputUnit):
+    '''
+        Converts spectral positions between units
+        input:
+            - values (nd.array): the spectral positions
+            - unit (str): the unit of values ('wavelength' (m), 'frequency' (Hz), 'ang_frequency' (rad.Hz) or 'energy' (eV))
+            - outputUnit (str): the unit to convert to
+        output:
+            - nd.array: the spectral positions in outputUnit (values itself when the units are the same)
+    '''
+    for name in (unit,outputUnit):
+        if name not in units:
+            raise(ValueError('Unknown spectral unit %s, must be one of %s'%(name,units)))
+    if unit==outputUnit:
+        return values
+    if unit=='wavelength':
+        return reciprocalConstants[outputUnit]/values
+    if outputUnit=='wavelength':
+        return reciprocalConstants[unit]/values
+    return values*(reciprocalConstants[outputUnit]/reciprocalConstants[unit])
+
+class SpectralAxis:
+    def __init__(self,values,unit='wavelength'):
+        """
+        Instantiates a SpectralAxis object
+        Input:
+            values: the spectral positions (not copied when already a float array, but made read-only through a view)
+            unit: the unit of values, which becomes the canonical unit of the axis ('wavelength' (m), 'frequency' (Hz), 'ang_frequency' (rad.Hz) or 'energy' (eV))
+        output:
+            SpectralAxis Object
+        """
+        if unit not in units:
+            raise(ValueError('Unknown spectral unit %s, must be one of %s'%(unit,units)))
+        view=np.asarray(values,dtype=float).view()
+        view.flags.writeable=False
+        self.unit=unit
+        self.views={unit:view} # Read-only representation of the axis by unit
+
+    def get_unit(self):
+        '''
+            output:
+                - str: the canonical unit of the axis
+        '''
+        return self.unit
+
+    def get_values(self,unit='wavelength'):
+        '''
+            Gets the axis in a unit, computed on first request and cached
+            input:
+                - unit (str): 'wavelength' (m, default), 'frequency' (Hz), 'ang_frequency' (rad.Hz) or 'energy' (eV)
+            output:
+                - nd.array: the spectral positions (read-only)
+        '''
+        view=self.views.get(unit)
+        if view is None:
+            view=np.asarray(convert(self.views[self.unit],self.unit,unit))
+            view.flags.writeable=False
+            self.views[unit]=view
+        return view
+
+    def __getitem__(self,key):
+        '''
+            Slices the axis. Basic slices are views of the cached representations (no copy)
+            input:
+                - key: any numpy index
+            output:
+                - SpectralAxis: the sliced axis, with the representations already cached
+        '''
+        sliced=SpectralAxis.__new__(SpectralAxis)
+        sliced.unit=self.unit
+        sliced.views={}
+        for unit,view in self.views.items():
+            view=view[key]
+            if isinstance(view,np.ndarray):
+                view.flags.writeable=False
+            sliced.views[unit]=view
+        return sliced
+
+    def __len__(self):
+        return len(self.views[self.unit])
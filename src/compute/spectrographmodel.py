@@ -0,0 +1,234 @@
+#############################################################
+#############################################################
+# This module hosts the physical model of a Czerny-Turner spectrograph (e.g. SP-2150 with a PIXIS camera)
+# giving the wavelength of every camera pixel from the center wavelength and the grating groove density.
+# The parameters of the model (focal length, detector tilt, deviation angle, central pixel, its drift with
+# the center wavelength and a quadratic correction) are fitted per grating on lamp spectra taken at several
+# center wavelengths, all at once by nonlinear least squares. Wavelength axes are cached per (center, grating).
+#############################################################
+#############################################################
+import json
+import os
+import numpy as np
+from scipy.optimize import least_squares
+from src.compute import linematching
+
+parameterNames=('f','delta','gamma','n0','offsetAdjust','curvature')
+# Parameters of the SP-2150 and PIXIS fitted in the original calibration notebook (lengths in nm, angles in rad)
+defaultParameters=dict(zip(parameterNames,[330605663.74965495,-0.20488367116307532,2.021864300924973,508.0,0.,3.1224154313329654e-06]))
+
+def get_modelWavelengths(parameters,pixels,centers,gratingDensity,order=1,pixelSize=26000.):
+    '''
+        Evaluates the spectrograph model. The pixels and centers are broadcast against each other
+        input:
+            - parameters (sequence): the values of the parameters in the order of parameterNames
+            - pixels (nd.array): the camera pixel numbers
+            - centers (nd.array): the center wavelengths of the spectrograph (nm)
+            - gratingDensity (float): the groove density of the grating (lines/mm)
+            - order (int): the diffraction order
+            - pixelSize (float): the size of the camera pixels (nm)
+        output:
+            - nd.array: the wavelength at every pixel (nm)
+    '''
+    f,delta,gamma,n0,offsetAdjust,curvature=parameters
+    gratingPeriod=1e6/gratingDensity
+    n=pixels-(n0+offsetAdjust*centers)
+    psi=np.arcsin(order*centers/(2*gratingPeriod*np.cos(gamma/2)))
+    eta=np.arctan(n*pixelSize*np.cos(delta)/(f+n*pixelSize*np.sin(delta)))
+    return (gratingPeriod/order)*(np.sin(psi-0.5*gamma)+np.sin(psi+0.5*gamma+eta))+curvature*n**2
+
+class SpectrographModel:
+    def __init__(self,filename=None,pixels=None,order=1,pixelSize=26000.):
+        """
+        Instantiates a SpectrographModel object holding the fitted parameters of every grating of a spectrograph
+        Input:
+            filename: (str) the JSON file in which the parameters are saved. The parameters are loaded from it if it exists
+            pixels: the camera pixel numbers (1 to 1024 by default, like Pixis)
+            order: the diffraction order
+            pixelSize: the size of the camera pixels (nm)
+        output:
+            SpectrographModel Object
+        """
+        self.filename=filename
+        self.pixels=np.linspace(1,1024,1024) if pixels is None else np.asarray(pixels,dtype=float)
+        self.order=order
+        self.pixelSize=pixelSize
+        self.parameters={} # Fitted parameters by grating key
+        self.residuals={} # rms residual of the fit by grating key (nm)
+        self.axes={} # Wavelength axis by (center, grating key)
+        if filename is not None and os.path.exists(filename):
+            self.load(filename)
+
+    @staticmethod
+    def get_key(gratingDensity):
+        '''
+            output:
+                - str: the key of a grating in the parameters
+        '''
+        return '%g'%gratingDensity
+
+    def has_parameters(self,gratingDensity):
+        '''
+            output:
+                - bool: True if the parameters of the grating were fitted
+        '''
+        return self.get_key(gratingDensity) in self.parameters
+
+    def get_parameters(self,gratingDensity):
+        '''
+            Gets the parameters of a grating
+            input:
+                - gratingDensity (float): the groove density of the grating (lines/mm)
+            output:
+                - dict: the parameters by name. The defaults when the grating was not fitted
+        '''
+        return dict(self.parameters.get(self.get_key(gratingDensity),defaultParameters))
+
+    def set_parameters(self,gratingDensity,parameters):
+        '''
+            Sets the parameters of a grating and clears its cached axes
+            input:
+                - gratingDensity (float): the groove density of the grating (lines/mm)
+                - parameters (dict): the parameters by name. Missing ones are taken from the current parameters
+        '''
+        key=self.get_key(gratingDensity)
+        current=self.get_parameters(gratingDensity)
+        current.update({name:float(parameters[name]) for name in parameters})
+        self.parameters[key]=current
+        self.axes={axisKey:axis for axisKey,axis in self.axes.items() if axisKey[1]!=key}
+
+    def get_wavelengths(self,center,gratingDensity,pixels=None):
+        '''
+            Gets the wavelength axis of the camera, cached per center wavelength and grating
+            input:
+                - center (float): the center wavelength of the spectrograph (nm)
+                - gratingDensity (float): the groove density of the grating (lines/mm)
+                - pixels (nd.array): (default None) other pixel numbers, evaluated without cache
+            output:
+                - 1d.array: the wavelength at every pixel (nm)
+        '''
+        parameters=[self.get_parameters(gratingDensity)[name] for name in parameterNames]
+        if pixels is not None:
+            return get_modelWavelengths(parameters,pixels,center,gratingDensity,self.order,self.pixelSize)
+        axisKey=(float(center),self.get_key(gratingDensity))
+        if axisKey not in self.axes:
+            self.axes[axisKey]=get_modelWavelengths(parameters,self.pixels,float(center),gratingDensity,self.order,self.pixelSize)
+        return self.axes[axisKey]
+
+    def precompute(self,centers,gratingDensity):
+        '''
+            Computes the wavelength axes of several center wavelengths at once and caches them
+            input:
+                - centers (1d.array): the center wavelengths of the spectrograph (nm)
+                - gratingDensity (float): the groove density of the grating (lines/mm)
+        '''
+        centers=np.asarray(centers,dtype=float)
+        parameters=[self.get_parameters(gratingDensity)[name] for name in parameterNames]
+        axes=get_modelWavelengths(parameters,self.pixels[np.newaxis,:],centers[:,np.newaxis],gratingDensity,self.order,self.pixelSize)
+        key=self.get_key(gratingDensity)
+        for center,axis in zip(centers,axes):
+            self.axes[(float(center),key)]=axis
+
+    def fit(self,gratingDensity,centers,pixels,wavelengths,fitted=parameterNames,apply=True):
+        '''
+            Fits the parameters of a grating on lines of known wavelength. The lines of every center wavelength are fitted at once.
+            input:
+                - gratingDensity (float): the groove density of the grating (lines/mm)
+                - centers (1d.array): the center wavelength of the spectrograph when every line was measured (nm)
+                - pixels (1d.array): the pixel position of every line
+                - wavelengths (1d.array): the wavelength of every line (nm)
+                - fitted (tuple of str): the names of the fitted parameters, the others are fixed. offsetAdjust needs several center wavelengths
+                - apply (bool): when True the fitted parameters are stored for the grating
+            output:
+                - dict: the fitted parameters by name
+                - 1d.array: the residual of every line (nm)
+        '''
+        centers,pixels,wavelengths=(np.asarray(array,dtype=float) for array in (centers,pixels,wavelengths))
+        parameters=self.get_parameters(gratingDensity)
+        indices=[parameterNames.index(name) for name in fitted]
+        values=np.array([parameters[name] for name in parameterNames])
+        if len(wavelengths)<len(indices):
+            raise(ValueError('%d lines are not enough to fit %d parameters'%(len(wavelengths),len(indices))))
+        def residuals(fittedValues):
+            values[indices]=fittedValues
+            return get_modelWavelengths(values,pixels,centers,gratingDensity,self.order,self.pixelSize)-wavelengths
+        result=least_squares(residuals,values[indices],x_scale='jac',method='lm' if len(wavelengths)>len(indices) else 'trf')
+        values[indices]=result.x
+        fittedParameters=dict(zip(parameterNames,values.tolist()))
+        if apply:
+            self.set_parameters(gratingDensity,fittedParameters)
+            self.residuals[self.get_key(gratingDensity)]=float(np.sqrt(np.mean(result.fun**2)))
+        return fittedParameters,result.fun
+
+    def fit_spectra(self,gratingDensity,centers,spectra,lines='HgAr',tolerance=2.,iterations=3,searchRange=50,fitted=parameterNames,prominence=0.02,apply=True):
+        '''
+            Fits the parameters of a grating on lamp spectra taken at several center wavelengths.
+            The current model (the defaults or the previous fit) is first realigned by the shift of the central pixel matching the most peaks.
+            The peaks of every spectrum are then attributed to the closest reference line predicted by the model and all the spectra are fitted at once.
+            The matching tolerance is halved at every iteration.
+            input:
+                - gratingDensity (float): the groove density of the grating (lines/mm)
+                - centers (1d.array): the center wavelength of every spectrum (nm)
+                - spectra (2d.array): the (spectra,pixels) lamp spectra
+                - lines (1d.array or str): the reference lines (nm) or the name of a lamp in linematching.referenceLines
+                - tolerance (float): the largest distance between the predicted wavelength of a peak and its line at the first iteration (nm)
+                - iterations (int): the number of matching and fitting iterations
+                - searchRange (float): the largest shift of the central pixel searched for the coarse realignment (pixels). No realignment when 0
+                - fitted (tuple of str): the names of the fitted parameters
+                - prominence (float): the minimal prominence of a peak relative to the height of its spectrum above its median
+                - apply (bool): when True the fitted parameters are stored for the grating
+            output:
+                - dict: the fitted parameters by name
+                - 1d.array: the residual of every matched line (nm)
+        '''
+        lines=np.sort(linematching.referenceLines[lines] if isinstance(lines,str) else np.asarray(lines,dtype=float))
+        peakCenters,peakPixels=[],[]
+        for center,spectrum in zip(centers,spectra):
+            peaks,_=linematching.find_lines(spectrum,prominence=prominence)
+            peakPixels.append(np.interp(peaks,np.arange(len(self.pixels)),self.pixels))
+            peakCenters.append(np.full(len(peaks),float(center)))
+        peakCenters,peakPixels=np.concatenate(peakCenters),np.concatenate(peakPixels)
+        parameters=self.get_parameters(gratingDensity)
+        # Coarse realignment: shift of the central pixel matching the most peaks, all the shifts evaluated at once
+        if searchRange>0:
+            shifts=np.arange(-searchRange,searchRange+0.5,0.5)
+            values=np.array([parameters[name] for name in parameterNames])[:,np.newaxis,np.newaxis]*np.ones((1,len(shifts),1))
+            values[parameterNames.index('n0')]+=shifts[:,np.newaxis]
+            _,distances=linematching.nearest_lines(get_modelWavelengths(values,peakPixels,peakCenters,gratingDensity,self.order,self.pixelSize),lines)
+            inliers=distances<tolerance
+            score=inliers.sum(axis=1)-np.where(inliers,distances,0).sum(axis=1)/(tolerance*len(peakPixels)+1)
+            parameters['n0']+=shifts[np.argmax(score)]
+        for _ in range(iterations):
+            values=[parameters[name] for name in parameterNames]
+            closest,distances=linematching.nearest_lines(get_modelWavelengths(values,peakPixels,peakCenters,gratingDensity,self.order,self.pixelSize),lines)
+            matched=distances<tolerance
+            parameters,residuals=self.fit(gratingDensity,peakCenters[matched],peakPixels[matched],lines[closest[matched]],fitted=fitted,apply=False)
+            tolerance/=2
+        if apply:
+            self.set_parameters(gratingDensity,parameters)
+            self.residuals[self.get_key(gratingDensity)]=float(np.sqrt(np.mean(residuals**2)))
+        return parameters,residuals
+
+    def save(self,filename=None):
+        '''
+            Saves the parameters of every grating in a JSON file
+            input:
+                - filename (str): (default None) the file. The file given at instantiation when None
+        '''
+        filename=self.filename if filename is None else filename
+        temporaryFile=filename+'.tmp'
+        with open(temporaryFile,'w') as file:
+            json.dump({'parameters':self.parameters,'residuals':self.residuals},file,indent=1)
+        os.replace(temporaryFile,filename)
+
+    def load(self,filename):
+        '''
+            Loads the parameters of every grating from a JSON file and clears the cached axes
+            input:
+                - filename (str): the file
+        '''
+        with open(filename) as file:
+            saved=json.load(file)
+        self.parameters=saved['parameters']
+        self.residuals=saved.get('residuals',{})
+        self.axes={}
@@ -0,0 +1,85 @@
+#############################################################
+#############################################################
+# This module hosts the Zernike polynomials used to correct the wavefront aberrations of the SLM
+# The 20 polynomials of the Meadowlark ImageGen (Generate_Zernike) are evaluated once per
+# (panel size, center, radius) and cached, so that a correction mask is a single tensordot
+# of the coefficients with the basis. The masks can be added to the beam gratings by a Compositor.
+#############################################################
+#############################################################
+from functools import lru_cache
+from math import factorial
+import numpy as np
+
+# Names and (radial order n, azimuthal frequency m) of the polynomials, in the order of the arguments of Generate_Zernike
+zernikeNames=('piston','tiltX','tiltY','power','astigX','astigY','comaX','comaY','primarySpherical','trefoilX','trefoilY',
+              'secondaryAstigX','secondaryAstigY','secondaryComaX','secondaryComaY','secondarySpherical','tetrafoilX','tetrafoilY',
+              'tertiarySpherical','quaternarySpherical')
+zernikeOrders=((0,0),(1,1),(1,-1),(2,0),(2,2),(2,-2),(3,1),(3,-1),(4,0),(3,3),(3,-3),
+               (4,2),(4,-2),(5,1),(5,-1),(6,0),(4,4),(4,-4),
+               (8,0),(10,0))
+
+def get_radialPolynomial(n,m,rho):
+    '''
+        Evaluates the radial part of a Zernike polynomial
+        input:
+            - n (int): the radial order
+            - m (int): the azimuthal frequency (its sign is ignored)
+            - rho (nd.array): the normalized radius
+        output:
+            - nd.array: R_n^m(rho), equal to 1 at rho=1
+    '''
+    m=abs(m)
+    radial=np.zeros_like(rho)
+    for k in range((n-m)//2+1):
+        radial+=(-1)**k*factorial(n-k)/(factorial(k)*factorial((n+m)//2-k)*factorial((n-m)//2-k))*rho**(n-2*k)
+    return radial
+
+@lru_cache(maxsize=2)
+def get_zernikeBasis(width,height,centerX,centerY,radius):
+    '''
+        Evaluates the Zernike polynomials on the SLM pixels, cached per panel size, center and radius.
+        The polynomials are not normalized (their edge value is 1) and are 0 outside the pupil, like in Generate_Zernike.
+        input:
+            - width, height (int): the size of the SLM (pixels)
+            - centerX, centerY (float): the center of the pupil (column and row, pixels)
+            - radius (float): the radius of the pupil (pixels)
+        output:
+            - 3d.array: the read-only (polynomials, rows, columns) float32 basis, in the order of zernikeNames
+    '''
+    x=(np.arange(width)-centerX)[np.newaxis,:]/radius
+    y=(np.arange(height)-centerY)[:,np.newaxis]/radius
+    rho=np.hypot(x,y)
+    theta=np.arctan2(y,x)
+    pupil=rho<=1
+    basis=np.empty((len(zernikeOrders),height,width),dtype=np.float32)
+    for polynomial,(n,m) in zip(basis,zernikeOrders):
+        radial=get_radialPolynomial(n,m,rho)
+        if m>0:
+            radial*=np.cos(m*theta)
+        elif m<0:
+            radial*=np.sin(-m*theta)
+        np.multiply(radial,pupil,out=polynomial,casting='unsafe')
+    basis.flags.writeable=False
+    return basis
+
+def get_zernikePhase(coefficients,width,height,centerX,centerY,radius):
+    '''
+        Computes a wavefront correction from Zernike coefficients
+        input:
+            - coefficients (1d.array or dict): the coefficients in waves, in the order of zernikeNames (missing ones are 0), or by name
+            - width, height (int): the size of the SLM (pixels)
+            - centerX, centerY (float): the center of the pupil (column and row, pixels)
+            - radius (float): the radius of the pupil (pixels)
+        output:
+            - 2d.array: the (rows,columns) phase in rad, e.g. for Compositor.set_wavefrontCorrection
+    '''
+    if isinstance(coefficients,dict):
+        unknown=set(coefficients)-set(zernikeNames)
+        if unknown:
+            raise(ValueError('Unknown Zernike polynomials %s, must be in %s'%(sorted(unknown),zernikeNames)))
+        coefficients=[coefficients.get(name,0.) for name in zernikeNames]
+    coefficients=np.asarray(coefficients,dtype=np.float32)
+    if len(coefficients)>len(zernikeNames):
+        raise(ValueError('%d coefficients given for %d Zernike polynomials'%(len(coefficients),len(zernikeNames))))
+    basis=get_zernikeBasis(width,height,centerX,centerY,radius)
+    return np.tensordot(coefficients*np.float32(2*np.pi),basis[:len(coefficients)],axes=1)
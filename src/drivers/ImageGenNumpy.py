@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+Pure NumPy implementation of the Meadowlark ImageGen pattern generators (Slm_Meadowlark_optics.ImageGen),
+for machines without Imagegen.dll (Linux analysis and CI computers, benchmarks).
+
+The methods have the signatures of Slm_Meadowlark_optics.ImageGen and write in place into the caller's buffers,
+given either as uint8 numpy arrays (flat or (height,width)) or as ctypes pointers (array.ctypes.data_as(POINTER(c_ubyte))).
+Integer arguments can be python ints or ctypes values (e.g. the RGB returned by SLM.parameter_slm).
+The patterns use 256 gray levels (one phase wrap). The wavefront correction WFC (None, or a buffer like the image)
+is added modulo 256. When rgb is set, the buffers hold width*height RGBA pixels and the gray level is written
+in the R, G and B channels (A=255).
+The conventions of the DLL that are not documented in ImageGen.h are given in the docstring of each method.
+The holograms (gerchberg_saxton, generate_hologram) are computed by compute.holography.HologramEngine.
+"""
+
+from functools import lru_cache
+import numpy as np
+from src.compute.holography import HologramEngine, phaseToGray
+from src.compute.zernike import get_zernikeBasis
+from src.compute.regionallut import RegionalLUT, get_regionMap
+
+
+def get_value(argument):
+    """ Returns the value of a ctypes scalar, or the argument itself. """
+    return getattr(argument, 'value', argument)
+
+
+def get_buffer(array, size):
+    """ Returns a flat uint8 numpy view of a caller buffer given as a numpy array or a ctypes pointer. """
+    if isinstance(array, np.ndarray):
+        if array.dtype != np.uint8 or not array.flags.c_contiguous:
+            raise(ValueError('ImageGen buffers must be C-contiguous uint8 arrays'))
+        buffer = array.reshape(-1)
+    else:
+        buffer = np.ctypeslib.as_array(array, shape=(size,))
+    if buffer.size < size:
+        raise(ValueError('ImageGen buffer of {} bytes is smaller than the image ({} bytes)'.format(buffer.size, size)))
+    return buffer[:size]
+
+
+@lru_cache(maxsize=8)
+def get_coordinates(width, height, center_x, center_y):
+    """ Returns the (1,width) and (height,1) pixel coordinates relative to the center, and their (height,width)
+    radius and azimuth. Cached (read-only) per image size and center. """
+    x = (np.arange(width, dtype=float) - center_x)[np.newaxis, :]
+    y = (np.arange(height, dtype=float) - center_y)[:, np.newaxis]
+    radius = np.hypot(x, y)
+    azimuth = np.arctan2(y, x)
+    for coordinate in (x, y, radius, azimuth):
+        coordinate.flags.writeable = False
+    return x, y, radius, azimuth
+
+
+def get_floats(values, size):
+    """ Returns the first size values of a sequence or of a ctypes float pointer as a float numpy array. """
+    if isinstance(values, (np.ndarray, list, tuple)):
+        return np.asarray(values, dtype=float)[:size]
+    return np.ctypeslib.as_array(values, shape=(size,)).astype(float)
+
+
+def select(mask, value_one, value_two):
+    """ Returns value_one where the boolean mask is set and value_two elsewhere, as uint8 (faster than np.where with scalars). """
+    return mask.view(np.uint8)*np.uint8((int(value_one) - int(value_two)) % 256) + np.uint8(int(value_two) % 256)
+
+
+def wrap_phase(fraction):
+    """ Converts phases in units of 2*pi to gray levels (0 to 255) wrapped on one period (the integer cast wraps modulo 256). """
+    return np.floor(np.multiply(fraction, 256)).astype(np.int64).astype(np.uint8)
+
+
+class ImageGen:
+    def __init__(self):
+        print("The NumPy ImageGen is loaded")
+        self.hologram_engine = None
+        self.hologram_settings = None
+        self.affine = None
+        self.gerchberg_saxton_engine = None
+        self.regional_luts = None
+
+    @staticmethod
+    def write_pattern(array, wfc, width, height, pattern, rgb):
+        """ Writes a gray level pattern (broadcastable to (height,width)) into the caller's buffer, adding the
+        wavefront correction modulo 256. """
+        width, height, rgb = get_value(width), get_value(height), get_value(rgb)
+        channels = 4 if rgb else 1
+        image = get_buffer(array, width*height*channels).reshape(height, width, channels)
+        pattern = np.broadcast_to(np.asarray(pattern, dtype=np.uint8), (height, width))
+        if wfc is not None:
+            pattern = pattern + get_buffer(wfc, width*height*channels).reshape(height, width, channels)[:, :, 0]
+        if rgb:
+            image[:, :, :3] = pattern[:, :, np.newaxis]
+            image[:, :, 3] = 255
+        else:
+            image[:, :, 0] = pattern
+
+    def concatenate_ten_bit(self, array_one, array_two, width, height):
+        """ Combines two images into a 10 bit RGBA image written in array_one (width*height*4 bytes).
+        array_one holds the 8 most significant bits in its R channel and array_two (width*height bytes) the
+        2 least significant bits of every pixel, which are written in the two highest bits of the G channel. """
+        width, height = get_value(width), get_value(height)
+        image = get_buffer(array_one, width*height*4).reshape(height*width, 4)
+        low_bits = get_buffer(array_two, width*height)
+        image[:, 1] = (low_bits & 3) << 6
+
+    def generate_stripe(self, array, wfc, width, height, depth, pixel_val_one, pixel_val_two, pixels_per_stripe, b_vert, rgb):
+        """ Stripes of pixels_per_stripe pixels alternating between pixel_val_one and pixel_val_two,
+        vertical (varying along the columns) when b_vert is set. """
+        width, height, period = get_value(width), get_value(height), get_value(pixels_per_stripe)
+        values = np.array([get_value(pixel_val_one), get_value(pixel_val_two)], dtype=np.uint8)
+        if get_value(b_vert):
+            pattern = values[(np.arange(width)//period) % 2][np.newaxis, :]
+        else:
+            pattern = values[(np.arange(height)//period) % 2][:, np.newaxis]
+        self.write_pattern(array, wfc, width, height, pattern, rgb)
+
+    def generate_checkerboard(self, array, wfc, width, height, depth, pixel_val_one, pixel_val_two, pixels_per_check, rgb):
+        """ Checks of pixels_per_check pixels alternating between pixel_val_one (top left) and pixel_val_two. """
+        width, height, period = get_value(width), get_value(height), get_value(pixels_per_check)
+        odd = ((np.arange(height)//period) % 2 == 1)[:, np.newaxis] ^ ((np.arange(width)//period) % 2 == 1)[np.newaxis, :]
+        pattern = select(odd, get_value(pixel_val_two), get_value(pixel_val_one))
+        self.write_pattern(array, wfc, width, height, pattern, rgb)
+
+    def generate_solid(self, array, wfc, width, height, depth, pixel_val, rgb):
+        """ Uniform gray level pixel_val. """
+        self.write_pattern(array, wfc, width, height, np.uint8(get_value(pixel_val)), rgb)
+
+    def generate_random(self, array, wfc, width, height, depth, rgb):
+        """ Uniformly distributed random gray levels. """
+        width, height = get_value(width), get_value(height)
+        self.write_pattern(array, wfc, width, height, np.random.randint(0, 256, (height, width), dtype=np.uint8), rgb)
+
+    def generate_zernike(self, array, wfc, width, height, depth, center_x, center_y, radius, piston, tilt_x, tilt_y, power, astig_x, astig_y, coma_x, coma_y, primary_spherical, trefoil_x, trefoil_y, secondary_astig_x, secondary_astig_y, secondary_coma_x, secondary_coma_y, secondary_spherical, tetrafoil_x, tetrafoil_y, tertiary_spherical, quaternary_spherical, rgb):
+        """ Sum of the Zernike polynomials weighted by the coefficients (in waves) inside the radius around the center, 0 outside.
+        The polynomials are cached per size, center and radius (see compute.zernike.get_zernikeBasis). """
+        width, height = get_value(width), get_value(height)
+        coefficients = np.array([get_value(coefficient) for coefficient in (piston, tilt_x, tilt_y, power, astig_x, astig_y, coma_x, coma_y, primary_spherical,
+                                 trefoil_x, trefoil_y, secondary_astig_x, secondary_astig_y, secondary_coma_x, secondary_coma_y, secondary_spherical,
+                                 tetrafoil_x, tetrafoil_y, tertiary_spherical, quaternary_spherical)], dtype=np.float32)
+        basis = get_zernikeBasis(width, height, get_value(center_x), get_value(center_y), get_value(radius))
+        self.write_pattern(array, wfc, width, height, wrap_phase(np.tensordot(coefficients, basis, axes=1)), rgb)
+
+    def generate_fresnel_lens(self, array, wfc, width, height, depth, center_x, center_y, radius, power, cylindrical, horizontal, rgb):
+        """ Lens of phase power*(r/radius)^2 (in units of 2*pi) inside the radius around the center, 0 outside.
+        A cylindrical lens focuses along the rows (r=|y|) when horizontal is set, along the columns (r=|x|) otherwise. """
+        width, height, radius = get_value(width), get_value(height), get_value(radius)
+        x, y, r, _ = get_coordinates(width, height, get_value(center_x), get_value(center_y))
+        if get_value(cylindrical):
+            r = np.abs(y) if get_value(horizontal) else np.abs(x)
+        pattern = wrap_phase(get_value(power)*(r/radius)**2)*(r <= radius)
+        self.write_pattern(array, wfc, width, height, pattern, rgb)
+
+    def generate_grating(self, array, wfc, width, height, depth, period, increasing, horizontal, rgb):
+        """ Blazed grating of period pixels ramping over the 256 gray levels, along the rows (horizontal lines)
+        when horizontal is set, along the columns otherwise. The ramp decreases unless increasing is set. """
+        width, height, period = get_value(width), get_value(height), get_value(period)
+        coordinate = np.arange(height if get_value(horizontal) else width)
+        ramp = wrap_phase(coordinate/period)
+        if not get_value(increasing):
+            ramp = 255 - ramp
+        pattern = ramp[:, np.newaxis] if get_value(horizontal) else ramp[np.newaxis, :]
+        self.write_pattern(array, wfc, width, height, pattern, rgb)
+
+    def generate_sinusoid(self, array, wfc, width, height, depth, period, horizontal, rgb):
+        """ Sinusoidal grating of period pixels over the 256 gray levels, along the rows when horizontal is set. """
+        width, height, period = get_value(width), get_value(height), get_value(period)
+        coordinate = np.arange(height if get_value(horizontal) else width)
+        profile = np.round(127.5*(1 + np.sin(2*np.pi*coordinate/period))).astype(np.uint8)
+        pattern = profile[:, np.newaxis] if get_value(horizontal) else profile[np.newaxis, :]
+        self.write_pattern(array, wfc, width, height, pattern, rgb)
+
+    def generate_lg(self, array, wfc, width, height, depth, vortex_charge, center_x, center_y, fork, rgb):
+        """ Vortex (Laguerre-Gauss) phase of charge vortex_charge around the center. When fork is non-zero,
+        a blazed grating of fork pixels along the columns is added to produce a fork hologram. """
+        width, height, fork = get_value(width), get_value(height), get_value(fork)
+        x, _, _, azimuth = get_coordinates(width, height, get_value(center_x), get_value(center_y))
+        fraction = get_value(vortex_charge)*azimuth/(2*np.pi)
+        if fork:
+            fraction = fraction + x/fork
+        self.write_pattern(array, wfc, width, height, wrap_phase(fraction), rgb)
+
+    def generate_concentric_rings(self, array, wfc, width, height, depth, inner_diameter, outer_diameter, pixel_val_one, pixel_val_two, center_x, center_y, rgb):
+        """ Ring of gray level pixel_val_one between the inner and outer diameters around the center, pixel_val_two elsewhere. """
+        width, height = get_value(width), get_value(height)
+        _, _, r, _ = get_coordinates(width, height, get_value(center_x), get_value(center_y))
+        ring = (2*r >= get_value(inner_diameter)) & (2*r < get_value(outer_diameter))
+        pattern = select(ring, get_value(pixel_val_one), get_value(pixel_val_two))
+        self.write_pattern(array, wfc, width, height, pattern, rgb)
+
+    def generate_axicon(self, array, wfc, width, height, depth, phase_delay, center_x, center_y, increasing, rgb):
+        """ Conical phase growing by phase_delay gray levels per pixel of radius from the center (decreasing unless increasing is set). """
+        width, height = get_value(width), get_value(height)
+        _, _, r, _ = get_coordinates(width, height, get_value(center_x), get_value(center_y))
+        fraction = get_value(phase_delay)*r/256
+        self.write_pattern(array, wfc, width, height, wrap_phase(fraction if get_value(increasing) else -fraction), rgb)
+
+    def mask_image(self, array, width, height, depth, region, num_regions, rgb):
+        """ Sets to 0 every pixel outside one region of the image. The image is divided in a square grid of num_regions
+        regions (e.g. 64 for 8x8, like the regional LUT) numbered row by row from the top left. """
+        width, height, rgb = get_value(width), get_value(height), get_value(rgb)
+        region, num_regions = get_value(region), get_value(num_regions)
+        channels = 4 if rgb else 1
+        image = get_buffer(array, width*height*channels).reshape(height, width, channels)
+        image[get_regionMap(width, height, num_regions) != region] = 0
+
+    def initialize_hologram_generator(self, width, height, depth, iterations, rgb):
+        """ Prepares the spot hologram engine (see compute.holography.HologramEngine) for an SLM size. Returns 1. """
+        width, height = get_value(width), get_value(height)
+        self.hologram_engine = HologramEngine((height, width))
+        self.hologram_settings = {'width': width, 'height': height, 'iterations': get_value(iterations), 'rgb': get_value(rgb)}
+        return 1
+
+    def calculate_affine_polynomials(self, slm_x_0, slm_y_0, cam_x_0, cam_y_0, slm_x_1, slm_y_1, cam_x_1, cam_y_1, slm_x_2, slm_y_2, cam_x_2, cam_y_2):
+        """ Computes the affine transform from camera pixels to far field positions of the SLM from three pairs of points.
+        Returns 1, or 0 when the points are aligned. """
+        cameras = np.array([[get_value(cam_x_0), get_value(cam_y_0), 1], [get_value(cam_x_1), get_value(cam_y_1), 1], [get_value(cam_x_2), get_value(cam_y_2), 1]], dtype=float)
+        slms = np.array([[get_value(slm_x_0), get_value(slm_y_0)], [get_value(slm_x_1), get_value(slm_y_1)], [get_value(slm_x_2), get_value(slm_y_2)]], dtype=float)
+        try:
+            self.affine = np.linalg.solve(cameras, slms)
+        except np.linalg.LinAlgError:
+            return 0
+        return 1
+
+    def generate_hologram(self, array, wfc, x_spots, y_spots, z_spots, i_spots, n_spots, apply_affine):
+        """ Hologram of n_spots spots by the weighted Gerchberg-Saxton algorithm, warm started from the previous hologram.
+        The positions are far field pixels from the zero order (camera pixels when apply_affine is set, see calculate_affine_polynomials),
+        z_spots the defocus in waves at the edge of the pupil and i_spots the relative intensities. Returns 1, or 0 without initialization. """
+        if self.hologram_engine is None or (get_value(apply_affine) and self.affine is None):
+            return 0
+        n_spots = get_value(n_spots)
+        x, y, z, intensities = (get_floats(values, n_spots) for values in (x_spots, y_spots, z_spots, i_spots))
+        if get_value(apply_affine):
+            x, y = (np.column_stack([x, y, np.ones(n_spots)]) @ self.affine).T
+        settings = self.hologram_settings
+        phase, _ = self.hologram_engine.generate_spots(x, y, z, intensities, iterations=settings['iterations'])
+        self.write_pattern(array, wfc, settings['width'], settings['height'], phaseToGray(phase), settings['rgb'])
+        return 1
+
+    def destruct_hologram_generator(self):
+        self.hologram_engine = None
+
+    def initialize_gerchberg_saxton(self):
+        """ The Gerchberg-Saxton engine is created by the first call to gerchberg_saxton for the size of the image. Returns 1. """
+        self.gerchberg_saxton_engine = None
+        return 1
+
+    def gerchberg_saxton(self, phase, input_img, wfc, width, height, depth, iterations, rgb):
+        """ Phase hologram of which the far field intensity is input_img (zero order at its center), written in phase.
+        The iterations start from the previous hologram of the same size and stop when the error converges. Returns 1. """
+        width, height, rgb = get_value(width), get_value(height), get_value(rgb)
+        channels = 4 if rgb else 1
+        target = get_buffer(input_img, width*height*channels).reshape(height, width, channels)[:, :, 0]
+        if self.gerchberg_saxton_engine is None or self.gerchberg_saxton_engine.shape != (height, width):
+            self.gerchberg_saxton_engine = HologramEngine((height, width))
+        hologram, _ = self.gerchberg_saxton_engine.gerchberg_saxton(target, iterations=get_value(iterations))
+        self.write_pattern(phase, wfc, width, height, phaseToGray(hologram), rgb)
+        return 1
+
+    def destruct_gerchberg_saxton(self):
+        self.gerchberg_saxton_engine = None
+
+    def initialize_regional_lut(self, width, height, depth, num_boards):
+        """ Prepares one regional LUT (see compute.regionallut.RegionalLUT) per board. Returns 1. """
+        width, height = get_value(width), get_value(height)
+        self.regional_luts = [RegionalLUT(width, height) for board in range(get_value(num_boards))]
+        return 1
+
+    def load_regional_lut(self, regional_lut_path, max_val, min_val, board):
+        """ Loads the regional LUT file of a board (parsed once per file, see compute.regionallut.load_tables).
+        The largest and smallest output levels are written in max_val and min_val when they are ctypes float pointers or numpy arrays.
+        Returns 1, or 0 without initialization. """
+        if self.regional_luts is None:
+            return 0
+        regional_lut = self.regional_luts[get_value(board)]
+        regional_lut.set_tables(regional_lut_path)
+        for pointer, value in ((max_val, regional_lut.get_tables().max()), (min_val, regional_lut.get_tables().min())):
+            if isinstance(pointer, np.ndarray):
+                pointer.reshape(-1)[0] = value
+            elif hasattr(pointer, 'contents'):
+                pointer.contents.value = float(value)
+        return 1
+
+    def apply_regional_lut(self, array, board):
+        """ Converts the (width*height) 8 bit image in place with the regional LUT of a board.
+        Returns 1, or 0 when no LUT was loaded or when the LUT levels do not fit in 8 bits. """
+        if self.regional_luts is None or self.regional_luts[get_value(board)].get_tables() is None:
+            return 0
+        regional_lut = self.regional_luts[get_value(board)]
+        if regional_lut.get_tables().dtype != np.uint8:
+            return 0
+        image = get_buffer(array, regional_lut.width*regional_lut.height).reshape(regional_lut.height, regional_lut.width)
+        regional_lut.apply(image, out=image)
+        return 1
+
+    def destruct_regional_lut(self):
+        self.regional_luts = None
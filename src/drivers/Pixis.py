@@ -62,6 +62,7 @@ class Pixis(QtCore.QThread):
             self.grating_densities[i] = numbers[i*3 + 1]
             self.grating_blazes[i] = numbers[i * 3 + 2]
         self.center_wl = float(self.write_command('?NM')[0])
+        self.spectrographModel = None # SpectrographModel with the fitted parameters of the gratings (see set_spectrographModel)
         print(self.center_wl)
         print(self.grating_densities)
         print(self.grating_blazes)
@@ -172,6 +173,8 @@ class Pixis(QtCore.QThread):
         Returns:
             wavelengths: 1D numpy array of wavelengths (nm)
         """
+        if self.spectrographModel is not None and self.spectrographModel.has_parameters(grating_lines_per_mm):
+            return self.spectrographModel.get_wavelengths(center_wavelength_nm, grating_lines_per_mm)
         calibrated = True
         if calibrated:
             pixel_size_mm = 26 / 1E3  # specs of PIXIS
@@ -217,6 +220,43 @@ class Pixis(QtCore.QThread):
 
         return wavelengths
 
+    def set_spectrographModel(self, model):
+        """ Sets the SpectrographModel (src/compute/spectrographmodel.py) used by calculate_wavelength_array
+        for the gratings whose parameters were fitted. The wavelength axis of the current settings is computed right away. """
+        self.spectrographModel = model
+        self.spectrographModel.get_wavelengths(self.center_wl, self.grating_densities[int(self.grating - 1)])
+
+    def calibrate_spectrograph(self, centers, lines='HgAr', **kwargs):
+        """ Fits the spectrograph model of the current grating on lamp spectra acquired at several center wavelengths,
+        e.g. after a realignment. The lamp must illuminate the spectrograph and the acquisition must be running.
+        Args:
+            centers: center wavelengths (nm) at which the lamp spectra are acquired
+            lines: reference lines (nm) or name of the lamp (see src/compute/linematching.py)
+            kwargs: other arguments of SpectrographModel.fit_spectra
+
+        Returns: fitted parameters (dict) and residual of every matched line (nm)
+        """
+        if self.spectrographModel is None:
+            raise(ValueError('No spectrograph model to fit, call set_spectrographModel first'))
+        initial_center = self.center_wl
+        spectra = []
+        for center in centers:
+            self.set_parameter('center_wl', center) # GOTO returns once the move is complete
+            # The frame being exposed during the move is discarded
+            self.new_spectrum = False
+            while not self.new_spectrum:
+                time.sleep(0.01)
+            self.new_spectrum = False
+            spectrum = np.asarray(self.get_intensities(), dtype=float)
+            spectra.append(spectrum.sum(axis=0) if spectrum.ndim == 2 else spectrum)
+        self.set_parameter('center_wl', initial_center)
+        grating_lines_per_mm = self.grating_densities[int(self.grating - 1)]
+        parameters, residuals = self.spectrographModel.fit_spectra(grating_lines_per_mm, centers, np.array(spectra), lines=lines, **kwargs)
+        if self.spectrographModel.filename is not None:
+            self.spectrographModel.save()
+        self.spectrographModel.precompute(centers, grating_lines_per_mm)
+        return parameters, residuals
+
     def start_acquisition(self):
         """ Sets camera to continuous acquisition mode. """
         self.camera.start_acquisition()
@@ -0,0 +1,136 @@
+import numpy as np
+from numpy.polynomial import Polynomial as P
+from scipy.constants import c,pi
+from time import sleep
+
+class dumShapedSpec:
+    '''
+    Fake spectrometer measuring the beam diffracted by a bogus SLM (src.compute.SLMBogus)
+    The first order field of every SLM column is demodulated from the image currently displayed on the illuminated rows.
+    An unknown dispersion is added and the linear or second harmonic (SHG) spectrum of the resulting pulse is returned.
+    '''
+    def __init__(self,SLM,calibration,period,rows=None,dispersion=P([0,0,-800,-3000]),carrierWave=550e-9,bandwidth=40e-9,mode='SHG',noise=1e-3,integration_time=0,numberPoints=512,
+                 pixelToWavelength=None,wavelengths=None,verticalProfile=None,phaseScale=1):
+        '''
+            input:
+                - SLM: the bogus SLM whose image is read
+                - calibration (Calibration): the calibration mapping the SLM columns to wavelengths
+                - period (int): the period of the gratings of the beam in pixels
+                - rows (list): the [beginning, end] rows of the beam on the SLM. The whole SLM height by default
+                - dispersion (numpy Polynomial): the spectral phase added to the beam (in powers of fs, taking the detuning from the carrier in rad.Hz)
+                - carrierWave (float): the central wavelength of the spectrum (m)
+                - bandwidth (float): the FWHM of the spectrum (m)
+                - mode (str): 'SHG' for the second harmonic spectrum or 'linear' for the spectrum of the diffracted beam
+                - noise (float): the standard deviation of the additive noise relative to the peak of the compressed spectrum
+                - integration_time (float): the time waited per acquisition (s)
+                - numberPoints (int): the number of points of the uniform frequency grid used for the SHG
+                - pixelToWavelength (numpy Polynomial): the actual wavelength (m) at every SLM column. The calibration's one by default
+                - wavelengths (1d.array): the wavelengths of the spectrometer pixels in linear mode (nm). The wavelengths of the SLM columns by default
+                - verticalProfile (1d.array): the incident intensity on every SLM row (e.g. several beams). Uniform within rows by default
+                - phaseScale (float or 1d.array): the ratio of the displayed phase to the nominal one at every SLM column (e.g. the wavelength dependence of the liquid crystal retardance)
+        '''
+        self.SLM=SLM
+        self.calibration=calibration
+        self.period=period
+        width,height=SLM.get_size()
+        self.rows=[0,height] if rows is None else rows
+        if verticalProfile is None:
+            verticalProfile=np.zeros(height)
+            verticalProfile[self.rows[0]:self.rows[1]]=1
+        self.illuminatedRows=np.flatnonzero(verticalProfile)
+        self.rowAmplitude=np.sqrt(verticalProfile[self.illuminatedRows])
+        self.dispersion=dispersion
+        self.carrierWave=carrierWave
+        self.bandwidth=bandwidth
+        self.mode=mode
+        self.noise=noise
+        self.integration_time=integration_time
+        self.numberPoints=numberPoints
+        self.rng=np.random.default_rng(0)
+        if pixelToWavelength is None:
+            columnWaves=calibration.get_spectralAxis('wavelength')
+        else:
+            columnWaves=pixelToWavelength(np.arange(width))
+        self.columnWaves=columnWaves
+        self.phaseScale=phaseScale
+        self.wavelengths=wavelengths
+        self.detuning=2*pi*c/columnWaves-2*pi*c/carrierWave
+        self.inputAmplitude=np.exp(-2*np.log(2)*((columnWaves-carrierWave)/bandwidth)**2)
+        self.uniformDetuning=np.linspace(self.detuning.min(),self.detuning.max(),numberPoints)
+        self.order=np.argsort(self.detuning)
+        self.peak=None
+        self.peak=self.get_intensities(phase=-self.dispersion(self.detuning*1e-15)).max()
+
+    def set_integration_time(self,t):
+        self.integration_time=t
+
+    def get_integration_time(self):
+        return self.integration_time
+
+    def get_grayToPhase(self):
+        '''
+            Inverts the phase to gray level table of the calibration
+            output:
+                - 1d.array: the phase (rad) displayed by every gray level
+        '''
+        lut=self.calibration.get_phaseToGrayscale()
+        table=np.zeros(int(lut.max())+1)
+        table[lut]=(np.arange(len(lut))+0.5)*2*pi/len(lut)
+        return table
+
+    def get_diffractedField(self):
+        '''
+            Demodulates the first order field of every SLM column from the displayed image
+            output:
+                - 1d.array (complex): the first order field at every SLM column
+        '''
+        image=self.SLM.get_image()
+        if image is None:
+            return np.zeros(self.SLM.get_size()[0],dtype=complex)
+        phases=self.get_grayToPhase()[image[self.illuminatedRows]]*self.phaseScale
+        carrier=self.rowAmplitude*np.exp(2j*pi*self.illuminatedRows/self.period)
+        return carrier@np.exp(1j*phases)/self.rowAmplitude.sum()
+
+    def get_wave(self):
+        '''
+            output:
+                - 1d.array: the wavelengths of the spectrometer pixels (nm)
+        '''
+        if self.mode=='SHG':
+            step=self.uniformDetuning[1]-self.uniformDetuning[0]
+            frequencies=2*(2*pi*c/self.carrierWave+self.uniformDetuning[0])+np.arange(2*self.numberPoints)*step
+            return 2*pi*c/frequencies*1e9
+        if self.wavelengths is not None:
+            return self.wavelengths
+        return self.columnWaves*1e9
+
+    def get_wavelength(self):
+        return self.get_wave()
+
+    def get_intensities(self,phase=None):
+        '''
+            Acquires a spectrum of the beam diffracted by the image displayed on the SLM
+            input:
+                - phase (1d.array): (default None) the phase imparted at every SLM column, used instead of the image when provided
+            output:
+                - 1d.array: the spectral intensity at the wavelengths of get_wave, relative to the peak of the compressed spectrum
+        '''
+        sleep(self.integration_time)
+        diffractedField=np.exp(1j*phase) if phase is not None else self.get_diffractedField()
+        field=self.inputAmplitude*diffractedField*np.exp(1j*self.dispersion(self.detuning*1e-15))
+        if self.mode=='SHG':
+            uniformField=(np.interp(self.uniformDetuning,self.detuning[self.order],field.real[self.order])
+                          +1j*np.interp(self.uniformDetuning,self.detuning[self.order],field.imag[self.order]))
+            temporalField=np.fft.ifft(uniformField,n=2*self.numberPoints)
+            spectrum=np.abs(np.fft.fft(temporalField**2))**2
+        elif self.wavelengths is not None:
+            waveOrder=np.argsort(self.columnWaves)
+            spectrum=np.interp(self.wavelengths,self.columnWaves[waveOrder]*1e9,np.abs(field[waveOrder])**2,left=0,right=0)
+        else:
+            spectrum=np.abs(field)**2
+        if self.peak is not None:
+            spectrum=spectrum/self.peak+self.noise*self.rng.standard_normal(spectrum.shape)
+        return spectrum
+
+    def get_spectrum(self):
+        return self.get_intensities()
@@ -0,0 +1,198 @@
+import threading
+import queue
+import time
+from collections import deque
+import numpy as np
+
+class SLMUploader:
+    '''
+        Uploads frames to an SLM from a background thread, so that the next frame is rendered while the previous one uploads.
+        The frames are rendered in N preallocated C-contiguous buffers (two for double buffering) cycled between the renderer and the uploader.
+        Works with any object with the write_image(image, is_8_bit) method of the SLM drivers (e.g. the Meadowlark SLM or compute.SLMBogus.SLM).
+        A failed upload (exception or non-positive status) or an exception of the callback is raised in the renderer's thread by the next call.
+    '''
+    def __init__(self, SLM, buffers=2, dtype=np.uint8, callback=None, history=1000, shape=None):
+        '''
+            Creates an SLMUploader and starts its upload thread
+            input:
+                SLM: the SLM object the frames are written to
+                buffers: the number of frame buffers (2 for double buffering)
+                dtype: the dtype of the gray levels (uint8 for 8 bit SLMs)
+                callback: a function called from the upload thread with the frame number right after every frame is presented (e.g. to trigger a camera)
+                history: the number of frames whose upload times are kept
+                shape: the (rows,columns) of the frames. Read from SLM.get_height and SLM.get_width (Meadowlark driver) or SLM.get_size (SLMBogus) by default
+            returns:
+                An SLMUploader object
+        '''
+        self.SLM = SLM
+        if shape is not None:
+            height, width = shape
+        elif hasattr(SLM, 'get_width'):
+            height, width = SLM.get_height(), SLM.get_width()
+        else:
+            width, height = SLM.get_size()
+        self.dtype = np.dtype(dtype)
+        self.buffers = [np.zeros((height, width), dtype=self.dtype) for _ in range(buffers)]
+        self.callback = callback
+        self.freeBuffers = queue.Queue()
+        for index in range(buffers):
+            self.freeBuffers.put(index)
+        self.pendingFrames = queue.Queue()
+        self.submittedFrame = 0 # Number of the last frame submitted
+        self.presentedFrame = 0 # Number of the last frame written to the SLM
+        self.processedFrame = 0 # Number of the last frame handled by the upload thread, written or failed
+        self.presented = threading.Condition()
+        self.framePresented = threading.Event() # Set when the last submitted frame was handled (live on the SLM unless check_error raises)
+        self.framePresented.set()
+        self.records = deque(maxlen=history)
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name='SLMUploader', daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.stop()
+
+    def run(self):
+        '''
+            The loop of the upload thread: writes the submitted frames to the SLM in order and gives their buffers back to the renderer.
+        '''
+        while True:
+            item = self.pendingFrames.get()
+            if item is None:
+                break
+            frame, index, submitted = item
+            started = time.perf_counter()
+            try:
+                status = self.SLM.write_image(self.buffers[index], self.dtype == np.uint8)
+                # The drivers return a positive status on success (None for drivers without status)
+                if status is not None and status <= 0:
+                    raise(IOError('SLM.write_image failed with status %s on frame %d' % (status, frame)))
+                uploaded = True
+            except Exception as error:
+                self.error = error
+                uploaded = False
+            presented = time.perf_counter()
+            self.freeBuffers.put(index)
+            self.records.append({'frame': frame, 'submitted': submitted, 'started': started, 'presented': presented, 'uploaded': uploaded})
+            with self.presented:
+                if uploaded:
+                    self.presentedFrame = frame
+                if frame == self.submittedFrame:
+                    self.framePresented.set()
+                self.processedFrame = frame
+                self.presented.notify_all()
+            if self.callback is not None and uploaded:
+                try:
+                    self.callback(frame)
+                except Exception as error:
+                    self.error = error
+
+    def check_error(self):
+        '''
+            Raises in the calling thread the error of the last failed upload or callback
+        '''
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def acquire_buffer(self, timeout=None):
+        '''
+            Gets a free frame buffer to render the next frame in. Blocks while all the buffers are waiting for or being uploaded.
+            input:
+                timeout: the largest waiting time (s), None to wait indefinitely
+            output:
+                index: the index of the buffer, to give to submit
+                buffer: the (rows,columns) C-contiguous buffer. Its content is the frame last rendered in it
+        '''
+        self.check_error()
+        if not self.thread.is_alive():
+            raise(RuntimeError('The SLM uploader is stopped'))
+        index = self.freeBuffers.get(timeout=timeout)
+        return index, self.buffers[index]
+
+    def submit(self, index):
+        '''
+            Queues a rendered buffer for upload. The buffer must not be modified until it is acquired again
+            input:
+                index: the index of the buffer given by acquire_buffer
+            output:
+                frame: the number of the frame, to wait for with wait_presented
+        '''
+        with self.presented:
+            self.submittedFrame += 1
+            frame = self.submittedFrame
+            self.framePresented.clear()
+        self.pendingFrames.put((frame, index, time.perf_counter()))
+        return frame
+
+    def render(self, function, timeout=None):
+        '''
+            Renders a frame in a free buffer and queues it for upload
+            input:
+                function: a function writing the frame in place in the (rows,columns) buffer given as its only argument,
+                          e.g. lambda buffer: calibration.get_grayscaleAtPhase(phase, out=buffer)
+                timeout: the largest waiting time for a free buffer (s), None to wait indefinitely
+            output:
+                frame: the number of the frame
+        '''
+        index, buffer = self.acquire_buffer(timeout)
+        try:
+            function(buffer)
+        except BaseException:
+            self.freeBuffers.put(index)
+            raise
+        return self.submit(index)
+
+    def write_image(self, image, timeout=None):
+        '''
+            Copies an image in a free buffer and queues it for upload (e.g. the image of Compositor.compose)
+            input:
+                image: the (rows,columns) gray levels
+                timeout: the largest waiting time for a free buffer (s), None to wait indefinitely
+            output:
+                frame: the number of the frame
+        '''
+        return self.render(lambda buffer: np.copyto(buffer, image), timeout)
+
+    def wait_presented(self, frame=None, timeout=None):
+        '''
+            Waits until a frame is live on the SLM, e.g. to start the exposure of a camera
+            input:
+                frame: the number of the frame, the last submitted one by default
+                timeout: the largest waiting time (s), None to wait indefinitely
+            output:
+                presented: True if the frame was presented, False on timeout
+        '''
+        with self.presented:
+            frame = self.submittedFrame if frame is None else frame
+            presented = self.presented.wait_for(lambda: self.processedFrame >= frame or not self.thread.is_alive(), timeout)
+        self.check_error()
+        return presented and self.presentedFrame >= frame
+
+    def get_latencies(self):
+        '''
+            Gets the upload times of the last frames
+            output:
+                latencies: a dict of 1D arrays: 'frame' numbers, 'upload' time spent in SLM.write_image (s), 'total' time from submit to presentation (s)
+                           and 'uploaded' (False for the failed uploads)
+        '''
+        records = list(self.records)
+        frames = np.array([record['frame'] for record in records], dtype=int)
+        upload = np.array([record['presented'] - record['started'] for record in records])
+        total = np.array([record['presented'] - record['submitted'] for record in records])
+        uploaded = np.array([record['uploaded'] for record in records], dtype=bool)
+        return {'frame': frames, 'upload': upload, 'total': total, 'uploaded': uploaded}
+
+    def stop(self, timeout=None):
+        '''
+            Uploads the frames already submitted and stops the upload thread
+            input:
+                timeout: the largest waiting time (s), None to wait indefinitely
+        '''
+        if self.thread.is_alive():
+            self.pendingFrames.put(None)
+            self.thread.join(timeout)
+        self.check_error()